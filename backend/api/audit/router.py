@@ -1,34 +1,42 @@
 from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
-from ...core.database import get_session
+from ...core.database import get_read_session
 from ..auth.deps import get_current_user
 from ...models.models import Usuario
 from ...models.models_audit import AuditLog
-from ..base_crud import BaseCRUDService
-from ..schemas.common import PaginatedResponse
+from ...core.audit_archive import audit_archive
+from ..schemas.common import CursorPaginatedResponse, CursorPaginationMetadata
+from datetime import datetime
 from typing import List, Optional
 
 router = APIRouter(prefix="/audit", tags=["Security Audit"])
-audit_crud = BaseCRUDService(AuditLog)
 
-@router.get("/logs", response_model=PaginatedResponse[AuditLog])
-def get_audit_logs(
-    offset: int = 0,
-    limit: int = 50,
+@router.get("/logs", response_model=CursorPaginatedResponse[AuditLog])
+async def get_audit_logs(
+    cursor: Optional[int] = Query(None, description="id_log of the last entry of the previous page"),
+    limit: int = Query(50, ge=1, le=500),
     accion: Optional[str] = None,
     entidad: Optional[str] = None,
     id_usuario: Optional[int] = None,
-    session: Session = Depends(get_session),
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    session: Session = Depends(get_read_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
-    Retrieves audit logs. 
+    Retrieves audit logs, newest first, from the database and the archived segments.
     In the future, this will be filtered by admin role.
     For now, users see all logs (beta simplicity).
     """
-    filters = {}
-    if accion: filters["accion"] = accion
-    if entidad: filters["entidad"] = entidad
-    if id_usuario: filters["id_usuario"] = id_usuario
+    filters = {"accion": accion, "entidad": entidad, "id_usuario": id_usuario}
     
-    return audit_crud.list(session, offset=offset, limit=limit, filters=filters)
+    # Segment reads decompress files: keep them off the event loop
+    items, next_cursor = await run_in_threadpool(
+        audit_archive.query,
+        session, cursor=cursor, limit=limit, filters=filters, desde=desde, hasta=hasta
+    )
+    return CursorPaginatedResponse(
+        data=items,
+        pagination=CursorPaginationMetadata(limit=limit, next_cursor=next_cursor, has_more=next_cursor is not None)
+    )
@@ -4,45 +4,62 @@ from jose import jwt, JWTError
 from sqlmodel import Session, select
 from ...core.database import get_session
 from ...core.config import settings
+from ...core.user_cache import user_cache, UsuarioActual
 from ...models.models import Usuario
 from typing import Optional
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+def _decode_token(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     session: Session = Depends(get_session)
-) -> Usuario:
+) -> UsuarioActual:
+    """
+    Authenticated user as an immutable snapshot, served from ``user_cache``.
+    Endpoints that modify the account use ``get_current_user_db`` instead.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        user_id: int = payload.get("id")
+        user_id, email = user_cache.token_subject(token, _decode_token)
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
         
-    user = session.get(Usuario, user_id)
+    user = user_cache.get_user(user_id, lambda pk: session.get(Usuario, pk)) if user_id else None
     if user is None:
         raise credentials_exception
+    if user.bloqueado:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario bloqueado")
+    return user
+
+def get_current_user_db(
+    current_user: UsuarioActual = Depends(get_current_user),
+    session: Session = Depends(get_session)
+) -> Usuario:
+    """Authenticated user as an ORM row bound to the request session (for updates)."""
+    user = session.get(Usuario, current_user.id_usuario)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No se pudo validar las credenciales")
     return user
 
 def get_optional_current_user(
     token: Optional[str] = Depends(oauth2_scheme),
     session: Session = Depends(get_session)
-) -> Optional[Usuario]:
+) -> Optional[UsuarioActual]:
     if not token:
         return None
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: int = payload.get("id")
+        user_id, _ = user_cache.token_subject(token, _decode_token)
         if user_id is None:
             return None
-        return session.get(Usuario, user_id)
+        return user_cache.get_user(user_id, lambda pk: session.get(Usuario, pk))
     except JWTError:
         return None
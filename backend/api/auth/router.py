@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlmodel import Session, select
 from ...core.database import get_session
-from ...core.auth_utils import verify_password, create_access_token, get_password_hash
+from ...core.auth_utils import (
+    verify_password, create_access_token, get_password_hash,
+    verify_password_async, get_password_hash_async, needs_rehash
+)
 from ...core.plugin_manager import plugin_manager
+from ...core.config import settings
 from ...models.models import Usuario
 from .schemas import (
     Token, UsuarioLogin, UsuarioCrear, UsuarioLectura,
     ProfileRead, ProfileUpdate, ChangePasswordRequest,
     RecuperarPasswordRequest
 )
-from .deps import get_current_user
+from ...core.user_cache import user_cache
+from .deps import get_current_user, get_current_user_db
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
 
@@ -56,7 +61,7 @@ async def login_usuario(
             # Disparar hook login exitoso
             user = session.exec(select(Usuario).where(Usuario.email == usuario_in.email)).first()
             if user:
-                await plugin_manager.call_hook(
+                plugin_manager.dispatch_hook(
                     "login_attempt",
                     user=user,
                     ip=client_ip,
@@ -66,9 +71,10 @@ async def login_usuario(
             return {"access_token": access_token, "token_type": "bearer"}
 
         user = session.exec(select(Usuario).where(Usuario.email == usuario_in.email)).first()
-        if not user or not verify_password(usuario_in.password, user.password):
+        # bcrypt corre en su propio pool: un pico de logins no bloquea el event loop
+        if not user or not await verify_password_async(usuario_in.password, user.password):
             # Disparar hook login fallido
-            await plugin_manager.call_hook(
+            plugin_manager.dispatch_hook(
                 "login_attempt",
                 user=user or usuario_in,
                 ip=client_ip,
@@ -87,10 +93,17 @@ async def login_usuario(
                 detail="Usuario bloqueado"
             )
         
+        # Actualizar el hash si cambió BCRYPT_ROUNDS (tenemos la contraseña en claro)
+        if needs_rehash(user.password):
+            user.password = await get_password_hash_async(usuario_in.password)
+            session.add(user)
+            session.commit()
+            logging.info(f"Password hash of user {user.id_usuario} upgraded to cost {settings.BCRYPT_ROUNDS}")
+        
         access_token = create_access_token(data={"sub": user.email, "id": user.id_usuario})
         
         # Disparar hook login exitoso
-        await plugin_manager.call_hook(
+        plugin_manager.dispatch_hook(
             "login_attempt",
             user=user,
             ip=client_ip,
@@ -117,7 +130,7 @@ def get_profile(current_user: Usuario = Depends(get_current_user)):
 def update_profile(
     profile_in: ProfileUpdate,
     session: Session = Depends(get_session),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Usuario = Depends(get_current_user_db)
 ):
     """Update the authenticated user's profile (nombre, apellido, email)."""
     if profile_in.email and profile_in.email != current_user.email:
@@ -141,13 +154,14 @@ def update_profile(
     session.add(current_user)
     session.commit()
     session.refresh(current_user)
+    user_cache.invalidate(current_user.id_usuario)
     return current_user
 
 @router.post("/change-password")
 def change_password(
     req: ChangePasswordRequest,
     session: Session = Depends(get_session),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Usuario = Depends(get_current_user_db)
 ):
     """Change the authenticated user's password after verifying the current one."""
     if len(req.new_password) < 6:
@@ -167,6 +181,7 @@ def change_password(
     current_user.actualizado_el = datetime.utcnow()
     session.add(current_user)
     session.commit()
+    user_cache.invalidate(current_user.id_usuario)
     return {"message": "Contraseña actualizada correctamente"}
 
 @router.post("/recuperar-password")
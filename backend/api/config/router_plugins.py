@@ -36,7 +36,9 @@ def listar_plugins_activos():
     """
     return {
         "plugins_cargados": plugin_manager.get_loaded_plugins(),
-        "total": len(plugin_manager.get_loaded_plugins())
+        "plugins_diferidos": plugin_manager.get_pending_plugins(),
+        "tiempos_carga": plugin_manager.load_times,
+        "total": len(plugin_manager.get_loaded_plugins()) + len(plugin_manager.get_pending_plugins())
     }
 
 
@@ -188,7 +190,7 @@ async def actualizar_configuracion_plugin(
     session.refresh(plugin)
     
     # Si el plugin está activo, recargarlo
-    if plugin.activo and plugin_manager.is_plugin_loaded(plugin.nombre_tecnico):
+    if plugin.activo and plugin_manager.is_plugin_active(plugin.nombre_tecnico):
         # Desactivar y reactivar para aplicar nueva configuración
         await plugin_manager.deactivate_plugin(plugin_id, session)
         await plugin_manager.activate_plugin(plugin_id, session)
@@ -219,11 +221,27 @@ def obtener_estado_plugin(plugin_id: int, session: Session = Depends(get_session
         },
         "en_memoria": {
             "cargado": plugin_manager.is_plugin_loaded(plugin.nombre_tecnico),
+            "diferido": plugin.nombre_tecnico in plugin_manager.get_pending_plugins(),
+            "error_carga": plugin_manager.failed_plugins.get(plugin.nombre_tecnico),
             "hooks_registrados": len(plugin_manager.get_hook_subscribers(plugin.nombre_tecnico))
-        }
+        },
+        "metricas": plugin_manager.get_plugin_metrics(plugin.nombre_tecnico)
     }
 
 
+@router.post("/{plugin_id}/circuito/reset")
+def resetear_circuito_plugin(plugin_id: int, session: Session = Depends(get_session)):
+    """
+    Cerrar manualmente el circuit breaker de un plugin (p. ej. tras corregir su configuración).
+    """
+    plugin = session.get(Plugin, plugin_id)
+    if not plugin:
+        raise HTTPException(status_code=404, detail="Plugin no encontrado")
+    
+    plugin_manager.reset_circuit(plugin.nombre_tecnico)
+    return {"success": True, "circuito": plugin_manager.get_plugin_metrics(plugin.nombre_tecnico)["circuito"]}
+
+
 @router.post("/{plugin_id}/test")
 async def probar_plugin(
     plugin_id: int, 
@@ -236,7 +254,7 @@ async def probar_plugin(
     if not plugin:
         raise HTTPException(status_code=404, detail="Plugin no encontrado")
     
-    if not plugin_manager.is_plugin_loaded(plugin.nombre_tecnico):
+    if not plugin_manager.is_plugin_active(plugin.nombre_tecnico):
         raise HTTPException(
             status_code=400, 
             detail="El plugin no está activo. Actívalo primero."
@@ -248,8 +266,8 @@ async def probar_plugin(
         for hook in plugin.hooks_suscritos.split(","):
             hook = hook.strip()
             if hook:
-                await plugin_manager.call_hook(hook, test_mode=True)
-                test_results.append({"hook": hook, "status": "ok"})
+                results = await plugin_manager.call_hook(hook, test_mode=True)
+                test_results.append({"hook": hook, "status": results.get(plugin.nombre_tecnico, "ok")})
         
         return {
             "success": True,
@@ -264,6 +282,22 @@ async def probar_plugin(
         )
 
 
+@router.get("/hooks/estadisticas")
+def estadisticas_hooks():
+    """
+    Contadores de ejecución de hooks por plugin (llamadas, errores y timeouts).
+    """
+    return plugin_manager.get_hook_stats()
+
+
+@router.get("/hooks/metricas")
+def metricas_hooks():
+    """
+    Latencias (p50/p95/p99), tasa de error y estado del circuit breaker por plugin y hook.
+    """
+    return plugin_manager.get_all_metrics()
+
+
 @router.get("/hooks/disponibles")
 def listar_hooks_disponibles():
     """
@@ -1,32 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, func
+from sqlmodel import Session, select
 from typing import List, Optional
-from decimal import Decimal
 from ...core.database import get_session
+from ...core.account_service import account_service
 from ..auth.deps import get_current_user
-from ...models.models import MetaAhorro, Usuario, ListaCuentas, LibroTransacciones
+from ...models.models import MetaAhorro, Usuario
 from datetime import datetime
 
 router = APIRouter(prefix="/goals", tags=["Metas"])
 
-def _calculate_account_balance(session: Session, id_cuenta: int) -> Decimal:
-    """Calculate the current balance of an account: saldo_inicial + sum(transactions)."""
-    account = session.get(ListaCuentas, id_cuenta)
-    if not account:
-        return Decimal(0)
-
-    result = session.exec(
-        select(func.coalesce(func.sum(LibroTransacciones.monto_transaccion), 0))
-        .where(LibroTransacciones.id_cuenta == id_cuenta)
-        .where(LibroTransacciones.fecha_eliminacion == None)
-    ).one()
-
-    return account.saldo_inicial + Decimal(str(result))
-
 def _sync_goal_balance(session: Session, goal: MetaAhorro) -> MetaAhorro:
     """If the goal is linked to an account, update monto_actual from account balance."""
     if goal.id_cuenta:
-        balance = _calculate_account_balance(session, goal.id_cuenta)
+        balance = account_service.calculate_balance(session, goal.id_cuenta)
         goal.monto_actual = balance
         goal.fecha_actualizacion = datetime.utcnow().isoformat()
         session.add(goal)
@@ -63,7 +49,7 @@ def create_goal(
     
     # If linked to account, set initial monto_actual from account balance
     if goal.id_cuenta:
-        goal.monto_actual = _calculate_account_balance(session, goal.id_cuenta)
+        goal.monto_actual = account_service.calculate_balance(session, goal.id_cuenta)
     
     session.add(goal)
     session.commit()
@@ -93,7 +79,7 @@ def update_goal(
     
     # Recalculate if linked to account
     if db_goal.id_cuenta:
-        db_goal.monto_actual = _calculate_account_balance(session, db_goal.id_cuenta)
+        db_goal.monto_actual = account_service.calculate_balance(session, db_goal.id_cuenta)
     
     session.add(db_goal)
     session.commit()
@@ -60,6 +60,7 @@ async def health_check(session: Session = Depends(get_session)) -> JSONResponse:
 
     return JSONResponse(content=health_status)
 
+
 @router.post("/backup")
 async def trigger_backup(current_user: Any = Depends(get_current_user)):
     """Triggers a manual database backup"""
@@ -71,6 +72,7 @@ async def trigger_backup(current_user: Any = Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
 @router.post("/integrity")
 async def run_integrity_check(current_user: Any = Depends(get_current_user), session: Session = Depends(get_session)):
     """Runs a PRAGMA integrity_check (SQLite)"""
@@ -81,6 +83,17 @@ async def run_integrity_check(current_user: Any = Depends(get_current_user), ses
         return {"status": "success", "report": report}
     except Exception as e:
         return {"status": "error", "message": str(e)}
+
+
+@router.get("/database")
+async def database_status(current_user: Any = Depends(get_current_user)):
+    """Read replica state (lag, fallback) and connection pool metrics per engine"""
+    from ...core import database
+    status = database.replica_router.status()
+    status["pools"] = database.pool_metrics()
+    return status
+
+
 @router.post("/test-mail")
 async def test_mail(data: Dict[str, str], current_user: Any = Depends(get_current_user)):
     """Sends a test email to verify SMTP settings"""
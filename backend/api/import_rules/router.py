@@ -1,7 +1,9 @@
+import re
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from typing import List
 from ...core.database import get_session
+from ...core.import_rules_service import import_rules_service, REGEX_PREFIX
 from ..auth.deps import get_current_user
 from ...models.models import Usuario
 from ...models.models_extended import ReglaImportacion
@@ -26,6 +28,15 @@ class ImportRuleUpdate(BaseModel):
     activo: Optional[int] = None
 
 
+def _validate_pattern(patron: str):
+    """Reject regex rules ("re:" prefix) that do not compile."""
+    if patron.lower().startswith(REGEX_PREFIX):
+        try:
+            re.compile(patron[len(REGEX_PREFIX):].strip())
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Expresión regular inválida: {e}")
+
+
 # --- Endpoints ---
 
 @router.get("/", response_model=List[ReglaImportacion])
@@ -50,6 +61,7 @@ def create_import_rule(
     """Create a new import rule for auto-categorizing bank CSV imports."""
     if not rule_in.patron or not rule_in.patron.strip():
         raise HTTPException(status_code=400, detail="El patrón no puede estar vacío")
+    _validate_pattern(rule_in.patron.strip())
 
     rule = ReglaImportacion(
         id_usuario=current_user.id_usuario,
@@ -61,6 +73,7 @@ def create_import_rule(
     session.add(rule)
     session.commit()
     session.refresh(rule)
+    import_rules_service.invalidate(current_user.id_usuario)
     return rule
 
 @router.put("/{rule_id}", response_model=ReglaImportacion)
@@ -76,12 +89,15 @@ def update_import_rule(
         raise HTTPException(status_code=404, detail="Regla no encontrada")
 
     update_data = rule_in.dict(exclude_unset=True)
+    if update_data.get("patron"):
+        _validate_pattern(update_data["patron"])
     for key, value in update_data.items():
         setattr(db_rule, key, value)
 
     session.add(db_rule)
     session.commit()
     session.refresh(db_rule)
+    import_rules_service.invalidate(current_user.id_usuario)
     return db_rule
 
 @router.delete("/{rule_id}")
@@ -97,4 +113,5 @@ def delete_import_rule(
 
     session.delete(db_rule)
     session.commit()
+    import_rules_service.invalidate(current_user.id_usuario)
     return {"ok": True}
@@ -5,12 +5,15 @@ Server-Sent Events (SSE) for real-time notifications
 from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, desc
-from backend.core.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from backend.core.database import get_async_session, engine
+from backend.core.notification_bus import notification_bus
+from backend.core.notification_service import notification_service
 from backend.api.auth.deps import get_current_user
 from backend.models.models import Usuario
 from backend.models.models_notifications import UserNotification, NotificationRead
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, List
+from typing import Callable, Optional, Literal, List, Union
 from datetime import datetime
 import asyncio
 import json
@@ -18,8 +21,8 @@ import uuid
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
-# In-memory notification queue per user (for SSE delivery)
-user_notification_queues = {}
+# Page size when re-sending missed notifications from the DB (reconnect or slow client)
+REPLAY_LIMIT = 100
 
 
 
@@ -36,52 +39,105 @@ class NotificationSchema(BaseModel):
     action_text: Optional[str] = None
 
 
-async def notification_generator(user_id: int):
+def _format_event(message: dict) -> str:
+    """SSE frame; the DB id is sent as the event id so browsers resume with Last-Event-ID"""
+    event_id = f"id: {message['id_db']}\n" if message.get("id_db") else ""
+    return f"{event_id}data: {json.dumps(message, default=str)}\n\n"
+
+
+def _missed_notifications(user_id: int, after_id: int, session_factory: Callable[[], Session]) -> List[dict]:
+    """One page of notifications stored after ``after_id`` (oldest first, at most REPLAY_LIMIT)"""
+    with session_factory() as session:
+        rows = session.exec(
+            select(UserNotification)
+            .where(UserNotification.user_id == user_id, UserNotification.id > after_id)
+            .order_by(UserNotification.id)
+            .limit(REPLAY_LIMIT)
+        ).all()
+    return [
+        NotificationSchema(
+            id=str(row.id),
+            id_db=row.id,
+            type=row.type,
+            title=row.title,
+            message=row.message,
+            timestamp=row.timestamp,
+            read=row.read,
+            action_url=row.action_url,
+            action_text=row.action_text
+        ).model_dump(mode="json")
+        for row in rows
+    ]
+
+
+async def notification_generator(
+    user_id: int,
+    last_event_id: Optional[int] = None,
+    session_factory: Optional[Callable[[], Session]] = None
+):
     """
     SSE generator for user notifications
-    Yields notifications as they arrive
+    Replays what was missed since ``last_event_id`` and then yields live notifications
     """
-    # Create queue for this user if it doesn't exist
-    if user_id not in user_notification_queues:
-        user_notification_queues[user_id] = asyncio.Queue()
-    
-    queue = user_notification_queues[user_id]
+    session_factory = session_factory or (lambda: Session(engine))
+    # Subscribe before replaying so nothing published in between is lost
+    subscription = await notification_bus.subscribe(user_id)
+    last_id = last_event_id or 0
     
     try:
         # Send initial connection message
         yield f"data: {json.dumps({'type': 'connected', 'message': 'Notification stream connected'})}\n\n"
         
-        # Keep connection alive and send notifications
+        replay = last_event_id is not None
         while True:
+            if replay or subscription.overflowed:
+                # Reconnection or slow client: re-sync from the DB
+                replay = subscription.overflowed = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                while True:
+                    # Page forward until caught up; the DB read runs off the event loop
+                    page = await asyncio.to_thread(_missed_notifications, user_id, last_id, session_factory)
+                    for message in page:
+                        yield _format_event(message)
+                        last_id = message["id_db"]
+                    if len(page) < REPLAY_LIMIT:
+                        break
+                continue
+            
             try:
                 # Wait for notification with timeout for keep-alive
-                notification = await asyncio.wait_for(queue.get(), timeout=30.0)
-                
-                # Send notification
-                yield f"data: {json.dumps(notification.dict())}\n\n"
-                
+                message = await subscription.get(timeout=30.0)
             except asyncio.TimeoutError:
                 # Send keep-alive ping every 30 seconds
                 yield f": keep-alive\n\n"
+                continue
+            
+            if message.get("id_db"):
+                if message["id_db"] <= last_id:
+                    continue  # Already sent during the replay
+                last_id = message["id_db"]
+            yield _format_event(message)
                 
     except asyncio.CancelledError:
         # Client disconnected
         pass
     finally:
-        # Cleanup queue when connection closes
-        if user_id in user_notification_queues:
-            del user_notification_queues[user_id]
+        # Only this connection goes away; the user's other tabs keep their streams
+        notification_bus.unsubscribe(subscription)
 
 
 @router.get("/stream")
 async def notification_stream(
     request: Request,
     token: Optional[str] = None,
-    session: Session = Depends(get_session)
+    last_event_id: Optional[int] = None
 ):
     """
     SSE endpoint for real-time notifications
     Client connects here to receive push notifications
+    No request session is held open for the stream: replays open short-lived
+    sessions in a worker thread (see notification_generator)
     """
     from backend.api.auth.deps import oauth2_scheme
     from backend.core.config import settings
@@ -110,9 +166,14 @@ async def notification_stream(
         print(f"❌ SSE: JWT decode failed: {e}")
         raise HTTPException(status_code=401, detail="Invalid token session")
         
+    # Browsers send Last-Event-ID automatically when an EventSource reconnects
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+    
     print(f"✅ SSE: Stream connection authorized for user_id={user_id}")
     return StreamingResponse(
-        notification_generator(user_id),
+        notification_generator(user_id, last_event_id),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -127,7 +188,7 @@ async def notification_stream(
 @router.get("/", response_model=List[UserNotification])
 async def get_notifications(
     limit: int = 20,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Get user notification history"""
@@ -135,84 +196,65 @@ async def get_notifications(
         UserNotification.user_id == current_user.id_usuario
     ).order_by(desc(UserNotification.timestamp)).limit(limit)
     
-    results = session.exec(statement).all()
+    results = (await session.exec(statement)).all()
     return results
 
 
 @router.put("/{id}/read", response_model=UserNotification)
 async def mark_as_read(
     id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Mark a notification as read"""
-    notification = session.get(UserNotification, id)
+    notification = await session.get(UserNotification, id)
     if not notification or notification.user_id != current_user.id_usuario:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Notification not found")
     
     notification.read = True
     session.add(notification)
-    session.commit()
-    session.refresh(notification)
+    await session.commit()
+    await session.refresh(notification)
     return notification
 
 
+@router.get("/unread-count")
+async def get_unread_count(
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Unread notifications for the UI badge"""
+    return {"unread": await session.run_sync(notification_service.unread_count, current_user.id_usuario)}
+
+
 @router.put("/read-all")
 async def mark_all_as_read(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Mark all notifications for the user as read"""
-    statement = select(UserNotification).where(
-        UserNotification.user_id == current_user.id_usuario,
-        UserNotification.read == False
-    )
-    notifications = session.exec(statement).all()
-    for n in notifications:
-        n.read = True
-        session.add(n)
-    session.commit()
-    return {"message": "All notifications marked as read"}
+    updated = await session.run_sync(notification_service.mark_all_read, current_user.id_usuario)
+    return {"message": "All notifications marked as read", "updated": updated}
 
 @router.delete("/")
 async def clear_notifications(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Usuario = Depends(get_current_user)
 ):
 
     """Clear all user notifications"""
-    statement = select(UserNotification).where(UserNotification.user_id == current_user.id_usuario)
-    notifications = session.exec(statement).all()
-    for n in notifications:
-        session.delete(n)
-    session.commit()
-    return {"message": "Notifications cleared"}
+    deleted = await session.run_sync(notification_service.clear, current_user.id_usuario)
+    return {"message": "Notifications cleared", "deleted": deleted}
 
 
-async def send_notification(user_id: int, notification_data: NotificationSchema, session: Optional[Session] = None):
+async def send_notification(user_id: int, notification_data: NotificationSchema, session: Optional[Union[Session, AsyncSession]] = None):
     """
     Send a notification to a specific user.
     Saves to DB and pushes to SSE if user is connected.
+    Accepts the caller's sync Session or AsyncSession.
     """
     # 1. Save to DB if session provided or get new session
-    if not session:
-        from backend.core.database import SessionLocal
-        with SessionLocal() as db_session:
-            db_notif = UserNotification(
-                user_id=user_id,
-                type=notification_data.type,
-                title=notification_data.title,
-                message=notification_data.message,
-                action_url=notification_data.action_url,
-                action_text=notification_data.action_text,
-                timestamp=notification_data.timestamp
-            )
-            db_session.add(db_notif)
-            db_session.commit()
-            db_session.refresh(db_notif)
-            notification_data.id_db = db_notif.id
-    else:
+    def _save(db_session: Session):
         db_notif = UserNotification(
             user_id=user_id,
             type=notification_data.type,
@@ -222,20 +264,25 @@ async def send_notification(user_id: int, notification_data: NotificationSchema,
             action_text=notification_data.action_text,
             timestamp=notification_data.timestamp
         )
-        session.add(db_notif)
-        session.commit()
-        session.refresh(db_notif)
+        db_session.add(db_notif)
+        db_session.commit()
+        db_session.refresh(db_notif)
         notification_data.id_db = db_notif.id
 
-    # 2. Push to SSE queue if user is online
-    if user_id in user_notification_queues:
-        await user_notification_queues[user_id].put(notification_data)
-        return True
-    return False
+    if not session:
+        with Session(engine) as db_session:
+            _save(db_session)
+    elif isinstance(session, AsyncSession):
+        await session.run_sync(_save)
+    else:
+        _save(session)
+
+    # 2. Push to every open stream of the user (in any worker)
+    return await notification_bus.publish(user_id, notification_data.model_dump(mode="json"))
 
 
 # Helper functions for common notification types
-async def notify_success(user_id: int, title: str, message: str, action_url: Optional[str] = None, action_text: Optional[str] = None, session: Optional[Session] = None):
+async def notify_success(user_id: int, title: str, message: str, action_url: Optional[str] = None, action_text: Optional[str] = None, session: Optional[Union[Session, AsyncSession]] = None):
     """Send success notification"""
     notif = NotificationSchema(
         id=str(uuid.uuid4()),
@@ -248,7 +295,7 @@ async def notify_success(user_id: int, title: str, message: str, action_url: Opt
     await send_notification(user_id, notif, session=session)
 
 
-async def notify_error(user_id: int, title: str, message: str, session: Optional[Session] = None):
+async def notify_error(user_id: int, title: str, message: str, session: Optional[Union[Session, AsyncSession]] = None):
     """Send error notification"""
     notif = NotificationSchema(
         id=str(uuid.uuid4()),
@@ -259,7 +306,7 @@ async def notify_error(user_id: int, title: str, message: str, session: Optional
     await send_notification(user_id, notif, session=session)
 
 
-async def notify_info(user_id: int, title: str, message: str, action_url: Optional[str] = None, action_text: Optional[str] = None, session: Optional[Session] = None):
+async def notify_info(user_id: int, title: str, message: str, action_url: Optional[str] = None, action_text: Optional[str] = None, session: Optional[Union[Session, AsyncSession]] = None):
     """Send info notification"""
     notif = NotificationSchema(
         id=str(uuid.uuid4()),
@@ -272,7 +319,7 @@ async def notify_info(user_id: int, title: str, message: str, action_url: Option
     await send_notification(user_id, notif, session=session)
 
 
-async def notify_warning(user_id: int, title: str, message: str, session: Optional[Session] = None):
+async def notify_warning(user_id: int, title: str, message: str, session: Optional[Union[Session, AsyncSession]] = None):
     """Send warning notification"""
     notif = NotificationSchema(
         id=str(uuid.uuid4()),
@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlmodel import Session, select, func
-from ...core.database import get_session
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Response
+from sqlmodel import Session, select
+from sqlalchemy import insert, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ...core.database import get_session, get_async_session
 from ..auth.deps import get_current_user
-from ...models.models import LibroTransacciones, ListaCuentas, Usuario, Beneficiario
-from ...models.models_extended import ReglaImportacion
+from ...models.models import LibroTransacciones, ListaCuentas, Usuario, Beneficiario, MetaAhorro
+from ...models.models_extended import PerfilImportacion
 from ...core.csv_parser import CSVParser
+from ...core.statement_parsers import get_statement_parser
+from ...core.import_rules_service import import_rules_service
+from ...core.reconciliation_service import reconciliation_matcher
+from ...core.dedup_service import dedup_service
+from ...core.account_service import account_service
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from decimal import Decimal
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/reconciliation", tags=["Reconciliación"])
 
+IN_CLAUSE_CHUNK = 900
+
 class ReconciliationPreview(BaseModel):
     fecha: str
     descripcion: str
@@ -28,106 +41,233 @@ class ReconciliationProcessRequest(BaseModel):
     transactions: List[ReconciliationPreview]
 
 
-def _apply_import_rules(session: Session, user_id: int, description: str) -> dict:
+def _profile_to_dict(perfil: PerfilImportacion) -> Dict[str, Any]:
+    return {
+        "delimiter": perfil.delimitador,
+        "encoding": perfil.codificacion,
+        "mapping": {
+            "fecha": perfil.columna_fecha,
+            "descripcion": perfil.columna_descripcion,
+            "monto": perfil.columna_monto
+        },
+        "date_format": perfil.formato_fecha,
+        "decimal_separator": perfil.separador_decimal
+    }
+
+
+def _find_import_profile(
+    session: Session, user_id: int, id_cuenta: int, content: bytes, id_perfil: Optional[int]
+) -> Optional[PerfilImportacion]:
+    """Explicitly selected profile, or the one whose header fingerprint matches (account-specific first)."""
+    if id_perfil:
+        perfil = session.get(PerfilImportacion, id_perfil)
+        if not perfil or perfil.id_usuario != user_id:
+            raise HTTPException(status_code=404, detail="Perfil de importación no encontrado")
+        return perfil
+
+    fingerprint = CSVParser.header_fingerprint(content)
+    candidates = session.exec(
+        select(PerfilImportacion)
+        .where(PerfilImportacion.id_usuario == user_id)
+        .where(PerfilImportacion.huella_encabezado == fingerprint)
+    ).all()
+    candidates = sorted(candidates, key=lambda p: (p.id_cuenta != id_cuenta, -(p.usos or 0)))
+    return candidates[0] if candidates else None
+
+
+def _parse_csv(
+    session: Session, user_id: int, id_cuenta: int, filename: str, content: bytes,
+    id_perfil: Optional[int], overrides: Dict[str, Any]
+) -> tuple:
     """
-    Try to match a CSV description against user's import rules.
-    Returns dict with id_categoria, id_beneficiario, and rule name if matched.
-    Rules are evaluated by priority descending; first match wins.
+    Parse a CSV using a saved import profile when one applies, learning and saving
+    a new profile after the first successful detection-based parse.
+    Returns (rows, profile id or None, rows skipped for lacking a valid date).
     """
-    rules = session.exec(
-        select(ReglaImportacion)
-        .where(ReglaImportacion.id_usuario == user_id)
-        .where(ReglaImportacion.activo == 1)
-        .order_by(ReglaImportacion.prioridad.desc())
-    ).all()
+    perfil = _find_import_profile(session, user_id, id_cuenta, content, id_perfil)
+    profile = _profile_to_dict(perfil) if perfil else None
 
-    desc_lower = description.lower()
-    for rule in rules:
-        if rule.patron.lower() in desc_lower:
-            return {
-                "id_categoria": rule.id_categoria,
-                "id_beneficiario": rule.id_beneficiario,
-                "rule_name": rule.patron
-            }
-    return {}
+    if overrides:
+        if profile is None:
+            # Nothing saved yet: start from the detected layout and patch it
+            detector = CSVParser(content, delimiter=overrides.get("delimiter"))
+            detector.parse()
+            profile = detector.profile
+        for key, value in overrides.items():
+            if key.startswith("mapping."):
+                profile["mapping"][key.split(".", 1)[1]] = value.strip().lower()
+            else:
+                profile[key] = value
+
+    if profile:
+        parser = CSVParser(content, profile=profile)
+        rows = parser.parse()
+        if rows or overrides or id_perfil:
+            if perfil and not overrides:
+                perfil.usos = (perfil.usos or 0) + 1
+                perfil.ultimo_uso = datetime.utcnow()
+                session.add(perfil)
+                session.commit()
+            return rows, perfil.id_perfil if perfil else None, parser.skipped_rows
+        # A fingerprint match that yields nothing (e.g. the bank changed its date
+        # format) falls through to full detection, re-learned into the same profile
+
+    parser = CSVParser(content, delimiter=None)
+    rows = parser.parse()
+    learned = parser.profile
+    if not rows or not learned or not learned["date_format"]:
+        if perfil:
+            logger.warning(f"Import profile {perfil.id_perfil} did not match {filename} and could not be re-learned")
+        return rows, None, parser.skipped_rows
+
+    if perfil:
+        logger.warning(f"Import profile {perfil.id_perfil} did not match {filename}: layout re-learned")
+    else:
+        perfil = PerfilImportacion(id_usuario=user_id, id_cuenta=id_cuenta, nombre=filename or "CSV", usos=0)
+    perfil.huella_encabezado = learned["fingerprint"]
+    perfil.delimitador = learned["delimiter"]
+    perfil.codificacion = learned["encoding"]
+    perfil.columna_fecha = learned["mapping"]["fecha"]
+    perfil.columna_descripcion = learned["mapping"]["descripcion"]
+    perfil.columna_monto = learned["mapping"]["monto"]
+    perfil.formato_fecha = learned["date_format"]
+    perfil.separador_decimal = learned["decimal_separator"]
+    perfil.usos = (perfil.usos or 0) + 1
+    perfil.ultimo_uso = datetime.utcnow()
+    session.add(perfil)
+    session.commit()
+    session.refresh(perfil)
+    return rows, perfil.id_perfil, parser.skipped_rows
+
+
+def _parse_statement(filename: str, fileobj) -> List[Dict[str, Any]]:
+    """OFX/QIF/CAMT parse; blocking file and XML work, run in a worker thread."""
+    return get_statement_parser(filename, fileobj).parse()
 
 
 @router.post("/preview", response_model=List[ReconciliationPreview])
 async def preview_reconciliation(
+    response: Response,
     file: UploadFile = File(...),
     id_cuenta: int = Form(...),
-    session: Session = Depends(get_session),
+    id_perfil: Optional[int] = Form(None),
+    delimitador: Optional[str] = Form(None),
+    columna_fecha: Optional[str] = Form(None),
+    columna_descripcion: Optional[str] = Form(None),
+    columna_monto: Optional[str] = Form(None),
+    formato_fecha: Optional[str] = Form(None),
+    separador_decimal: Optional[str] = Form(None),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
-    Parses a CSV file and attempts to match transactions with existing records.
+    Parses a bank statement (CSV, OFX/QFX, QIF or CAMT.053) and attempts to match
+    transactions with existing records.
+    CSV layouts are remembered per user as import profiles (matched by header
+    fingerprint); id_perfil selects one explicitly and the other form fields
+    override individual settings. The profile used is returned in X-Import-Profile
+    and the number of CSV rows dropped for lacking a valid date in X-Skipped-Rows.
+    Matches are scored (date distance, amount tolerance, description similarity)
+    and assigned one-to-one, so match_score reflects graded confidence.
     For new transactions, applies import rules for auto-categorization.
     """
-    if not file.filename.lower().endswith('.csv'):
-        raise HTTPException(status_code=400, detail="El archivo debe ser un CSV")
-    
-    content = await file.read()
+    overrides = {
+        key: value for key, value in {
+            "delimiter": delimitador,
+            "mapping.fecha": columna_fecha,
+            "mapping.descripcion": columna_descripcion,
+            "mapping.monto": columna_monto,
+            "date_format": formato_fecha,
+            "decimal_separator": separador_decimal
+        }.items() if value
+    }
+
+    # OFX/QIF/CAMT are streamed from the spooled upload; CSV is read in memory
     try:
-        parser = CSVParser(content)
-        parsed_data = parser.parse()
+        if (file.filename or "").lower().endswith(".csv"):
+            content = await file.read()
+            parsed_data, profile_id, skipped = await session.run_sync(
+                _parse_csv, current_user.id_usuario, id_cuenta, file.filename, content, id_perfil, overrides
+            )
+            if profile_id:
+                response.headers["X-Import-Profile"] = str(profile_id)
+            response.headers["X-Skipped-Rows"] = str(skipped)
+        else:
+            parsed_data = await asyncio.to_thread(_parse_statement, file.filename, file.file)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
     if not parsed_data:
-        raise HTTPException(status_code=400, detail="No se encontraron transacciones válidas en el CSV")
+        raise HTTPException(status_code=400, detail="No se encontraron transacciones válidas en el archivo")
 
     dates = [row['fecha'] for row in parsed_data if row.get('fecha')]
     if not dates:
-        raise HTTPException(status_code=400, detail="No se pudieron detectar fechas en el CSV")
+        raise HTTPException(status_code=400, detail="No se pudieron detectar fechas en el archivo")
         
     min_date = min(dates)
     max_date = max(dates)
-    
-    existing_txs = session.exec(
-        select(LibroTransacciones)
+
+    # Widen the window so near-date matches (and timestamped entries) are candidates
+    window = timedelta(days=reconciliation_matcher.date_window_days)
+    try:
+        range_start = (datetime.fromisoformat(min_date) - window).date().isoformat()
+        range_end = (datetime.fromisoformat(max_date) + window + timedelta(days=1)).date().isoformat()
+    except ValueError:
+        range_start, range_end = min_date, max_date
+
+    existing_txs = (await session.exec(
+        select(LibroTransacciones, Beneficiario.nombre_beneficiario)
+        .outerjoin(Beneficiario, LibroTransacciones.id_beneficiario == Beneficiario.id_beneficiario)
         .where(LibroTransacciones.id_cuenta == id_cuenta)
-        .where(LibroTransacciones.fecha_transaccion >= min_date)
-        .where(LibroTransacciones.fecha_transaccion <= max_date)
-    ).all()
-    
+        .where(LibroTransacciones.fecha_transaccion >= range_start)
+        .where(LibroTransacciones.fecha_transaccion < range_end)
+    )).all()
+
+    candidates = [
+        {
+            "fecha": db_tx.fecha_transaccion,
+            "descripcion": db_tx.notas,
+            "beneficiario": payee_name,
+            "monto": db_tx.monto_transaccion
+        }
+        for db_tx, payee_name in existing_txs
+    ]
+    matches = reconciliation_matcher.match(parsed_data, candidates)
+
     preview_list = []
-    available_txs = list(existing_txs)
+    # Compiled once per import (and cached per user) instead of queried per row
+    rule_set = await session.run_sync(import_rules_service.get_rules, current_user.id_usuario)
 
-    for row in parsed_data:
+    for row, paired in zip(parsed_data, matches):
         csv_amount = row['monto']
         csv_date = row['fecha']
         csv_desc = row['descripcion']
-        
-        # Try exact match (Date + Amount)
-        match = None
-        for i, db_tx in enumerate(available_txs):
-            if db_tx.monto_transaccion == csv_amount and db_tx.fecha_transaccion == csv_date:
-                match = db_tx
-                available_txs.pop(i)
-                break
-        
+
+        match = existing_txs[paired[0]][0] if paired else None
+        score = paired[1] if paired else 0.0
+
         # For new transactions, apply import rules for auto-categorization
         suggested_cat = match.id_categoria if match else None
         suggested_payee = None if match else csv_desc
         rule_name = None
 
         if not match:
-            rule_result = _apply_import_rules(session, current_user.id_usuario, csv_desc)
+            rule_result = rule_set.match(csv_desc)
             if rule_result:
                 suggested_cat = rule_result.get("id_categoria") or suggested_cat
                 rule_name = rule_result.get("rule_name")
-                # If rule has a beneficiary, look up name for display
-                if rule_result.get("id_beneficiario"):
-                    benef = session.get(Beneficiario, rule_result["id_beneficiario"])
-                    if benef:
-                        suggested_payee = benef.nombre_beneficiario
+                # Beneficiary names are preloaded when the rule set is compiled
+                if rule_result.get("nombre_beneficiario"):
+                    suggested_payee = rule_result["nombre_beneficiario"]
 
         preview = ReconciliationPreview(
             fecha=csv_date,
             descripcion=csv_desc,
             monto=csv_amount,
             match_id=match.id_transaccion if match else None,
-            match_score=100.0 if match else 0.0,
+            match_score=score,
             is_new=not bool(match),
             id_categoria=suggested_cat,
             new_payee=suggested_payee,
@@ -137,58 +277,168 @@ async def preview_reconciliation(
         
     return preview_list
 
-@router.post("/process")
-async def process_reconciliation(
-    request: ReconciliationProcessRequest,
+@router.get("/profiles", response_model=List[PerfilImportacion])
+def list_import_profiles(
     session: Session = Depends(get_session),
     current_user: Usuario = Depends(get_current_user)
 ):
+    """List the saved CSV import profiles of the current user."""
+    return session.exec(
+        select(PerfilImportacion)
+        .where(PerfilImportacion.id_usuario == current_user.id_usuario)
+        .order_by(PerfilImportacion.ultimo_uso.desc())
+    ).all()
+
+
+@router.delete("/profiles/{id_perfil}")
+def delete_import_profile(
+    id_perfil: int,
+    session: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Delete a saved import profile so the next import re-detects the layout."""
+    perfil = session.get(PerfilImportacion, id_perfil)
+    if not perfil or perfil.id_usuario != current_user.id_usuario:
+        raise HTTPException(status_code=404, detail="Perfil de importación no encontrado")
+    session.delete(perfil)
+    session.commit()
+    return {"ok": True}
+
+
+def _resolve_payees(session: Session, default_categories: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
     """
-    Finalizes the reconciliation by creating new transactions or updating existing ones.
-    Handles automatic creation of Beneficiaries with user-provided overrides.
+    Resolve payee names to beneficiaries in bulk.
+    Existing names are fetched with one IN query; missing ones are inserted with a
+    single multi-row INSERT and re-read with one more IN query to obtain their IDs.
     """
-    counts = {"created": 0, "matched": 0}
-    
-    for tx in request.transactions:
-        if tx.is_new:
-            payee_name = tx.new_payee.strip().title() if tx.new_payee else tx.descripcion.strip().title()
-            
-            statement = select(Beneficiario).where(Beneficiario.nombre_beneficiario == payee_name)
-            benef = session.exec(statement).first()
-            
-            if not benef:
-                default_cat = tx.id_categoria if tx.id_categoria else 1
-                
-                benef = Beneficiario(
-                    nombre_beneficiario=payee_name,
-                    notas="Auto-created from Bank Import",
-                    id_categoria=default_cat 
-                )
-                session.add(benef)
-                session.commit()
-                session.refresh(benef)
-            
+    names = list(default_categories.keys())
+    if not names:
+        return {}
+
+    def _fetch(batch: List[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        # Chunked only to stay under driver bind-parameter limits on huge statements
+        for i in range(0, len(batch), IN_CLAUSE_CHUNK):
+            rows = session.exec(
+                select(Beneficiario.nombre_beneficiario, Beneficiario.id_beneficiario, Beneficiario.id_categoria)
+                .where(Beneficiario.nombre_beneficiario.in_(batch[i:i + IN_CLAUSE_CHUNK]))
+            ).all()
+            found.update({row[0]: {"id_beneficiario": row[1], "id_categoria": row[2]} for row in rows})
+        return found
+
+    payees = _fetch(names)
+    missing = [name for name in names if name not in payees]
+    if missing:
+        session.execute(
+            insert(Beneficiario),
+            [
+                {
+                    "nombre_beneficiario": name,
+                    "notas": "Auto-created from Bank Import",
+                    "id_categoria": default_categories[name]
+                    # activo / oculto: column defaults of the model
+                }
+                for name in missing
+            ]
+        )
+        payees.update(_fetch(missing))
+    return payees
+
+
+def _sync_account_rollups(session: Session, id_cuenta: int):
+    """Refresh savings goals linked to the account with one aggregate and one UPDATE."""
+    if not session.get(ListaCuentas, id_cuenta):
+        return
+    session.execute(
+        update(MetaAhorro)
+        .where(MetaAhorro.id_cuenta == id_cuenta)
+        .values(
+            monto_actual=account_service.calculate_balance(session, id_cuenta),
+            fecha_actualizacion=datetime.utcnow().isoformat()
+        )
+    )
+
+
+def _apply_reconciliation(session: Session, request: ReconciliationProcessRequest) -> Dict[str, Any]:
+    """Dedup, payee resolution, bulk insert and rollups of a reconciliation (sync session)."""
+    counts = {"created": 0, "matched": 0, "duplicates": 0}
+
+    new_txs = [tx for tx in request.transactions if tx.is_new]
+    counts["matched"] = len(request.transactions) - len(new_txs)
+
+    fingerprints = [
+        dedup_service.fingerprint(request.id_cuenta, tx.fecha, tx.monto, f"[Importado] {tx.descripcion}")
+        for tx in new_txs
+    ]
+    existing = dedup_service.find_existing(session, fingerprints)
+    if existing:
+        kept = [(tx, fp) for tx, fp in zip(new_txs, fingerprints) if fp not in existing]
+        counts["duplicates"] = len(new_txs) - len(kept)
+        new_txs = [tx for tx, _ in kept]
+        fingerprints = [fp for _, fp in kept]
+    if not new_txs:
+        return {"message": "Reconciliación completada", "stats": counts}
+
+    # 1. Payee names per row; a new payee takes the category of its first row
+    payee_names = []
+    default_categories: Dict[str, int] = {}
+    for tx in new_txs:
+        payee_name = tx.new_payee.strip().title() if tx.new_payee else tx.descripcion.strip().title()
+        payee_names.append(payee_name)
+        default_categories.setdefault(payee_name, tx.id_categoria if tx.id_categoria else 1)
+
+    try:
+        payees = _resolve_payees(session, default_categories)
+
+        # 2. Bulk insert all transactions
+        now = datetime.utcnow().isoformat()
+        rows = []
+        for tx, payee_name, fingerprint in zip(new_txs, payee_names, fingerprints):
+            benef = payees[payee_name]
             if tx.id_categoria and tx.id_categoria > 0:
                 cat_id = tx.id_categoria
-            elif benef.id_categoria:
-                cat_id = benef.id_categoria
+            elif benef["id_categoria"]:
+                cat_id = benef["id_categoria"]
             else:
                 cat_id = 1
 
-            db_tx = LibroTransacciones(
-                id_cuenta=request.id_cuenta,
-                fecha_transaccion=tx.fecha,
-                monto_transaccion=tx.monto,
-                notas=f"[Importado] {tx.descripcion}",
-                id_beneficiario=benef.id_beneficiario,
-                id_categoria=cat_id,
-                codigo_transaccion="Withdrawal" if tx.monto < 0 else "Deposit",
-                fecha_actualizacion=datetime.utcnow().isoformat()
-            )
-            session.add(db_tx)
-            counts["created"] += 1
-        else:
-            counts["matched"] += 1
-            
-    session.commit()
+            rows.append({
+                "id_cuenta": request.id_cuenta,
+                "fecha_transaccion": tx.fecha,
+                "monto_transaccion": tx.monto,
+                "notas": f"[Importado] {tx.descripcion}",
+                "id_beneficiario": benef["id_beneficiario"],
+                "id_categoria": cat_id,
+                "codigo_transaccion": "Withdrawal" if tx.monto < 0 else "Deposit",
+                "fecha_actualizacion": now,
+                "huella_duplicado": fingerprint
+                # color / es_dividida: column defaults of the model
+            })
+        session.execute(insert(LibroTransacciones), rows)
+        counts["created"] = len(rows)
+
+        # 3. Rollups depending on the account balance
+        _sync_account_rollups(session, request.id_cuenta)
+
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
     return {"message": "Reconciliación completada", "stats": counts}
+
+
+@router.post("/process")
+async def process_reconciliation(
+    request: ReconciliationProcessRequest,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Finalizes the reconciliation by creating new transactions or updating existing ones.
+    Handles automatic creation of Beneficiaries with user-provided overrides.
+    Rows already in the ledger (same dedup fingerprint, e.g. overlapping
+    statements imported twice) are skipped and counted as duplicates.
+    All payees, transactions and goal rollups are written in a single DB transaction.
+    """
+    return await session.run_sync(_apply_reconciliation, request)
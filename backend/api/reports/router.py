@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Query
 from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, func
-from ...core.database import get_session
+from ...core.database import get_read_session
 from ...models.models import LibroTransacciones, ListaCuentas, Beneficiario, Categoria, Presupuesto, Usuario
 from ...models.models_config import AnioPresupuesto
 from ...models.models_plugins import Plugin
@@ -18,7 +18,7 @@ router = APIRouter(prefix="/reportes", tags=["Reportes"], dependencies=[Depends(
 @router.get("/mensual")
 def reporte_mensual(
     year: int = Query(datetime.now().year),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Retorna ingresos y gastos agrupados por mes para el año especificado.
@@ -67,7 +67,7 @@ def reporte_mensual(
 def reporte_categorias(
     month: int = Query(None), 
     year: int = Query(None),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Retorna gastos por categoría. Si no se especifican mes/año, busca el último mes con datos.
@@ -112,7 +112,7 @@ def reporte_categorias(
 def descargar_csv(
     start_date: str = Query(None),
     end_date: str = Query(None),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     # Filtros base
     query = select(
@@ -158,7 +158,7 @@ def descargar_csv(
 def descargar_pdf(
     start_date: str = Query(None),
     end_date: str = Query(None),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     if not start_date:
         start_date = (datetime.now().replace(day=1)).strftime("%Y-%m-%d")
@@ -208,7 +208,7 @@ def descargar_pdf(
 @router.get("/tendencia")
 def reporte_tendencia(
     meses: int = Query(6),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Calcula la tendencia lineal de los saldos mensuales (Net Worth).
@@ -282,7 +282,7 @@ def reporte_tendencia(
 def presupuesto_realidad(
     year: int = Query(datetime.now().year),
     month: int = Query(datetime.now().month),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Compara el presupuesto vs la realidad por categoría para un mes específico.
@@ -333,7 +333,7 @@ def presupuesto_realidad(
 def proyeccion_cuenta(
     id_cuenta: int,
     dias: int = Query(30),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Proyecta el saldo de una cuenta específica usando transacciones programadas.
@@ -356,7 +356,7 @@ def proyeccion_cuenta(
 @router.get("/cashflow")
 def reporte_cashflow(
     year: int = Query(datetime.now().year),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Retorna Ingresos Reales, Gastos Reales y Presupuesto Mensual Agregado por mes.
@@ -431,7 +431,7 @@ def reporte_cashflow(
 def reporte_heatmap(
     month: int = Query(None),
     year: int = Query(None),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
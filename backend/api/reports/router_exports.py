@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from backend.core.database import get_session
+from backend.core.database import get_read_session
 from backend.api.auth.deps import get_current_user
 from backend.models.models import Usuario, LibroTransacciones
 import pandas as pd
@@ -16,7 +16,7 @@ router = APIRouter(prefix="/export", tags=["Exports"])
 @router.get("/transactions/excel")
 async def export_transactions_excel(
     limit: Optional[int] = 1000,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Export transaction history to Excel"""
@@ -59,7 +59,7 @@ async def export_transactions_excel(
 @router.get("/transactions/pdf")
 async def export_transactions_pdf(
     limit: Optional[int] = 500,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Export transaction history to PDF"""
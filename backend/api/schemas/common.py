@@ -15,6 +15,17 @@ class PaginatedResponse(BaseModel, Generic[T]):
     data: List[T]
     pagination: PaginationMetadata
 
+class CursorPaginationMetadata(BaseModel):
+    """Keyset pagination metadata"""
+    limit: int
+    next_cursor: Optional[int] = None
+    has_more: bool
+
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    """Paginated response using a cursor instead of an offset"""
+    data: List[T]
+    pagination: CursorPaginationMetadata
+
 class SingleResponse(BaseModel, Generic[T]):
     """Standard single item response"""
     data: T
@@ -5,7 +5,8 @@ Endpoints for theme management and user preferences
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session
 from backend.core.database import get_session
-from backend.api.auth.deps import get_current_user
+from backend.api.auth.deps import get_current_user, get_current_user_db
+from backend.core.user_cache import user_cache
 from backend.models.models import Usuario
 from backend.core.themes import get_theme, get_all_themes, THEMES
 from pydantic import BaseModel
@@ -82,7 +83,7 @@ async def get_current_theme(
 async def update_current_theme(
     data: ThemeUpdateRequest,
     session: Session = Depends(get_session),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Usuario = Depends(get_current_user_db)
 ):
     """
     Update user's theme preference
@@ -96,6 +97,7 @@ async def update_current_theme(
     session.add(current_user)
     session.commit()
     session.refresh(current_user)
+    user_cache.invalidate(current_user.id_usuario)
     
     return {
         "message": "Theme updated successfully",
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
-from ...core.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ...core.database import get_session, get_async_session
 from ..auth.deps import get_current_user
 from ...core.audit_service import audit_service
-from ...core.plugin_manager import plugin_manager
+from ...core.dedup_service import dedup_service
+from ...core.outbox_service import outbox_service
 from ...models.models import LibroTransacciones, TransaccionDividida, ListaCuentas, Beneficiario, Categoria, Usuario
 from .schemas import TransaccionCrear, TransaccionLectura, TransaccionComplejaCrear, DivisionCrear
 from backend.models.models_extended import TransaccionEtiqueta
@@ -14,7 +16,7 @@ router = APIRouter(prefix="/transacciones", tags=["Transacciones"])
 
 from sqlalchemy.orm import joinedload
 from sqlalchemy import func
-from ..schemas.common import PaginatedResponse, PaginationMetadata
+from ..schemas.common import PaginatedResponse, PaginationMetadata, BulkOperationResponse
 
 def _enriquecer_rapido(tx: LibroTransacciones, tags: List[int]) -> TransaccionLectura:
     """Enrich transaction data using eager-loaded relationships and pre-fetched tags"""
@@ -166,10 +168,12 @@ def actualizar_transaccion(
         setattr(db_tx, key, value)
     
     db_tx.fecha_actualizacion = datetime.utcnow().isoformat()
+    dedup_service.stamp(db_tx)
     session.add(db_tx)
     
     # Log update
-    audit_service.log(session, current_user.id_usuario, "UPDATE", "Transaccion", tx_id, tx_in.dict(exclude={"divisiones", "etiquetas"}))
+    audit_service.log(session, current_user.id_usuario, "UPDATE", "Transaccion", tx_id, tx_in.dict(exclude={"divisiones", "etiquetas"}),
+                      en_transaccion=True)
     
     session.commit()
     
@@ -241,85 +245,175 @@ def obtener_divisiones_transaccion(tx_id: int, session: Session = Depends(get_se
         notas=s.notas
     ) for s in splits]
 
-@router.post("/", response_model=TransaccionLectura)
-async def crear_transaccion(
-    tx_in: TransaccionComplejaCrear, 
+@router.get("/duplicados")
+def listar_posibles_duplicados(
+    id_cuenta: Optional[int] = None,
     session: Session = Depends(get_session),
     current_user: Usuario = Depends(get_current_user)
 ):
-    cuenta_origen = session.get(ListaCuentas, tx_in.id_cuenta)
-    if not cuenta_origen:
-        raise HTTPException(status_code=404, detail="Cuenta de origen no encontrada")
-    
-    tx_data = tx_in.dict(exclude={"divisiones", "etiquetas"})
-    db_tx = LibroTransacciones(**tx_data)
-    db_tx.fecha_actualizacion = datetime.utcnow().isoformat()
-    if not db_tx.fecha_transaccion:
-        db_tx.fecha_transaccion = datetime.utcnow().isoformat()
-        
-    session.add(db_tx)
-    # Flush to get the ID without committing yet
+    """Pares de transacciones que probablemente registran el mismo movimiento"""
+    return dedup_service.scan_near_duplicates(session, id_cuenta=id_cuenta)
+
+@router.post("/lote", response_model=BulkOperationResponse)
+def crear_transacciones_lote(
+    txs_in: List[TransaccionCrear],
+    permitir_duplicados: bool = False,
+    session: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Creates many simple transactions in one commit.
+    Rows whose fingerprint already exists (in the ledger or earlier in the batch)
+    are rejected unless permitir_duplicados is set.
+    """
+    cuentas = {tx.id_cuenta for tx in txs_in}
+    existentes_cuentas = set(session.exec(
+        select(ListaCuentas.id_cuenta).where(ListaCuentas.id_cuenta.in_(cuentas))
+    ).all()) if cuentas else set()
+
+    now = datetime.utcnow().isoformat()
+    nuevas, errores = [], []
+    for idx, tx_in in enumerate(txs_in):
+        if tx_in.id_cuenta not in existentes_cuentas:
+            errores.append({"indice": idx, "error": "Cuenta de origen no encontrada"})
+            continue
+        db_tx = LibroTransacciones(**tx_in.dict(exclude={"etiquetas"}))
+        db_tx.fecha_actualizacion = now
+        if not db_tx.fecha_transaccion:
+            db_tx.fecha_transaccion = now
+        dedup_service.stamp(db_tx)
+        nuevas.append((idx, db_tx, tx_in.etiquetas))
+
+    if not permitir_duplicados:
+        existentes = dedup_service.find_existing(session, [tx.huella_duplicado for _, tx, _ in nuevas])
+        vistas = set()
+        filtradas = []
+        for idx, db_tx, etiquetas in nuevas:
+            huella = db_tx.huella_duplicado
+            if huella in existentes:
+                errores.append({"indice": idx, "error": "Transacción duplicada", "id_existente": existentes[huella]})
+            elif huella in vistas:
+                errores.append({"indice": idx, "error": "Transacción duplicada dentro del lote"})
+            else:
+                vistas.add(huella)
+                filtradas.append((idx, db_tx, etiquetas))
+        nuevas = filtradas
+
+    session.add_all([db_tx for _, db_tx, _ in nuevas])
     session.flush()
-    
-    # Log creation
-    audit_service.log(session, current_user.id_usuario, "CREATE", "Transaccion", db_tx.id_transaccion, tx_in.dict(exclude={"divisiones", "etiquetas"}))
-    
-    # Gestionar Etiquetas (M:N)
-    tags = []
-    if tx_in.etiquetas:
-        for tag_id in tx_in.etiquetas:
+    for _, db_tx, etiquetas in nuevas:
+        for tag_id in etiquetas:
             session.add(TransaccionEtiqueta(id_transaccion=db_tx.id_transaccion, id_etiqueta=tag_id))
-            tags.append(tag_id)
-    
-    if tx_in.es_dividida and tx_in.divisiones:
-        for split in tx_in.divisiones:
-            db_split = TransaccionDividida(
-                id_transaccion=db_tx.id_transaccion,
-                id_categoria=split.id_categoria,
-                monto_division=split.monto_division,
-                notas=split.notas
-            )
-            session.add(db_split)
-    
-    # UN SOLO COMMIT AL FINAL
+        # Hooks al outbox, en la misma transacción que las filas
+        outbox_service.enqueue(session, "transaction_created", transaction=db_tx, user=current_user)
+    audit_service.log(session, current_user.id_usuario, "CREATE", "Transaccion", None,
+                      {"lote": [db_tx.id_transaccion for _, db_tx, _ in nuevas]}, en_transaccion=True)
     session.commit()
-    session.refresh(db_tx)
-    
-    # Disparar hook de plugin
-    await plugin_manager.call_hook(
-        "transaction_created",
-        transaction=db_tx,
-        user=current_user
+    outbox_service.notify()
+
+    return BulkOperationResponse(
+        success_count=len(nuevas),
+        error_count=len(errores),
+        errors=errores or None
     )
+
+@router.post("/", response_model=TransaccionLectura)
+async def crear_transaccion(
+    tx_in: TransaccionComplejaCrear, 
+    permitir_duplicado: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    def _crear(session: Session) -> TransaccionLectura:
+        cuenta_origen = session.get(ListaCuentas, tx_in.id_cuenta)
+        if not cuenta_origen:
+            raise HTTPException(status_code=404, detail="Cuenta de origen no encontrada")
+        
+        tx_data = tx_in.dict(exclude={"divisiones", "etiquetas"})
+        db_tx = LibroTransacciones(**tx_data)
+        db_tx.fecha_actualizacion = datetime.utcnow().isoformat()
+        if not db_tx.fecha_transaccion:
+            db_tx.fecha_transaccion = datetime.utcnow().isoformat()
+
+        dedup_service.stamp(db_tx)
+        if not permitir_duplicado:
+            existente = dedup_service.find_duplicate(session, db_tx)
+            if existente:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Transacción duplicada: ya existe el movimiento #{existente}. Use permitir_duplicado=true para registrarla igualmente"
+                )
+            
+        session.add(db_tx)
+        # Flush to get the ID without committing yet
+        session.flush()
+        
+        # Log creation (se confirma con el commit final, no antes de etiquetas y divisiones)
+        audit_service.log(session, current_user.id_usuario, "CREATE", "Transaccion", db_tx.id_transaccion,
+                          tx_in.dict(exclude={"divisiones", "etiquetas"}), en_transaccion=True)
+        
+        # Gestionar Etiquetas (M:N)
+        tags = []
+        if tx_in.etiquetas:
+            for tag_id in tx_in.etiquetas:
+                session.add(TransaccionEtiqueta(id_transaccion=db_tx.id_transaccion, id_etiqueta=tag_id))
+                tags.append(tag_id)
+        
+        if tx_in.es_dividida and tx_in.divisiones:
+            for split in tx_in.divisiones:
+                db_split = TransaccionDividida(
+                    id_transaccion=db_tx.id_transaccion,
+                    id_categoria=split.id_categoria,
+                    monto_division=split.monto_division,
+                    notas=split.notas
+                )
+                session.add(db_split)
+        
+        # Hook de plugins vía outbox: se confirma junto con la transacción
+        outbox_service.enqueue(session, "transaction_created", transaction=db_tx, user=current_user)
+        
+        # UN SOLO COMMIT AL FINAL
+        session.commit()
+        session.refresh(db_tx)
+        return _enriquecer_rapido(db_tx, tags)
+
+    # Los servicios son síncronos: corren sobre el driver async sin bloquear el event loop
+    tx_lectura = await session.run_sync(_crear)
+    outbox_service.notify()
     
     # Notify about high value transaction (post-commit)
-    if db_tx.monto_transaccion >= 1000:
+    if tx_lectura.monto_transaccion >= 1000:
         from ..notifications.router import notify_info
         await notify_info(
             user_id=current_user.id_usuario,
             title="Transacción Elevada",
-            message=f"Se ha registrado una transacción de {db_tx.monto_transaccion} en la cuenta.",
+            message=f"Se ha registrado una transacción de {tx_lectura.monto_transaccion} en la cuenta.",
             session=session
         )
-        
-    return _enriquecer_rapido(db_tx, tags)
+    
+    return tx_lectura
 
 @router.delete("/{tx_id}")
 async def eliminar_transaccion(
     tx_id: int, 
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Elimina una transacción y sus dependencias (divisiones, etiquetas)"""
-    db_tx = session.get(LibroTransacciones, tx_id)
-    if not db_tx:
-        raise HTTPException(status_code=404, detail="Transacción no encontrada")
-    
-    # Log deletion
-    audit_service.log(session, current_user.id_usuario, "DELETE", "Transaccion", tx_id, {"monto": float(db_tx.monto_transaccion)})
-    
-    session.delete(db_tx)
-    session.commit()
+    def _eliminar(session: Session):
+        db_tx = session.get(LibroTransacciones, tx_id)
+        if not db_tx:
+            raise HTTPException(status_code=404, detail="Transacción no encontrada")
+        
+        # Log deletion
+        audit_service.log(session, current_user.id_usuario, "DELETE", "Transaccion", tx_id, {"monto": float(db_tx.monto_transaccion)},
+                          en_transaccion=True)
+        
+        # Las cascadas cargan relaciones: se resuelven en el contexto síncrono
+        session.delete(db_tx)
+        session.commit()
+
+    await session.run_sync(_eliminar)
     
     # Notify about deletion
     from ..notifications.router import notify_warning
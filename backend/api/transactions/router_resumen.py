@@ -1,31 +1,24 @@
 from fastapi import APIRouter, Depends, Query
 from sqlmodel import Session, select, func
-from ...core.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ...core.database import get_async_session
 from ...models.models import LibroTransacciones, ListaCuentas, Usuario, Presupuesto
 from ...models.models_config import AnioPresupuesto, Configuracion
 from ..auth.deps import get_current_user
 from decimal import Decimal
 from datetime import datetime
+from typing import Tuple, Union
+import logging
 
 from ...core.wealth_service import wealth_service
 from ...core.fx_service import fx_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/resumen", tags=["Resumen"])
 
-@router.get("/")
-async def obtener_resumen_financiero(
-    currency: str = Query("ARS"),
-    session: Session = Depends(get_session),
-    current_user: Usuario = Depends(get_current_user)
-):
-    """
-    Calcula el patrimonio neto integral y flujos del mes.
-    """
-    wealth = await wealth_service.calculate_total_wealth(session, current_user.id_usuario, currency)
-    
-    # Movimientos del mes actual (Flujo de Caja siempre en ARS para consistencia de registros)
-    # pero podríamos convertirlo opcionalmente en el futuro.
-    hoy = datetime.utcnow()
+def _flujos_mes(session: Session, hoy: datetime) -> Tuple[Decimal, Decimal, Decimal]:
+    """Ingresos, gastos y presupuesto del mes (consultas sync; con AsyncSession vía run_sync)."""
     primer_dia_mes = datetime(hoy.year, hoy.month, 1).isoformat()
     
     try:
@@ -39,17 +32,39 @@ async def obtener_resumen_financiero(
             LibroTransacciones.fecha_transaccion >= primer_dia_mes
         )).one()
     except Exception as e:
+        logger.error(f"Error calculando flujos del mes: {e}")
         ingresos = Decimal("0.0")
         gastos = Decimal("0.0")
 
     # --- Presupuesto del Mes ---
-    current_year = hoy.year
     try:
         budget_query = select(func.coalesce(func.sum(Presupuesto.monto), 0)).join(AnioPresupuesto)\
-            .where(AnioPresupuesto.anio == current_year, Presupuesto.activo == 1)
+            .where(AnioPresupuesto.anio == hoy.year, Presupuesto.activo == 1)
         presupuesto_mensual = session.exec(budget_query).one()
-    except:
+    except Exception as e:
+        logger.error(f"Error calculando presupuesto del mes: {e}")
         presupuesto_mensual = Decimal("0.00")
+    return ingresos, gastos, presupuesto_mensual
+
+@router.get("/")
+async def obtener_resumen_financiero(
+    currency: str = Query("ARS"),
+    session: Union[AsyncSession, Session] = Depends(get_async_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Calcula el patrimonio neto integral y flujos del mes.
+    """
+    wealth = await wealth_service.calculate_total_wealth(session, current_user.id_usuario, currency)
+    
+    # Movimientos del mes actual (Flujo de Caja siempre en ARS para consistencia de registros)
+    # pero podríamos convertirlo opcionalmente en el futuro.
+    hoy = datetime.utcnow()
+    # Admite Session o AsyncSession (p. ej. /wealth/savings-rate reutiliza este endpoint)
+    if isinstance(session, AsyncSession):
+        ingresos, gastos, presupuesto_mensual = await session.run_sync(_flujos_mes, hoy)
+    else:
+        ingresos, gastos, presupuesto_mensual = _flujos_mes(session, hoy)
     presupuesto_revalued = fx_service.convert(presupuesto_mensual, "ARS", currency, wealth["rates"])
 
     # Conversión de flujos del mes
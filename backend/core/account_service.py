@@ -0,0 +1,28 @@
+"""
+Account balances shared by savings goals and statement reconciliation.
+"""
+from decimal import Decimal
+
+from sqlmodel import Session, func, select
+
+from ..models.models import LibroTransacciones, ListaCuentas
+
+
+class AccountService:
+    @staticmethod
+    def calculate_balance(session: Session, id_cuenta: int) -> Decimal:
+        """Current balance of an account: saldo_inicial + sum of non-deleted transactions."""
+        account = session.get(ListaCuentas, id_cuenta)
+        if not account:
+            return Decimal(0)
+
+        result = session.exec(
+            select(func.coalesce(func.sum(LibroTransacciones.monto_transaccion), 0))
+            .where(LibroTransacciones.id_cuenta == id_cuenta)
+            .where(LibroTransacciones.fecha_eliminacion == None)
+        ).one()
+
+        return account.saldo_inicial + Decimal(str(result))
+
+
+account_service = AccountService()
@@ -0,0 +1,278 @@
+"""
+Cold storage for the audit trail.
+
+``rollover`` moves entries older than ``AUDIT_HOT_DAYS`` out of ``audit_logs``
+into gzip-compressed JSONL segments (one or more per month) and records each
+segment in a small JSON index with its id/date range and the users, actions and
+entities it contains. ``query`` pages hot and cold entries together, newest
+first, with an ``id_log`` cursor; the index lets it skip segments that cannot
+match the filters without decompressing them.
+
+Each segment is a sequence of independent gzip members of ``block_size`` rows
+(still readable as one gzip stream). A ``.idx`` sidecar stores the id range and
+byte offset of every block, so a page reads only the newest blocks it needs
+instead of decompressing the whole segment.
+
+A segment is written and indexed as 'pendiente' before its rows are deleted
+from the database, and marked 'completo' afterwards, so a crash in between is
+finished by the next rollover instead of archiving the rows twice.
+"""
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from .config import settings
+from ..models.models_audit import AuditLog
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+SIDECAR_SUFFIX = ".idx"
+DELETE_CHUNK = 900
+
+
+def _row_to_dict(row: AuditLog) -> Dict[str, Any]:
+    data = row.model_dump()
+    data["fecha"] = row.fecha.isoformat()
+    return data
+
+
+def _dict_to_row(data: Dict[str, Any]) -> AuditLog:
+    return AuditLog(**{**data, "fecha": datetime.fromisoformat(data["fecha"])})
+
+
+class AuditArchive:
+    """
+    Args:
+        archive_dir: Directory holding the segments and their index.
+        hot_days: Entries newer than this stay in the database.
+        segment_size: Maximum entries per segment file.
+        block_size: Entries per independently compressed block of a segment.
+    """
+
+    def __init__(
+        self,
+        archive_dir: str = settings.AUDIT_ARCHIVE_DIR,
+        hot_days: int = settings.AUDIT_HOT_DAYS,
+        segment_size: int = 50000,
+        block_size: int = 1000
+    ):
+        self.archive_dir = Path(archive_dir)
+        self.hot_days = hot_days
+        self.segment_size = segment_size
+        self.block_size = block_size
+
+    # --- Index ---
+
+    def _load_index(self) -> List[Dict[str, Any]]:
+        path = self.archive_dir / INDEX_FILE
+        if not path.exists():
+            return []
+        return json.loads(path.read_text(encoding="utf-8"))["segments"]
+
+    def _save_index(self, segments: List[Dict[str, Any]]):
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.archive_dir / f"{INDEX_FILE}.tmp"
+        tmp.write_text(json.dumps({"segments": segments}, indent=1), encoding="utf-8")
+        os.replace(tmp, self.archive_dir / INDEX_FILE)
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """Indexed segments (newest first)."""
+        return sorted(self._load_index(), key=lambda s: s["max_id"], reverse=True)
+
+    # --- Rollover ---
+
+    def _delete_ids(self, session: Session, ids: List[int]):
+        for i in range(0, len(ids), DELETE_CHUNK):
+            session.execute(delete(AuditLog).where(AuditLog.id_log.in_(ids[i:i + DELETE_CHUNK])))
+        session.commit()
+
+    def _finish_pending(self, session: Session, index: List[Dict[str, Any]]):
+        """Delete the rows of segments written by a rollover that did not complete."""
+        for segment in index:
+            if segment["estado"] != "pendiente":
+                continue
+            ids = [row["id_log"] for row in self._read_segment(segment)]
+            self._delete_ids(session, ids)
+            segment["estado"] = "completo"
+            self._save_index(index)
+
+    def _write_segment(self, month: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        name = f"audit-{month}-{rows[0]['id_log']}-{rows[-1]['id_log']}.jsonl.gz"
+        tmp = self.archive_dir / f"{name}.tmp"
+        blocks = []
+        with open(tmp, "wb") as f:
+            for i in range(0, len(rows), self.block_size):
+                block = rows[i:i + self.block_size]
+                data = gzip.compress("".join(json.dumps(row) + "\n" for row in block).encode("utf-8"))
+                blocks.append({
+                    "min_id": block[0]["id_log"], "max_id": block[-1]["id_log"],
+                    "offset": f.tell(), "length": len(data)
+                })
+                f.write(data)
+        sidecar_tmp = self.archive_dir / f"{name}{SIDECAR_SUFFIX}.tmp"
+        sidecar_tmp.write_text(json.dumps(blocks), encoding="utf-8")
+        os.replace(sidecar_tmp, self.archive_dir / f"{name}{SIDECAR_SUFFIX}")
+        os.replace(tmp, self.archive_dir / name)
+        return {
+            "archivo": name,
+            "mes": month,
+            "min_id": rows[0]["id_log"],
+            "max_id": rows[-1]["id_log"],
+            "desde": min(r["fecha"] for r in rows),
+            "hasta": max(r["fecha"] for r in rows),
+            "filas": len(rows),
+            "usuarios": sorted({r["id_usuario"] for r in rows}),
+            "acciones": sorted({r["accion"] for r in rows}),
+            "entidades": sorted({r["entidad"] for r in rows}),
+            "estado": "pendiente"
+        }
+
+    def rollover(self, session: Session, older_than: Optional[timedelta] = None) -> int:
+        """Move entries older than the hot window to compressed segments. Returns entries moved."""
+        cutoff = datetime.utcnow() - (older_than if older_than is not None else timedelta(days=self.hot_days))
+        index = self._load_index()
+        self._finish_pending(session, index)
+
+        # The newest row always stays hot: on tables without AUTOINCREMENT (SQLite
+        # created before it was declared, MySQL < 8 after a restart) an empty
+        # audit_logs would reuse archived ids and break the id_log cursor
+        newest_id = session.exec(select(func.max(AuditLog.id_log))).one()
+        if newest_id is None:
+            return 0
+
+        moved = 0
+        while True:
+            # Plain dicts: ORM rows expire on the commits below
+            rows = [_row_to_dict(row) for row in session.exec(
+                select(AuditLog)
+                .where(AuditLog.fecha < cutoff)
+                .where(AuditLog.id_log < newest_id)
+                .order_by(AuditLog.id_log)
+                .limit(self.segment_size)
+            ).all()]
+            if not rows:
+                break
+
+            by_month: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rows:
+                by_month.setdefault(row["fecha"][:7], []).append(row)
+
+            for month, month_rows in sorted(by_month.items()):
+                segment = self._write_segment(month, month_rows)
+                index.append(segment)
+                self._save_index(index)
+                self._delete_ids(session, [r["id_log"] for r in month_rows])
+                segment["estado"] = "completo"
+                self._save_index(index)
+                moved += len(month_rows)
+                logger.info(f"Audit archive: {len(month_rows)} entries of {month} -> {segment['archivo']}")
+        return moved
+
+    # --- Query ---
+
+    def _read_segment(self, segment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        with gzip.open(self.archive_dir / segment["archivo"], "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _read_blocks(self, segment: Dict[str, Any], cursor: Optional[int]) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """(max_id, rows) per block below ``cursor``, newest first; without a sidecar the segment is one block."""
+        sidecar = self.archive_dir / f"{segment['archivo']}{SIDECAR_SUFFIX}"
+        if not sidecar.exists():
+            yield segment["max_id"], list(self._read_segment(segment))
+            return
+        blocks = json.loads(sidecar.read_text(encoding="utf-8"))
+        with open(self.archive_dir / segment["archivo"], "rb") as f:
+            for block in reversed(blocks):
+                if cursor is not None and block["min_id"] >= cursor:
+                    continue
+                f.seek(block["offset"])
+                lines = gzip.decompress(f.read(block["length"])).decode("utf-8").splitlines()
+                yield block["max_id"], [json.loads(line) for line in lines if line.strip()]
+
+    @staticmethod
+    def _segment_may_match(segment: Dict[str, Any], filters: Dict[str, Any], cursor: Optional[int],
+                           desde: Optional[datetime], hasta: Optional[datetime]) -> bool:
+        if cursor is not None and segment["min_id"] >= cursor:
+            return False
+        if filters.get("id_usuario") is not None and filters["id_usuario"] not in segment["usuarios"]:
+            return False
+        if filters.get("accion") and filters["accion"] not in segment["acciones"]:
+            return False
+        if filters.get("entidad") and filters["entidad"] not in segment["entidades"]:
+            return False
+        if desde and datetime.fromisoformat(segment["hasta"]) < desde:
+            return False
+        if hasta and datetime.fromisoformat(segment["desde"]) > hasta:
+            return False
+        return True
+
+    @staticmethod
+    def _row_matches(row: Dict[str, Any], filters: Dict[str, Any], cursor: Optional[int],
+                     desde: Optional[datetime], hasta: Optional[datetime]) -> bool:
+        if cursor is not None and row["id_log"] >= cursor:
+            return False
+        for attr, value in filters.items():
+            if value is not None and value != "" and row.get(attr) != value:
+                return False
+        fecha = datetime.fromisoformat(row["fecha"])
+        return (desde is None or fecha >= desde) and (hasta is None or fecha <= hasta)
+
+    def query(
+        self,
+        session: Session,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+        filters: Optional[Dict[str, Any]] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None
+    ) -> Tuple[List[AuditLog], Optional[int]]:
+        """
+        Newest-first page of entries with ``id_log < cursor`` from hot and cold storage.
+        Returns the page and the cursor for the next one (None on the last page).
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v is not None and v != ""}
+
+        statement = select(AuditLog)
+        for attr, value in filters.items():
+            statement = statement.where(getattr(AuditLog, attr) == value)
+        if cursor is not None:
+            statement = statement.where(AuditLog.id_log < cursor)
+        if desde:
+            statement = statement.where(AuditLog.fecha >= desde)
+        if hasta:
+            statement = statement.where(AuditLog.fecha <= hasta)
+        candidates = list(session.exec(statement.order_by(AuditLog.id_log.desc()).limit(limit + 1)).all())
+
+        # Cold segments (and their blocks) only matter while they can still beat the worst candidate
+        for segment in self.segments():
+            if len(candidates) > limit and segment["max_id"] < candidates[limit].id_log:
+                break
+            if segment["estado"] != "completo" or not self._segment_may_match(segment, filters, cursor, desde, hasta):
+                continue
+            for max_id, rows in self._read_blocks(segment, cursor):
+                if len(candidates) > limit and max_id < candidates[limit].id_log:
+                    break
+                candidates.extend(
+                    _dict_to_row(row) for row in rows
+                    if self._row_matches(row, filters, cursor, desde, hasta)
+                )
+                candidates.sort(key=lambda r: r.id_log, reverse=True)
+                del candidates[limit + 1:]
+
+        page = candidates[:limit]
+        next_cursor = page[-1].id_log if len(candidates) > limit else None
+        return page, next_cursor
+
+
+audit_archive = AuditArchive()
@@ -1,8 +1,25 @@
+"""
+Audit trail writer.
+
+Entries are either added to the caller's session (``en_transaccion=True``), so
+they are committed together with the audited change in a single commit, or
+queued in an in-process buffer that a background task flushes with one bulk
+INSERT per batch. If a flush fails the batch is appended to a JSONL spool file
+and replayed on the next successful flush, so entries survive a database outage
+or a restart. Without a running writer (scripts, tests) entries are written
+synchronously as before.
+"""
+import asyncio
 import json
 import logging
+import threading
 from datetime import datetime
-from typing import Optional, Any, Dict
+from pathlib import Path
+from typing import Optional, Any, Callable, Dict, List
+from sqlalchemy import insert
 from sqlmodel import Session
+from .config import settings
+from .database import engine
 from ..models.models_audit import AuditLog
 
 from decimal import Decimal
@@ -16,44 +33,183 @@ class DecimalEncoder(json.JSONEncoder):
         return super(DecimalEncoder, self).default(obj)
 
 class AuditService:
+    """
+    Args:
+        session_factory: Callable returning a new Session for background flushes.
+        batch_size: Buffered entries that trigger an immediate flush.
+        flush_interval: Seconds between periodic flushes.
+        spool_path: JSONL file holding entries whose flush failed.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        batch_size: int = settings.AUDIT_BATCH_SIZE,
+        flush_interval: float = settings.AUDIT_FLUSH_INTERVAL,
+        spool_path: str = settings.AUDIT_SPOOL_PATH
+    ):
+        self.session_factory = session_factory or (lambda: Session(engine))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = Path(spool_path)
+        self._buffer: List[Dict[str, Any]] = []
+        # log() can run in the threadpool (sync endpoints) while the writer flushes
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
     @staticmethod
+    def _build_row(
+        user_id: int,
+        accion: str,
+        entidad: str,
+        id_entidad: Optional[int],
+        detalles: Optional[Dict[str, Any]],
+        ip_address: Optional[str]
+    ) -> Dict[str, Any]:
+        # Safely serialize details handling Decimal objects
+        detalles_json = "{}"
+        if detalles:
+            try:
+                detalles_json = json.dumps(detalles, cls=DecimalEncoder)
+            except Exception as json_err:
+                logger.warning(f"Failed to serialize audit details, falling back to str(): {json_err}")
+                detalles_json = json.dumps({k: str(v) for k, v in detalles.items()})
+        return {
+            "fecha": datetime.utcnow(),
+            "id_usuario": user_id,
+            "accion": accion,
+            "entidad": entidad,
+            "id_entidad": id_entidad,
+            "detalles": detalles_json,
+            "ip_address": ip_address
+        }
+
     def log(
+        self,
         session: Session,
         user_id: int,
         accion: str,
         entidad: str,
         id_entidad: Optional[int] = None,
         detalles: Optional[Dict[str, Any]] = None,
-        ip_address: Optional[str] = None
+        ip_address: Optional[str] = None,
+        en_transaccion: bool = False
     ):
         """
         Records an event in the audit trail.
+        With ``en_transaccion`` the entry is only added to ``session`` and is
+        committed (or rolled back) by the caller together with the audited change.
         """
         try:
-            # Safely serialize details handling Decimal objects
-            detalles_json = "{}"
-            if detalles:
-                try:
-                    detalles_json = json.dumps(detalles, cls=DecimalEncoder)
-                except Exception as json_err:
-                    logger.warning(f"Failed to serialize audit details, falling back to str(): {json_err}")
-                    detalles_json = json.dumps({k: str(v) for k, v in detalles.items()})
-
-            log_entry = AuditLog(
-                fecha=datetime.utcnow(),
-                id_usuario=user_id,
-                accion=accion,
-                entidad=entidad,
-                id_entidad=id_entidad,
-                detalles=detalles_json,
-                ip_address=ip_address
-            )
-            session.add(log_entry)
-            session.commit()
+            row = self._build_row(user_id, accion, entidad, id_entidad, detalles, ip_address)
+            if en_transaccion:
+                session.add(AuditLog(**row))
+            elif self.running:
+                self._enqueue(row)
+            else:
+                session.add(AuditLog(**row))
+                session.commit()
             logger.info(f"Audit: User {user_id} performed {accion} on {entidad} ({id_entidad})")
         except Exception as e:
             logger.error(f"Failed to record audit log: {e}")
-            # We don't want to crash the main request if auditing fails, 
+            # We don't want to crash the main request if auditing fails,
             # but we should log it.
 
+    # --- Background writer ---
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _enqueue(self, row: Dict[str, Any]):
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _read_spool(self) -> List[Dict[str, Any]]:
+        if not self.spool_path.exists():
+            return []
+        rows = []
+        with self.spool_path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    row["fecha"] = datetime.fromisoformat(row["fecha"])
+                    rows.append(row)
+        return rows
+
+    def _write_spool(self, rows: List[Dict[str, Any]]):
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.spool_path.open("a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({**row, "fecha": row["fecha"].isoformat()}) + "\n")
+
+    def flush(self) -> int:
+        """
+        Write buffered (and previously spooled) entries with one bulk INSERT.
+        On failure the new entries are spooled to disk. Returns entries written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            try:
+                spooled = self._read_spool()
+            except Exception as e:
+                logger.error(f"Audit spool unreadable ({self.spool_path}): {e}")
+                spooled = []
+            batch = spooled + rows
+            if not batch:
+                return 0
+            try:
+                with self.session_factory() as session:
+                    session.execute(insert(AuditLog), batch)
+                    session.commit()
+            except Exception as e:
+                logger.error(f"Audit flush of {len(batch)} entries failed, spooling to disk: {e}")
+                self._write_spool(rows)
+                return 0
+            if spooled:
+                self.spool_path.unlink(missing_ok=True)
+                logger.info(f"Audit: {len(spooled)} spooled entries recovered")
+            return len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                # Keep the event loop free while the INSERT runs
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Audit writer error: {e}")
+
+    def start(self):
+        """Start the background writer on the running event loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Audit writer started")
+
+    async def stop(self):
+        """Stop the writer and flush what is left (spooled if the DB is unavailable)."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        await asyncio.to_thread(self.flush)
+
 audit_service = AuditService()
@@ -1,9 +1,15 @@
+import asyncio
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from ..core.config import settings
 
+# Dedicated pool: bcrypt releases the GIL, so hashes run in parallel without
+# blocking the event loop, and at most PASSWORD_HASH_WORKERS run at once.
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain text password against a bcrypt hash.
@@ -17,15 +23,38 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         return False
 
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
     """
-    Generate a bcrypt hash from a plain text password.
+    Generate a bcrypt hash from a plain text password (cost: BCRYPT_ROUNDS).
     """
     if isinstance(password, str):
         password = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds or settings.BCRYPT_ROUNDS)
     return bcrypt.hashpw(password, salt).decode('utf-8')
 
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    True if the hash was made with a different cost than BCRYPT_ROUNDS.
+    """
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password on the bcrypt pool (for async endpoints).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    get_password_hash on the bcrypt pool (for async endpoints).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a new JWT access token.
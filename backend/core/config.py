@@ -22,6 +22,19 @@ class Settings(BaseSettings):
         ...,
         description="Database connection string (Required)"
     )
+    READ_REPLICA_URL: Optional[str] = Field(default=None, description="Read replica for reporting endpoints (same formats as DATABASE_URL)")
+    READ_REPLICA_MAX_LAG: float = Field(default=5.0, ge=0, description="Seconds of replication lag tolerated before reads go to the primary")
+    READ_REPLICA_CHECK_INTERVAL: float = Field(default=10.0, gt=0, description="Seconds between read replica lag checks")
+    
+    # SQLite tuning (ignored for PostgreSQL/MySQL)
+    SQLITE_TUNING: bool = Field(default=True, description="Apply the SQLite production PRAGMA profile on every connection")
+    SQLITE_JOURNAL_MODE: str = Field(default="WAL", description="journal_mode PRAGMA (WAL lets readers run while a write is in progress)")
+    SQLITE_SYNCHRONOUS: str = Field(default="NORMAL", description="synchronous PRAGMA (NORMAL is safe with WAL)")
+    SQLITE_MMAP_SIZE: int = Field(default=268435456, ge=0, description="mmap_size PRAGMA in bytes (0 disables memory-mapped I/O)")
+    SQLITE_CACHE_SIZE: int = Field(default=-65536, description="cache_size PRAGMA (negative = KiB, i.e. -65536 is 64 MB)")
+    SQLITE_BUSY_TIMEOUT: int = Field(default=5000, ge=0, description="busy_timeout PRAGMA: ms to wait for a lock before failing")
+    SQLITE_TEMP_STORE: str = Field(default="MEMORY", description="temp_store PRAGMA: DEFAULT, FILE or MEMORY")
+    SQLITE_POOL_SIZE: int = Field(default=5, gt=0, description="Pooled SQLite connections (same again as overflow)")
     
     # JWT Configuration
     SECRET_KEY: str = Field(
@@ -40,6 +53,55 @@ class Settings(BaseSettings):
     
     # Security    
     RATE_LIMIT_PER_MINUTE: int = Field(default=100, gt=0, description="Rate limit per IP per minute")
+    RATE_LIMIT_STORAGE: str = Field(default="auto", description="Rate limit / CSRF token storage: auto (redis if REDIS_URL, else database), redis, database or memory")
+    RATE_LIMIT_MAX_KEYS: int = Field(default=10000, gt=0, description="Max counters / CSRF tokens kept by the memory storage")
+    RATE_LIMIT_PURGE_INTERVAL: int = Field(default=10, gt=0, description="Minutes between purges of expired counters and CSRF tokens")
+    BCRYPT_ROUNDS: int = Field(default=12, ge=4, le=16, description="bcrypt work factor; existing hashes are upgraded on login")
+    PASSWORD_HASH_WORKERS: int = Field(default=4, gt=0, description="Threads dedicated to bcrypt hashing / verification")
+    AUTH_USER_CACHE_TTL: float = Field(default=60.0, gt=0, description="Seconds an authenticated user snapshot is cached")
+    AUTH_USER_CACHE_SIZE: int = Field(default=1024, gt=0, description="Max users / tokens kept in the auth cache")
+    
+    # Plugins
+    PLUGIN_HOOK_TIMEOUT: float = Field(default=5.0, gt=0, description="Max seconds a plugin may spend handling one hook")
+    PLUGIN_HOOK_CONCURRENCY: int = Field(default=8, gt=0, description="Max plugin handlers running at once per hook dispatch")
+    PLUGIN_BREAKER_THRESHOLD: int = Field(default=5, gt=0, description="Consecutive plugin errors/timeouts that open its circuit breaker")
+    PLUGIN_BREAKER_COOLDOWN: float = Field(default=60.0, gt=0, description="Seconds a plugin's circuit stays open before a trial call")
+    PLUGIN_LAZY_LOADING: bool = Field(default=True, description="Import plugins on the first fire of a subscribed hook instead of at startup")
+    PLUGIN_WARMUP: bool = Field(default=False, description="Load lazy plugins in the background once the server is up")
+    PLUGIN_WARMUP_DELAY: float = Field(default=2.0, ge=0, description="Seconds to wait after startup before the background warm-up")
+    
+    # Outbound HTTP (shared client pool)
+    HTTP_TIMEOUT: float = Field(default=10.0, gt=0, description="Default timeout for outbound HTTP requests (seconds)")
+    HTTP_MAX_CONNECTIONS: int = Field(default=100, gt=0, description="Size of the shared HTTP connection pool")
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = Field(default=10, gt=0, description="Max concurrent requests to one host")
+    HTTP_RETRIES: int = Field(default=2, ge=0, description="Retries for idempotent requests on network errors / 5xx")
+    
+    # Real-time notifications (SSE fan-out)
+    NOTIFICATIONS_BACKEND: str = Field(default="memory", description="SSE fan-out backend: memory (single worker) or redis (multi-worker)")
+    REDIS_URL: Optional[str] = Field(default=None, description="Redis URL, e.g. redis://localhost:6379/0")
+    NOTIFICATION_BUFFER_SIZE: int = Field(default=100, gt=0, description="Max queued notifications per SSE connection")
+    NOTIFICATION_RETENTION_DAYS: int = Field(default=90, gt=0, description="Days read notifications are kept before the nightly purge")
+    
+    # Audit trail writer
+    AUDIT_BATCH_SIZE: int = Field(default=200, gt=0, description="Buffered audit entries that trigger a bulk insert")
+    AUDIT_FLUSH_INTERVAL: float = Field(default=1.0, gt=0, description="Seconds between background audit flushes")
+    AUDIT_SPOOL_PATH: str = Field(default="logs/audit_spool.jsonl", description="File holding audit entries whose flush failed")
+    AUDIT_HOT_DAYS: int = Field(default=90, gt=0, description="Days audit entries stay in the database before moving to cold storage")
+    AUDIT_ARCHIVE_DIR: str = Field(default="logs/audit_archive", description="Directory of compressed audit segments")
+    
+    # SQL instrumentation
+    SLOW_QUERY_MS: float = Field(default=200.0, gt=0, description="Statements slower than this (ms) are logged, parameters redacted")
+    QUERY_COUNT_WARN: int = Field(default=50, gt=0, description="Requests running more statements than this are logged as possible N+1")
+    
+    # Prometheus metrics
+    METRICS_TOKEN: Optional[str] = Field(default=None, description="Bearer token required to scrape /metrics (open when unset)")
+    
+    # OpenTelemetry tracing
+    TRACING_ENABLED: bool = Field(default=False, description="Record spans for requests, SQL, outgoing HTTP, plugin hooks and scheduler jobs")
+    TRACING_EXPORTER: str = Field(default="console", description="Span exporter: console or otlp")
+    TRACING_OTLP_ENDPOINT: str = Field(default="http://localhost:4318/v1/traces", description="OTLP/HTTP traces endpoint (collector, Jaeger, Tempo)")
+    TRACING_SAMPLE_RATIO: float = Field(default=1.0, ge=0, le=1, description="Fraction of new traces sampled (incoming traceparent decisions are kept)")
+    TRACING_SERVICE_NAME: str = Field(default="3f-backend", description="service.name reported on every span")
     
     # Application
     ENVIRONMENT: str = Field(default="development", description="Environment: development, staging, production")
@@ -48,16 +110,48 @@ class Settings(BaseSettings):
     # API Keys (Optional)
     GOOGLE_AI_API_KEY: Optional[str] = Field(default=None, description="Google Gemini API key for AI features")
     
-    @validator("DATABASE_URL")
+    @validator("DATABASE_URL", "READ_REPLICA_URL")
     def validate_database_url(cls, v):
         """Validate database URL format"""
         allowed_prefixes = ("sqlite:///", "postgresql://", "mysql://", "mysql+pymysql://")
-        if not v.startswith(allowed_prefixes):
+        if v is not None and not v.startswith(allowed_prefixes):
             raise ValueError(
                 f"Invalid database URL. Must start with one of: {allowed_prefixes}"
             )
         return v
     
+    @validator("SQLITE_JOURNAL_MODE")
+    def validate_sqlite_journal_mode(cls, v):
+        """Validate SQLite journal mode (interpolated into a PRAGMA)"""
+        allowed = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+        if v.upper() not in allowed:
+            raise ValueError(f"SQLITE_JOURNAL_MODE must be one of: {allowed}")
+        return v.upper()
+    
+    @validator("SQLITE_SYNCHRONOUS")
+    def validate_sqlite_synchronous(cls, v):
+        """Validate SQLite synchronous level (interpolated into a PRAGMA)"""
+        allowed = ("OFF", "NORMAL", "FULL", "EXTRA")
+        if v.upper() not in allowed:
+            raise ValueError(f"SQLITE_SYNCHRONOUS must be one of: {allowed}")
+        return v.upper()
+    
+    @validator("SQLITE_TEMP_STORE")
+    def validate_sqlite_temp_store(cls, v):
+        """Validate SQLite temp store (interpolated into a PRAGMA)"""
+        allowed = ("DEFAULT", "FILE", "MEMORY")
+        if v.upper() not in allowed:
+            raise ValueError(f"SQLITE_TEMP_STORE must be one of: {allowed}")
+        return v.upper()
+    
+    @validator("TRACING_EXPORTER")
+    def validate_tracing_exporter(cls, v):
+        """Validate span exporter"""
+        allowed = ("console", "otlp")
+        if v.lower() not in allowed:
+            raise ValueError(f"TRACING_EXPORTER must be one of: {allowed}")
+        return v.lower()
+    
     @validator("ENVIRONMENT")
     def validate_environment(cls, v):
         """Validate environment value"""
@@ -66,6 +160,22 @@ class Settings(BaseSettings):
             raise ValueError(f"ENVIRONMENT must be one of: {allowed}")
         return v
     
+    @validator("NOTIFICATIONS_BACKEND")
+    def validate_notifications_backend(cls, v):
+        """Validate SSE fan-out backend"""
+        allowed = ("memory", "redis")
+        if v not in allowed:
+            raise ValueError(f"NOTIFICATIONS_BACKEND must be one of: {allowed}")
+        return v
+    
+    @validator("RATE_LIMIT_STORAGE")
+    def validate_rate_limit_storage(cls, v):
+        """Validate rate limiter storage backend"""
+        allowed = ("auto", "redis", "database", "memory")
+        if v not in allowed:
+            raise ValueError(f"RATE_LIMIT_STORAGE must be one of: {allowed}")
+        return v
+    
     @validator("SECRET_KEY")
     def validate_secret_key(cls, v):
         """Ensure secret key is strong enough"""
@@ -1,14 +1,23 @@
 import csv
 import io
+import hashlib
+import logging
 import pandas as pd
 from typing import List, Dict, Any, Optional
-from datetime import datetime
-from decimal import Decimal
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+logger = logging.getLogger(__name__)
 
 class CSVParser:
     """
     Universal CSV Parser for Bank Statements.
     Attempts to auto-detect columns: date, description, and amount.
+
+    When an import profile is supplied (delimiter, encoding, column mapping,
+    date format and decimal separator learned from a previous import), detection
+    is skipped and rows are parsed directly with the known layout. After a
+    detection-based parse, ``self.profile`` holds the learned layout.
     """
     
     # Common header names to look for
@@ -18,17 +27,35 @@ class CSVParser:
         "monto": ["monto", "importe", "amount", "valor", "balance", "total", "value"],
     }
 
-    def __init__(self, content: bytes, delimiter: str = ","):
+    DATE_FORMATS = [
+        "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", 
+        "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y",
+        "%d/%m/%y", "%m/%d/%y", "%d-%m-%y", # Short year
+        "%d %b %Y", "%d %B %Y" # Text months
+    ]
+    DELIMITERS = [",", ";", "\t", "|"]
+    ENCODINGS = ["utf-8-sig", "latin-1"]
+    PROFILE_SAMPLE_ROWS = 50
+
+    def __init__(self, content: bytes, delimiter: Optional[str] = ",", profile: Optional[Dict[str, Any]] = None):
         self.content = content
         self.delimiter = delimiter
+        self.profile = profile
         self.df: Optional[pd.DataFrame] = None
+        self.skipped_rows = 0
 
     def parse(self) -> List[Dict[str, Any]]:
         """Parses CSV and returns a list of normalized dictionaries"""
+        if self.profile:
+            return self._parse_with_profile()
+
         try:
-            # Detect encoding and read with pandas for flexibility
+            encoding = self._detect_encoding(self.content)
+            if self.delimiter is None:
+                self.delimiter = self._sniff_delimiter(self._header_line(self.content, encoding))
+
             # Using io.BytesIO to keep everything in memory
-            self.df = pd.read_csv(io.BytesIO(self.content), sep=self.delimiter)
+            self.df = pd.read_csv(io.BytesIO(self.content), sep=self.delimiter, encoding=encoding)
             
             # Normalize column names (lowercase and strip)
             self.df.columns = [c.lower().strip() for c in self.df.columns]
@@ -53,12 +80,163 @@ class CSVParser:
                     normalized_data.append(entry)
                 except Exception as e:
                     # Skip rows that definitely aren't transactions (headers, footers)
+                    self.skipped_rows += 1
                     continue
             
+            self.profile = self._learn_profile(mapping, encoding)
             return normalized_data
         except Exception as e:
             raise ValueError(f"Error parsing CSV: {e}")
 
+    def _parse_with_profile(self) -> List[Dict[str, Any]]:
+        """Direct typed parse using a known layout: no header guessing, no per-row heuristics"""
+        profile = self.profile
+        try:
+            self.df = pd.read_csv(
+                io.BytesIO(self.content),
+                sep=profile["delimiter"],
+                encoding=profile["encoding"],
+                dtype=str,
+                keep_default_na=False
+            )
+        except Exception as e:
+            raise ValueError(f"Error parsing CSV: {e}")
+        self.df.columns = [c.lower().strip() for c in self.df.columns]
+
+        mapping = profile["mapping"]
+        missing = [col for col in mapping.values() if col not in self.df.columns]
+        if missing:
+            raise ValueError(f"El perfil de importación no coincide con el archivo (faltan columnas: {', '.join(missing)})")
+
+        date_format = profile.get("date_format")
+        decimal_sep = profile.get("decimal_separator", ".")
+
+        normalized_data = []
+        self.skipped_rows = 0
+        for record in self.df.to_dict("records"):
+            raw_date = record[mapping["fecha"]].strip()
+            raw_monto = record[mapping["monto"]]
+            try:
+                fecha = datetime.strptime(raw_date, date_format).date().isoformat() if date_format else None
+                monto = self._profile_amount(raw_monto, decimal_sep)
+            except (ValueError, InvalidOperation):
+                fecha = monto = None
+            if fecha is None or monto is None:
+                # Row off the learned layout ((45.00), 45.00-, another separator or date format):
+                # same heuristics as detection; only rows without a date are dropped
+                fecha = self._parse_date(raw_date)
+                if not self._is_iso_date(fecha):
+                    # Headers repeated mid-file, footers, totals
+                    self.skipped_rows += 1
+                    continue
+                monto = self._clean_amount(raw_monto)
+
+            normalized_data.append({
+                "fecha": fecha,
+                "descripcion": record[mapping["descripcion"]],
+                "monto": monto,
+                "raw_row": record
+            })
+        if self.skipped_rows:
+            logger.info(f"CSV import profile: {self.skipped_rows} rows without a valid date skipped")
+        return normalized_data
+
+    @staticmethod
+    def _profile_amount(value: str, decimal_sep: str) -> Decimal:
+        """Amount in the profile's notation; raises InvalidOperation if it doesn't fit it"""
+        thousands_sep = "," if decimal_sep == "." else "."
+        for symbol in ("$", "€", "£", " "):
+            value = value.replace(symbol, "")
+        if not value:
+            return Decimal("0")
+        integer, _, decimals = value.partition(decimal_sep)
+        # Thousands groups must have exactly 3 digits: "45.00" is not 4500 with a "," profile
+        if thousands_sep in decimals or any(len(g) != 3 for g in integer.split(thousands_sep)[1:]):
+            raise InvalidOperation(value)
+        return Decimal(integer.replace(thousands_sep, "") + (f".{decimals}" if decimals else ""))
+
+    @staticmethod
+    def _is_iso_date(value: str) -> bool:
+        try:
+            date.fromisoformat(value)
+            return True
+        except ValueError:
+            return False
+
+    # --- Layout detection / profile learning ---
+
+    @classmethod
+    def _detect_encoding(cls, content: bytes) -> str:
+        for encoding in cls.ENCODINGS:
+            try:
+                content[:65536].decode(encoding)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return cls.ENCODINGS[-1]
+
+    @staticmethod
+    def _header_line(content: bytes, encoding: str) -> str:
+        first = content.split(b"\n", 1)[0]
+        return first.decode(encoding, errors="replace").strip("\r\ufeff")
+
+    @classmethod
+    def _sniff_delimiter(cls, header: str) -> str:
+        counts = {d: header.count(d) for d in cls.DELIMITERS}
+        best = max(counts, key=counts.get)
+        return best if counts[best] else ","
+
+    @classmethod
+    def header_fingerprint(cls, content: bytes, delimiter: Optional[str] = None) -> str:
+        """Stable hash of the normalized header row, used to match saved import profiles"""
+        header = cls._header_line(content, cls._detect_encoding(content))
+        delimiter = delimiter or cls._sniff_delimiter(header)
+        columns = next(csv.reader([header], delimiter=delimiter), [])
+        normalized = "|".join(c.strip().strip('"').lower() for c in columns)
+        return hashlib.sha1(f"{delimiter}|{normalized}".encode("utf-8")).hexdigest()
+
+    def _learn_profile(self, mapping: Dict[str, str], encoding: str) -> Dict[str, Any]:
+        sample = self.df.head(self.PROFILE_SAMPLE_ROWS)
+        dates = [str(v).strip() for v in sample[mapping["fecha"]].tolist() if str(v).strip()]
+        amounts = [str(v).strip() for v in sample[mapping["monto"]].tolist() if str(v).strip()]
+        return {
+            "delimiter": self.delimiter,
+            "encoding": encoding,
+            "mapping": dict(mapping),
+            "date_format": self._detect_date_format(dates),
+            "decimal_separator": self._detect_decimal_separator(amounts),
+            "fingerprint": self.header_fingerprint(self.content, self.delimiter)
+        }
+
+    @classmethod
+    def _detect_date_format(cls, values: List[str]) -> Optional[str]:
+        """The format that parses the most sample values (first listed wins ties)"""
+        best_fmt, best_hits = None, 0
+        for fmt in cls.DATE_FORMATS:
+            hits = 0
+            for value in values:
+                try:
+                    datetime.strptime(value, fmt)
+                    hits += 1
+                except ValueError:
+                    continue
+            if hits > best_hits:
+                best_fmt, best_hits = fmt, hits
+        return best_fmt
+
+    @staticmethod
+    def _detect_decimal_separator(values: List[str]) -> str:
+        """Vote on the decimal separator using the last separator and the digits after it"""
+        votes = {".": 0, ",": 0}
+        for value in values:
+            last = max(value.rfind("."), value.rfind(","))
+            if last == -1:
+                continue
+            decimals = len(value) - last - 1
+            if decimals != 3 or ("." in value and "," in value):
+                votes[value[last]] += 1
+        return "," if votes[","] > votes["."] else "."
+
     def _detect_columns(self) -> Dict[str, str]:
         """Maps CSV headers to internal keys using fuzzy matching"""
         mapping = {}
@@ -74,11 +252,19 @@ class CSVParser:
                 mapping[internal_key] = self.df.columns[0] # Fallback
         return mapping
 
-    def _clean_amount(self, value: str) -> Decimal:
+    @staticmethod
+    def _clean_amount(value: str) -> Decimal:
         """Cleans currency strings into Decimal"""
         if not value: return Decimal("0")
         # Remove currency symbols and spaces
         clean_val = str(value).replace("$", "").replace("€", "").replace("£", "").strip()
+
+        # Accounting notation for negatives: (45.00) or 45.00-
+        negative = False
+        if clean_val.startswith("(") and clean_val.endswith(")"):
+            negative, clean_val = True, clean_val[1:-1].strip()
+        elif clean_val.endswith("-"):
+            negative, clean_val = True, clean_val[:-1].strip()
         
         # Helper to check if string is a valid number
         def is_number(s):
@@ -118,20 +304,16 @@ class CSVParser:
         # For 1.000 (one thousand), it's ambiguous. We assume dot is decimal unless multiple dots.
         
         try:
-            return Decimal(clean_val)
+            amount = Decimal(clean_val)
         except:
             return Decimal("0")
+        return -amount if negative else amount
 
-    def _parse_date(self, value: str) -> str:
+    @staticmethod
+    def _parse_date(value: str) -> str:
         """Attempts to parse varied date formats into ISO string"""
-        formats = [
-            "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", 
-            "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y",
-            "%d/%m/%y", "%m/%d/%y", "%d-%m-%y", # Short year
-            "%d %b %Y", "%d %B %Y" # Text months
-        ]
         value = str(value).strip()
-        for fmt in formats:
+        for fmt in CSVParser.DATE_FORMATS:
             try:
                 return datetime.strptime(value, fmt).date().isoformat()
             except:
@@ -1,7 +1,15 @@
 from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy import UniqueConstraint, and_, event, insert, inspect, text, update
+from sqlalchemy.exc import OperationalError, ProgrammingError, SQLAlchemyError
+from sqlalchemy.engine import Engine
 from sqlalchemy.pool import QueuePool
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from .config import settings
+from .read_replica import ReadReplicaRouter, pool_status
 import logging
+from typing import Any, Dict
 
 logger = logging.getLogger(__name__)
 
@@ -15,28 +23,105 @@ pool_config = {
     "pool_pre_ping": True,  # Verify connections before using
 }
 
-# Check if using SQLite (no pooling needed for single-file DB)
+def _sqlite_pragmas() -> Dict[str, Any]:
+    """PRAGMAs applied to every new SQLite connection (SQLITE_* settings)."""
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+    }
+
+
+def tune_sqlite(engine: Engine) -> Engine:
+    """
+    Apply the SQLite production profile on connect: WAL so readers don't block
+    on the writer, synchronous=NORMAL (durable in WAL mode up to the last
+    checkpoint), mmap'd reads, a bigger page cache, in-memory temp tables and a
+    busy timeout instead of immediate "database is locked" errors.
+    """
+    pragmas = _sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def _build_engine(url: str):
+    if url.startswith("sqlite"):
+        if not settings.SQLITE_TUNING:
+            return create_engine(url, echo=False)
+        # WAL allows concurrent readers: a small pool shared across threads
+        return tune_sqlite(create_engine(
+            url,
+            echo=False,
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool,
+            pool_size=settings.SQLITE_POOL_SIZE,
+            max_overflow=settings.SQLITE_POOL_SIZE,
+            pool_timeout=pool_config["pool_timeout"]
+        ))
+    # PostgreSQL/MySQL benefit from pooling
+    return create_engine(url, echo=False, **pool_config)
+
+engine = _build_engine(settings.DATABASE_URL)
 if settings.DATABASE_URL.startswith("sqlite"):
-    # SQLite doesn't benefit from connection pooling
-    engine = create_engine(settings.DATABASE_URL, echo=False)
-    logger.info("Database configured: SQLite (no pooling)")
+    logger.info(f"Database configured: SQLite ({'tuned profile, WAL' if settings.SQLITE_TUNING else 'default settings'})")
 else:
-    # PostgreSQL/MySQL benefit from pooling
-    engine = create_engine(
-        settings.DATABASE_URL,
-        echo=False,
-        **pool_config
-    )
     logger.info(f"Database configured with connection pooling (size=20, overflow=10)")
 
+# Optional read replica for reporting endpoints; reads fall back to the primary
+replica_engine = _build_engine(settings.READ_REPLICA_URL) if settings.READ_REPLICA_URL else None
+replica_router = ReadReplicaRouter(engine, replica_engine)
+if replica_engine is not None:
+    logger.info("Read replica configured for reporting endpoints")
+
 def init_db() -> None:
     """
     Initialize the database by creating all tables defined in SQLModel metadata.
     This should be called during application startup.
     """
     SQLModel.metadata.create_all(engine)
+    ensure_unique_keys(engine)
 
-from typing import Generator
+
+def ensure_unique_keys(bind: Engine) -> None:
+    """
+    Add the models' named unique constraints missing from existing tables.
+    ``create_all`` does not alter tables that already exist, and ``upsert`` needs
+    the key (e.g. ``unique_divisa_fecha``, only created by the MySQL migration).
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        covered = {tuple(c["column_names"]) for c in inspector.get_unique_constraints(table.name)}
+        covered |= {tuple(i["column_names"]) for i in inspector.get_indexes(table.name) if i.get("unique")}
+        for constraint in table.constraints:
+            if not isinstance(constraint, UniqueConstraint) or not constraint.name:
+                continue
+            columns = tuple(c.name for c in constraint.columns)
+            if columns in covered:
+                continue
+            try:
+                with bind.begin() as conn:
+                    conn.execute(text(f"CREATE UNIQUE INDEX {constraint.name} ON {table.name} ({', '.join(columns)})"))
+                logger.info(f"Unique key {constraint.name} added to {table.name}")
+            except SQLAlchemyError as e:
+                # p. ej. filas duplicadas previas: upsert actualiza entonces fila por fila
+                logger.warning(f"Could not add unique key {constraint.name} to {table.name}: {e}")
+
+from typing import AsyncGenerator, Generator, Optional
 
 def get_session() -> Generator[Session, None, None]:
     """
@@ -48,3 +133,113 @@ def get_session() -> Generator[Session, None, None]:
     """
     with Session(engine) as session:
         yield session
+
+
+def get_read_session() -> Generator[Session, None, None]:
+    """
+    Like ``get_session`` but for read-only endpoints (reports, exports, audit
+    browsing): uses the read replica when configured and not lagging behind.
+    """
+    with Session(replica_router.read_engine()) as session:
+        yield session
+
+
+# --- Async engine ---
+# Same database through an asyncio driver, for async endpoints that must not block
+# the event loop. Drivers are pinned in requirements.txt (psycopg 3 serves both sync
+# and async PostgreSQL); the engine is created on first use.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+psycopg",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+_async_engine: Optional[AsyncEngine] = None
+
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL rewritten for its asyncio driver (aiosqlite, psycopg, aiomysql)."""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        url = async_database_url(settings.DATABASE_URL)
+        if url.startswith("sqlite"):
+            _async_engine = create_async_engine(url, echo=False)
+            if settings.SQLITE_TUNING:
+                tune_sqlite(_async_engine.sync_engine)
+        else:
+            # Same sizing as the sync pool (asyncio-compatible pool class)
+            _async_engine = create_async_engine(
+                url,
+                echo=False,
+                **{k: v for k, v in pool_config.items() if k != "poolclass"}
+            )
+    return _async_engine
+
+
+async def dispose_async_engine():
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+def pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Pool counters of every engine in use (primary, replica, async once created)."""
+    pools = replica_router.status()["pools"]
+    if _async_engine is not None:
+        pools["async"] = pool_status(_async_engine.sync_engine)
+    return pools
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency that yields an AsyncSession for async endpoints.
+    Objects stay loaded after commit (no lazy refresh outside the event loop);
+    sync-only helpers can still run through ``await session.run_sync(fn)``.
+    """
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+def upsert(session: Session, model, rows: list, conflict_columns: list, update_columns: list):
+    """
+    Bulk INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE for ``model`` in one statement.
+    ``conflict_columns`` must match a unique key of the table.
+    """
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    table = model.__table__
+
+    if dialect == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update_columns})
+    else:
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert_fn(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={col: stmt.excluded[col] for col in update_columns}
+        )
+    try:
+        # Savepoint: a missing unique key must not abort the caller's transaction
+        with session.begin_nested():
+            session.execute(stmt)
+    except (OperationalError, ProgrammingError) as e:
+        logger.warning(f"Upsert into {table.name} without a unique key on {conflict_columns}; updating row by row: {e}")
+        _upsert_row_by_row(session, table, rows, conflict_columns, update_columns)
+
+
+def _upsert_row_by_row(session: Session, table, rows: list, conflict_columns: list, update_columns: list):
+    """Fallback for tables lacking the unique key: UPDATE each row, INSERT if nothing matched."""
+    for row in rows:
+        match = and_(*(table.c[col] == row[col] for col in conflict_columns))
+        updated = session.execute(update(table).where(match).values({col: row[col] for col in update_columns}))
+        if not updated.rowcount:
+            session.execute(insert(table).values(row))
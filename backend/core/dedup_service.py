@@ -0,0 +1,169 @@
+"""
+Duplicate-transaction detection for the ledger.
+
+Every ``LibroTransacciones`` row carries ``huella_duplicado``: a hash of its
+account, date, amount (to the cent) and normalized description. The column is
+indexed, so "has this movement already been recorded?" is a single indexed
+lookup on manual creation, bulk creation and statement reconciliation.
+
+Near-duplicates (same movement entered with a slightly different date or
+description) are found by a background scan that buckets rows by account and
+amount and only compares rows inside each bucket's date window.
+"""
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlmodel import Session, select
+
+from ..models.models import LibroTransacciones
+from .reconciliation_service import normalize_text, text_similarity
+
+logger = logging.getLogger(__name__)
+
+IN_CLAUSE_CHUNK = 900
+
+
+def _amount_key(monto: Any) -> str:
+    try:
+        return str(Decimal(str(monto or 0)).quantize(Decimal("0.01")))
+    except InvalidOperation:
+        return "0.00"
+
+
+def _date_key(fecha: Any) -> str:
+    return str(fecha or "")[:10]
+
+
+class DedupService:
+    """
+    Computes transaction fingerprints and looks up / scans for duplicates.
+
+    Args:
+        date_window_days: Maximum date distance for near-duplicate pairs.
+        min_similarity: Minimum description similarity (0-1) for near-duplicates.
+    """
+
+    SAME_PAYEE_SIMILARITY = 0.85
+
+    def __init__(self, date_window_days: int = 3, min_similarity: float = 0.8):
+        self.date_window_days = date_window_days
+        self.min_similarity = min_similarity
+
+    def fingerprint(self, id_cuenta: int, fecha: Any, monto: Any, descripcion: Optional[str]) -> str:
+        """Stable fingerprint of a movement: account | day | amount | normalized description."""
+        key = f"{id_cuenta}|{_date_key(fecha)}|{_amount_key(monto)}|{normalize_text(descripcion)}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def stamp(self, tx: LibroTransacciones) -> str:
+        """Set (or refresh) the fingerprint of an ORM transaction."""
+        tx.huella_duplicado = self.fingerprint(tx.id_cuenta, tx.fecha_transaccion, tx.monto_transaccion, tx.notas)
+        return tx.huella_duplicado
+
+    def find_existing(self, session: Session, fingerprints: Iterable[str]) -> Dict[str, int]:
+        """Map each fingerprint already in the ledger to the ID of one matching transaction."""
+        unique = list({f for f in fingerprints if f})
+        found: Dict[str, int] = {}
+        # Chunked only to stay under driver bind-parameter limits
+        for i in range(0, len(unique), IN_CLAUSE_CHUNK):
+            rows = session.exec(
+                select(LibroTransacciones.huella_duplicado, LibroTransacciones.id_transaccion)
+                .where(LibroTransacciones.huella_duplicado.in_(unique[i:i + IN_CLAUSE_CHUNK]))
+                .where(LibroTransacciones.fecha_eliminacion == None)
+            ).all()
+            for fingerprint, tx_id in rows:
+                found.setdefault(fingerprint, tx_id)
+        return found
+
+    def find_duplicate(self, session: Session, tx: LibroTransacciones) -> Optional[int]:
+        """ID of an existing transaction with the same fingerprint as ``tx`` (other than itself)."""
+        fingerprint = tx.huella_duplicado or self.stamp(tx)
+        query = (
+            select(LibroTransacciones.id_transaccion)
+            .where(LibroTransacciones.huella_duplicado == fingerprint)
+            .where(LibroTransacciones.fecha_eliminacion == None)
+        )
+        if tx.id_transaccion:
+            query = query.where(LibroTransacciones.id_transaccion != tx.id_transaccion)
+        return session.exec(query.limit(1)).first()
+
+    def backfill(self, session: Session, batch_size: int = 1000) -> int:
+        """Fingerprint rows created before the column existed (or by raw inserts)."""
+        total = 0
+        while True:
+            batch = session.exec(
+                select(LibroTransacciones)
+                .where(LibroTransacciones.huella_duplicado == None)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            for tx in batch:
+                self.stamp(tx)
+                session.add(tx)
+            session.commit()
+            total += len(batch)
+        return total
+
+    def scan_near_duplicates(self, session: Session, id_cuenta: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Report likely duplicate pairs.
+        Rows are bucketed by (account, amount); inside a bucket they are sorted by
+        date and each row is only compared with the rows within the date window.
+        """
+        query = select(
+            LibroTransacciones.id_transaccion,
+            LibroTransacciones.id_cuenta,
+            LibroTransacciones.fecha_transaccion,
+            LibroTransacciones.monto_transaccion,
+            LibroTransacciones.notas,
+            LibroTransacciones.id_beneficiario
+        ).where(LibroTransacciones.fecha_eliminacion == None)
+        if id_cuenta:
+            query = query.where(LibroTransacciones.id_cuenta == id_cuenta)
+
+        buckets: Dict[tuple, List[tuple]] = defaultdict(list)
+        for tx_id, cuenta, fecha, monto, notas, id_benef in session.exec(query):
+            try:
+                day = date.fromisoformat(_date_key(fecha)).toordinal()
+            except ValueError:
+                continue
+            buckets[(cuenta, _amount_key(monto))].append((day, tx_id, notas, id_benef))
+
+        pairs = []
+        for (cuenta, monto), rows in buckets.items():
+            if len(rows) < 2:
+                continue
+            rows.sort()
+            for i, (day_a, id_a, notas_a, benef_a) in enumerate(rows):
+                for day_b, id_b, notas_b, benef_b in rows[i + 1:]:
+                    if day_b - day_a > self.date_window_days:
+                        break
+                    similarity = self.pair_similarity(notas_a, benef_a, notas_b, benef_b)
+                    if similarity >= self.min_similarity:
+                        pairs.append({
+                            "id_transaccion": min(id_a, id_b),
+                            "id_duplicado": max(id_a, id_b),
+                            "id_cuenta": cuenta,
+                            "monto": Decimal(monto),
+                            "dias_diferencia": day_b - day_a,
+                            "similitud": round(similarity, 2)
+                        })
+
+        logger.info(f"Duplicate scan found {len(pairs)} candidate pairs")
+        return pairs
+
+    def pair_similarity(self, notas_a: Optional[str], benef_a: Optional[int],
+                        notas_b: Optional[str], benef_b: Optional[int]) -> float:
+        """Notes similarity, raised to SAME_PAYEE_SIMILARITY when both rows share a known payee."""
+        similarity = text_similarity(notas_a, notas_b)
+        # Rows without a payee (legacy data) are compared by their notes only
+        if benef_a is not None and benef_a == benef_b:
+            similarity = max(similarity, self.SAME_PAYEE_SIMILARITY)
+        return similarity
+
+
+dedup_service = DedupService()
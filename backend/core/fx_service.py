@@ -1,19 +1,26 @@
-import httpx
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 from decimal import Decimal
 
+from opentelemetry import trace
+
+from .http_client import http_client
+from .tracing import traced
+
 logger = logging.getLogger(__name__)
 
 class FXService:
     def __init__(self):
         self.cache: Dict[str, Dict] = {}
         self.cache_duration = timedelta(hours=1)
+        self.hits = 0
+        self.misses = 0
         # Using public APIs for Argentina (DolarApi) and Crypto (CoinGecko/Binance)
         self.DOLAR_API_URL = "https://dolarapi.com/v1/dolares"
         self.CRYPTO_API_URL = "https://api.binance.com/api/v3/ticker/price"
 
+    @traced("fx.get_rates")
     async def get_rates(self) -> Dict[str, float]:
         """
         Returns latest exchange rates with caching.
@@ -21,7 +28,11 @@ class FXService:
         """
         now = datetime.utcnow()
         if "rates" in self.cache and (now - self.cache["rates"]["timestamp"]) < self.cache_duration:
+            self.hits += 1
+            trace.get_current_span().set_attribute("fx.cache_hit", True)
             return self.cache["rates"]["data"]
+        self.misses += 1
+        trace.get_current_span().set_attribute("fx.cache_hit", False)
 
         rates = {
             "ARS": 1.0,
@@ -32,27 +43,27 @@ class FXService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                # 1. Fetch ARS Dolar Rates
-                dolar_res = await client.get(self.DOLAR_API_URL)
-                if dolar_res.status_code == 200:
-                    dolar_data = dolar_res.json()
-                    for item in dolar_data:
-                        if item["casa"] == "oficial":
-                            rates["USD_OFFICIAL"] = float(item["venta"])
-                        if item["casa"] == "blue":
-                            rates["USD_BLUE"] = float(item["venta"])
-                
-                # 2. Fetch Crypto Prices (in USD)
-                crypto_params = {"symbols": '["BTCUSDT","ETHUSDT"]'}
-                crypto_res = await client.get(self.CRYPTO_API_URL, params=crypto_params)
-                if crypto_res.status_code == 200:
-                    crypto_data = crypto_res.json()
-                    for item in crypto_data:
-                        symbol = item["symbol"].replace("USDT", "")
-                        price_usd = float(item["price"])
-                        # Convert to ARS Blue
-                        rates[symbol] = price_usd * rates["USD_BLUE"]
+            # Shared pooled client: connections are reused across refreshes
+            # 1. Fetch ARS Dolar Rates
+            dolar_res = await http_client.get(self.DOLAR_API_URL)
+            if dolar_res.status_code == 200:
+                dolar_data = dolar_res.json()
+                for item in dolar_data:
+                    if item["casa"] == "oficial":
+                        rates["USD_OFFICIAL"] = float(item["venta"])
+                    if item["casa"] == "blue":
+                        rates["USD_BLUE"] = float(item["venta"])
+            
+            # 2. Fetch Crypto Prices (in USD)
+            crypto_params = {"symbols": '["BTCUSDT","ETHUSDT"]'}
+            crypto_res = await http_client.get(self.CRYPTO_API_URL, params=crypto_params)
+            if crypto_res.status_code == 200:
+                crypto_data = crypto_res.json()
+                for item in crypto_data:
+                    symbol = item["symbol"].replace("USDT", "")
+                    price_usd = float(item["price"])
+                    # Convert to ARS Blue
+                    rates[symbol] = price_usd * rates["USD_BLUE"]
 
             self.cache["rates"] = {
                 "timestamp": now,
@@ -0,0 +1,164 @@
+"""
+Process-wide pooled HTTP client.
+
+A single ``httpx.AsyncClient`` is shared by core services and plugins so
+connections (DNS, TCP and TLS setup) are reused through keep-alive instead of
+being opened per call. On top of the global pool it applies a per-host
+concurrency limit, default timeouts and retries with exponential backoff for
+idempotent requests (transport errors, 429 and 500/502/503/504). It is started
+and closed with the application lifespan.
+
+Connections and semaphores belong to the event loop that created them, so each
+loop gets its own client: code running its own loop (e.g. a scheduler job using
+``asyncio.run``) never replaces the application's pool, and should ``close()``
+its client before that loop ends.
+"""
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from opentelemetry.trace import SpanKind
+
+from .config import settings
+from .tracing import get_tracer, inject_headers
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class HTTPClientManager:
+    """
+    Owns the shared ``httpx.AsyncClient`` (one per event loop).
+
+    Args:
+        timeout: Total timeout per request (seconds).
+        connect_timeout: Timeout to establish a connection (seconds).
+        max_connections: Global pool size.
+        max_keepalive: Idle keep-alive connections kept in the pool.
+        per_host_limit: Maximum concurrent requests to a single host.
+        retries: Extra attempts for idempotent requests on transport errors / 429 / 500 / 502-504.
+        backoff: Base delay between retries (doubled each attempt).
+        transport: Optional transport override (e.g. ``httpx.MockTransport`` in tests).
+    """
+
+    def __init__(
+        self,
+        timeout: float = settings.HTTP_TIMEOUT,
+        connect_timeout: float = 5.0,
+        max_connections: int = settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = 20,
+        per_host_limit: int = settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+        retries: int = settings.HTTP_RETRIES,
+        backoff: float = 0.5,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=30.0
+        )
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.transport = transport
+        # One (client, per-host semaphores) per event loop
+        self._clients: Dict[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, Dict[str, asyncio.Semaphore]]] = {}
+        self._lock = threading.Lock()
+
+    def _loop_state(self) -> Tuple[httpx.AsyncClient, Dict[str, asyncio.Semaphore]]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Loops closed without calling close() cannot be awaited anymore: just drop them
+            for stale in [l for l in self._clients if l.is_closed()]:
+                logger.warning("HTTP client of a closed event loop was not closed; dropping it")
+                del self._clients[stale]
+            state = self._clients.get(loop)
+            if state is None or state[0].is_closed:
+                state = (
+                    httpx.AsyncClient(
+                        timeout=self.timeout,
+                        transport=self.transport or httpx.AsyncHTTPTransport(limits=self.limits, retries=1),
+                        headers={"User-Agent": "3F-FuturoForbes"},
+                        follow_redirects=True
+                    ),
+                    {}
+                )
+                self._clients[loop] = state
+            return state
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The current event loop's client; created lazily if the app lifespan has not started it."""
+        return self._loop_state()[0]
+
+    async def start(self):
+        """Create the pool (called on application startup)."""
+        _ = self.client
+        logger.info(f"HTTP client pool started (max={self.limits.max_connections}, per host={self.per_host_limit})")
+
+    async def close(self):
+        """Close every pooled connection of the current event loop (called on application shutdown)."""
+        with self._lock:
+            state = self._clients.pop(asyncio.get_running_loop(), None)
+        if state is not None and not state[0].is_closed:
+            await state[0].aclose()
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host_limits = self._loop_state()[1]
+        host = urlsplit(str(url)).netloc
+        if host not in host_limits:
+            host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return host_limits[host]
+
+    async def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        """
+        Send a request through the shared pool.
+        Idempotent methods are retried on transport errors and 429/502/503/504;
+        the last response (or error) is returned/raised to the caller.
+        """
+        client = self.client
+        method = method.upper()
+        attempts = 1 + (self.retries if retries is None else retries) if method in IDEMPOTENT_METHODS else 1
+        limit = self._host_limit(url)
+
+        with get_tracer().start_as_current_span(
+            f"HTTP {method}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "http.request.method": method,
+                "server.address": urlsplit(str(url)).hostname or "",
+                "url.full": str(url).split("?", 1)[0]
+            }
+        ) as span:
+            kwargs["headers"] = inject_headers(kwargs.get("headers"))
+            for attempt in range(attempts):
+                last = attempt == attempts - 1
+                span.set_attribute("http.request.resend_count", attempt)
+                try:
+                    async with limit:
+                        response = await client.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    if last:
+                        raise
+                    logger.debug(f"HTTP {method} {url} failed ({e}); retrying")
+                else:
+                    if response.status_code not in RETRY_STATUS or last:
+                        span.set_attribute("http.response.status_code", response.status_code)
+                        return response
+                    logger.debug(f"HTTP {method} {url} returned {response.status_code}; retrying")
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+
+http_client = HTTPClientManager()
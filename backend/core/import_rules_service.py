@@ -0,0 +1,212 @@
+"""
+Compiled import-rule engine for bank statement reconciliation.
+
+A user's active ``ReglaImportacion`` rows are compiled once into a single
+Aho–Corasick automaton (plain substring patterns) plus a list of compiled
+regular expressions (patterns prefixed with ``re:``). Matching a description
+is then one linear scan instead of one query and O(rules) substring tests per
+CSV row. Compiled rule sets are cached per user and invalidated whenever the
+user's rules change.
+"""
+import re
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+from sqlmodel import Session, select
+
+from ..models.models import Beneficiario
+from ..models.models_extended import ReglaImportacion
+
+logger = logging.getLogger(__name__)
+
+REGEX_PREFIX = "re:"
+
+
+class _AhoCorasick:
+    """
+    Minimal Aho–Corasick automaton over lowercase patterns.
+    Each terminal node keeps the best (lowest) rule rank reachable through
+    its output links, so a scan only has to track a running minimum.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[Optional[int]] = [None]
+
+    def add(self, pattern: str, rank: int):
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            node = nxt
+        current = self._best[node]
+        if current is None or rank < current:
+            self._best[node] = rank
+
+    def build(self):
+        """Compute failure links (BFS) and fold output ranks along them."""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+
+                inherited = self._best[self._fail[child]]
+                own = self._best[child]
+                if inherited is not None and (own is None or inherited < own):
+                    self._best[child] = inherited
+                queue.append(child)
+
+    def best_match(self, text: str, stop_at: int = 0) -> Optional[int]:
+        """
+        Return the lowest rank of any pattern occurring in ``text``.
+        Scanning stops early once a rank <= ``stop_at`` is found.
+        """
+        best = None
+        node = 0
+        goto = self._goto
+        fail = self._fail
+        ranks = self._best
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            rank = ranks[node]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best <= stop_at:
+                    break
+        return best
+
+
+class CompiledRuleSet:
+    """
+    Immutable, pre-compiled view of a user's active import rules.
+    Rules keep the original evaluation order: priority descending, first match wins.
+    """
+
+    def __init__(self, rules: List[ReglaImportacion], payee_names: Dict[int, str]):
+        self._rules: List[Dict[str, Any]] = []
+        self._automaton = _AhoCorasick()
+        self._regexes: List[tuple] = []  # (rank, compiled pattern)
+        self._has_literals = False
+
+        for rank, rule in enumerate(rules):
+            patron = (rule.patron or "").strip()
+            self._rules.append({
+                "id_categoria": rule.id_categoria,
+                "id_beneficiario": rule.id_beneficiario,
+                "nombre_beneficiario": payee_names.get(rule.id_beneficiario) if rule.id_beneficiario else None,
+                "rule_name": rule.patron
+            })
+
+            if patron.lower().startswith(REGEX_PREFIX):
+                expression = patron[len(REGEX_PREFIX):].strip()
+                try:
+                    self._regexes.append((rank, re.compile(expression, re.IGNORECASE)))
+                except re.error as e:
+                    logger.warning(f"Import rule {rule.id_regla} has an invalid regex '{expression}': {e}")
+            elif patron:
+                self._automaton.add(patron.lower(), rank)
+                self._has_literals = True
+
+        self._automaton.build()
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def match(self, description: str) -> dict:
+        """
+        Match a CSV description against the compiled rules.
+        Returns dict with id_categoria, id_beneficiario, nombre_beneficiario and
+        rule_name of the highest-priority matching rule, or an empty dict.
+        """
+        if not self._rules or not description:
+            return {}
+
+        best = None
+        if self._has_literals:
+            best = self._automaton.best_match(description.lower())
+
+        # Only regexes that outrank the best literal hit need to be tried
+        for rank, pattern in self._regexes:
+            if best is not None and rank >= best:
+                break
+            if pattern.search(description):
+                best = rank
+                break
+
+        return dict(self._rules[best]) if best is not None else {}
+
+
+class ImportRulesService:
+    """
+    Builds and caches compiled rule sets per user.
+    The cache is invalidated explicitly by the import-rules API and also
+    expires after ``cache_duration`` so other workers eventually converge.
+    """
+
+    def __init__(self):
+        self.cache: Dict[int, Dict[str, Any]] = {}
+        self.cache_duration = timedelta(minutes=5)
+        self.hits = 0
+        self.misses = 0
+
+    def get_rules(self, session: Session, user_id: int) -> CompiledRuleSet:
+        """Return the compiled rule set for a user, compiling it if needed."""
+        now = datetime.utcnow()
+        cached = self.cache.get(user_id)
+        if cached and (now - cached["timestamp"]) < self.cache_duration:
+            self.hits += 1
+            return cached["rules"]
+        self.misses += 1
+
+        compiled = self.compile(session, user_id)
+        self.cache[user_id] = {"timestamp": now, "rules": compiled}
+        return compiled
+
+    def compile(self, session: Session, user_id: int) -> CompiledRuleSet:
+        """Load active rules and their beneficiary names (one query each) and compile them."""
+        rules = session.exec(
+            select(ReglaImportacion)
+            .where(ReglaImportacion.id_usuario == user_id)
+            .where(ReglaImportacion.activo == 1)
+            .order_by(ReglaImportacion.prioridad.desc(), ReglaImportacion.id_regla)
+        ).all()
+
+        payee_ids = {r.id_beneficiario for r in rules if r.id_beneficiario}
+        payee_names: Dict[int, str] = {}
+        if payee_ids:
+            rows = session.exec(
+                select(Beneficiario.id_beneficiario, Beneficiario.nombre_beneficiario)
+                .where(Beneficiario.id_beneficiario.in_(payee_ids))
+            ).all()
+            payee_names = {row[0]: row[1] for row in rows}
+
+        logger.debug(f"Compiled {len(rules)} import rules for user {user_id}")
+        return CompiledRuleSet(rules, payee_names)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Drop the cached rule set for a user (or for everyone)."""
+        if user_id is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(user_id, None)
+
+
+import_rules_service = ImportRulesService()
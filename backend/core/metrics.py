@@ -0,0 +1,203 @@
+"""
+Prometheus metrics exported at ``/metrics``.
+
+- HTTP: latency histogram and request counter per method, route template
+  (``/api/transacciones/{tx_id}``, never the raw path) and status class.
+- DB pools: checked-out / checked-in / overflow / size per engine (primary,
+  replica, async), read when scraped.
+- Scheduler: duration and outcome of each job run (``instrument_job``). Jobs
+  catch their own exceptions and log them, so a run that logs at ERROR counts
+  as failed.
+- FX rates cache age, open SSE connections, and cache hits / misses / hit ratio.
+
+Every label comes from a closed set (route templates, job ids, engine and cache
+names), so cardinality stays bounded. Metrics live in their own registry; with
+several workers each one is scraped separately.
+"""
+import functools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .config import settings
+
+registry = CollectorRegistry()
+
+HTTP_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    registry=registry
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served",
+    registry=registry
+)
+scheduler_job_duration = Histogram(
+    "scheduler_job_duration_seconds",
+    "Duration of scheduler job runs",
+    ["job"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0),
+    registry=registry
+)
+scheduler_job_runs = Counter(
+    "scheduler_job_runs_total",
+    "Scheduler job runs by outcome (error: raised or logged at ERROR)",
+    ["job", "outcome"],
+    registry=registry
+)
+scheduler_job_last_run = Gauge(
+    "scheduler_job_last_run_timestamp_seconds",
+    "Unix time the job last finished",
+    ["job"],
+    registry=registry
+)
+
+
+# --- HTTP ---
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path else "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request under its route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") == "/metrics":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec()
+            method = scope.get("method", "GET")
+            http_request_duration.labels(
+                method=method if method in HTTP_METHODS else "OTHER",
+                route=_route_label(scope),
+                status=f"{status['code'] // 100}xx"
+            ).observe(time.perf_counter() - started)
+
+
+# --- Scheduler ---
+
+_job_context = threading.local()
+
+
+class _JobErrorCounter(logging.Handler):
+    """Counts ERROR records logged while a scheduler job runs in this thread."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record):
+        run = getattr(_job_context, "run", None)
+        if run is not None:
+            run["errors"] += 1
+
+
+logging.getLogger("backend").addHandler(_JobErrorCounter())
+
+
+def instrument_job(job_id: str, func: Callable) -> Callable:
+    """Wrap a scheduler job to record its duration and outcome."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        run = {"errors": 0}
+        _job_context.run = run
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            run["errors"] += 1
+            raise
+        finally:
+            _job_context.run = None
+            scheduler_job_duration.labels(job=job_id).observe(time.perf_counter() - started)
+            scheduler_job_runs.labels(job=job_id, outcome="error" if run["errors"] else "ok").inc()
+            scheduler_job_last_run.labels(job=job_id).set(time.time())
+    return wrapper
+
+
+# --- State read at scrape time ---
+
+class _StateCollector:
+    """DB pools, FX cache age, SSE connections and cache hit ratios."""
+
+    def collect(self):
+        from . import database
+        from .fx_service import fx_service
+        from .import_rules_service import import_rules_service
+        from .notification_bus import notification_bus
+        from .user_cache import user_cache
+
+        pool_gauges = {
+            name: GaugeMetricFamily(f"db_pool_{name}", help_text, labels=["engine"])
+            for name, help_text in (
+                ("checked_out", "Connections currently checked out"),
+                ("checked_in", "Idle connections in the pool"),
+                ("overflow", "Connections opened beyond pool_size"),
+                ("size", "Configured pool size"),
+            )
+        }
+        for engine_name, status in database.pool_metrics().items():
+            for name, key in (("checked_out", "checkedout"), ("checked_in", "checkedin"),
+                              ("overflow", "overflow"), ("size", "size")):
+                if key in status:
+                    pool_gauges[name].add_metric([engine_name], status[key])
+        yield from pool_gauges.values()
+
+        fx_age = GaugeMetricFamily("fx_rates_cache_age_seconds", "Seconds since FX rates were fetched (NaN if never)")
+        cached = fx_service.cache.get("rates")
+        fx_age.add_metric([], (datetime.utcnow() - cached["timestamp"]).total_seconds() if cached else float("nan"))
+        yield fx_age
+
+        yield GaugeMetricFamily("sse_connections", "Open SSE notification streams in this worker",
+                                value=notification_bus.connection_count())
+
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Hits / lookups since start", labels=["cache"])
+        for name, cache in (("auth_users", user_cache), ("fx_rates", fx_service), ("import_rules", import_rules_service)):
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            lookups = cache.hits + cache.misses
+            ratio.add_metric([name], cache.hits / lookups if lookups else float("nan"))
+        yield hits
+        yield misses
+        yield ratio
+
+
+registry.register(_StateCollector())
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus exposition; requires ``Authorization: Bearer <METRICS_TOKEN>`` when set."""
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return Response(status_code=401)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,176 @@
+"""
+Pub/sub fan-out for real-time (SSE) notifications.
+
+Every open SSE stream registers a ``Subscription`` with a bounded buffer in the
+worker that serves it; a user may hold several (one per tab or device).
+``publish`` reaches every subscription of the user:
+
+- ``memory`` backend: delivered in-process (single worker).
+- ``redis`` backend: published on one Redis channel; each worker runs a single
+  listener that fans messages out to its local subscriptions, so a notification
+  raised in any worker reaches streams held by every other worker.
+
+When a slow client fills its buffer the oldest message is dropped and the
+subscription is flagged, so the stream can re-sync from ``UserNotification``.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "3f:notifications"
+
+
+class Subscription:
+    """One SSE connection: a bounded queue of messages for a single user."""
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def push(self, message: Dict[str, Any]):
+        if self.queue.full():
+            # Cliente lento: descartar el más antiguo y pedir re-sincronización
+            self.queue.get_nowait()
+            self.overflowed = True
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Dict[str, Any]:
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class NotificationBus:
+    """
+    Registry of local SSE subscriptions plus the cross-worker transport.
+
+    Args:
+        backend: "memory" (single process) or "redis" (multi-worker).
+        redis_url: Redis connection URL for the redis backend.
+        buffer_size: Maximum queued messages per connection.
+        redis_client: Pre-built async Redis client (e.g. ``fakeredis`` in tests).
+    """
+
+    def __init__(
+        self,
+        backend: str = settings.NOTIFICATIONS_BACKEND,
+        redis_url: Optional[str] = settings.REDIS_URL,
+        buffer_size: int = settings.NOTIFICATION_BUFFER_SIZE,
+        redis_client: Any = None
+    ):
+        self.backend = backend
+        self.redis_url = redis_url
+        self.buffer_size = buffer_size
+        self._redis = redis_client
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._listener: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+
+    # --- Local subscriptions ---
+
+    async def subscribe(self, user_id: int) -> Subscription:
+        """Register a new connection for ``user_id``."""
+        if self.backend == "redis":
+            await self._ensure_listener()
+        subscription = Subscription(user_id, self.buffer_size)
+        self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove one connection; the user's other tabs keep receiving."""
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+
+    def connection_count(self, user_id: Optional[int] = None) -> int:
+        if user_id is not None:
+            return len(self._subscriptions.get(user_id, ()))
+        return sum(len(s) for s in self._subscriptions.values())
+
+    def _fan_out(self, user_id: int, message: Dict[str, Any]) -> int:
+        subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.push(message)
+        return len(subscriptions)
+
+    # --- Publishing ---
+
+    async def publish(self, user_id: int, message: Dict[str, Any]) -> bool:
+        """
+        Deliver ``message`` to every open stream of ``user_id``.
+        Returns whether a local stream received it (memory) or the message was
+        handed to Redis (redis); it is persisted by the caller either way.
+        """
+        if self.backend != "redis":
+            return self._fan_out(user_id, message) > 0
+
+        client = self._get_redis()
+        await client.publish(CHANNEL, json.dumps({"user_id": user_id, "message": message}, default=str))
+        return True
+
+    # --- Redis transport ---
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    async def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._ready = asyncio.Event()
+            self._listener = asyncio.create_task(self._listen())
+        # No perder mensajes publicados justo después de conectarse
+        await self._ready.wait()
+
+    async def _listen(self):
+        """Single subscriber per worker; reconnects if Redis goes away."""
+        while True:
+            pubsub = self._get_redis().pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                self._ready.set()
+                async for raw in pubsub.listen():
+                    if raw.get("type") != "message":
+                        continue
+                    try:
+                        data = json.loads(raw["data"])
+                        self._fan_out(int(data["user_id"]), data["message"])
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning(f"Notification bus: mensaje inválido descartado: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification bus: conexión a Redis perdida ({e}); reintentando")
+                # Desbloquear a quien espera; los streams re-sincronizan con Last-Event-ID
+                self._ready.set()
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def close(self):
+        """Stop the Redis listener (called on application shutdown)."""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._redis is not None and self.redis_url:
+            await self._redis.aclose()
+            self._redis = None
+
+
+notification_bus = NotificationBus()
@@ -0,0 +1,81 @@
+"""
+Set-based operations on stored notifications (``UserNotification``).
+
+Bulk read/clear run as a single UPDATE/DELETE per user instead of loading rows,
+the unread badge is a COUNT served by the (user_id, read) index, and the
+retention job deletes old read notifications in small batches so it never holds
+long locks on the table.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, update
+from sqlmodel import Session, select
+
+from .config import settings
+from ..models.models_notifications import UserNotification
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationService:
+    """
+    Bulk operations and retention for user notifications.
+
+    Args:
+        retention_days: Read notifications older than this are purged.
+        batch_size: Rows deleted per statement by the retention job.
+    """
+
+    def __init__(
+        self,
+        retention_days: int = settings.NOTIFICATION_RETENTION_DAYS,
+        batch_size: int = 1000
+    ):
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+
+    def unread_count(self, session: Session, user_id: int) -> int:
+        """Unread notifications of a user (index range scan on user_id, read)."""
+        return session.exec(
+            select(func.count())
+            .select_from(UserNotification)
+            .where(UserNotification.user_id == user_id, UserNotification.read == False)
+        ).one()
+
+    def mark_all_read(self, session: Session, user_id: int) -> int:
+        """Mark every unread notification as read in one UPDATE. Returns rows changed."""
+        result = session.execute(
+            update(UserNotification)
+            .where(UserNotification.user_id == user_id, UserNotification.read == False)
+            .values(read=True)
+        )
+        session.commit()
+        return result.rowcount or 0
+
+    def clear(self, session: Session, user_id: int) -> int:
+        """Delete all notifications of a user in one DELETE. Returns rows removed."""
+        result = session.execute(delete(UserNotification).where(UserNotification.user_id == user_id))
+        session.commit()
+        return result.rowcount or 0
+
+    def purge_read(self, session: Session, older_than: timedelta = None) -> int:
+        """Delete read notifications older than the retention window, in batches."""
+        cutoff = datetime.utcnow() - (older_than or timedelta(days=self.retention_days))
+        total = 0
+        while True:
+            ids = session.exec(
+                select(UserNotification.id)
+                .where(UserNotification.read == True, UserNotification.timestamp < cutoff)
+                .order_by(UserNotification.id)
+                .limit(self.batch_size)
+            ).all()
+            if not ids:
+                break
+            session.execute(delete(UserNotification).where(UserNotification.id.in_(ids)))
+            session.commit()
+            total += len(ids)
+        return total
+
+
+notification_service = NotificationService()
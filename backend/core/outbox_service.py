@@ -0,0 +1,316 @@
+"""
+Transactional outbox for plugin hooks.
+
+``enqueue`` adds one ``EventoHook`` row per subscribed plugin to the caller's
+session, so the event is committed (or rolled back) together with the change
+that triggered it. A background worker claims ready rows in batches, groups
+them per plugin and hook, and delivers them through the PluginManager. Failed
+deliveries are retried with exponential backoff; plugins with ``batch_size > 1``
+receive several events in one call (e.g. a single Telegram digest).
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import inspect as sa_inspect, update, delete
+from sqlmodel import Session, SQLModel, select
+
+from .database import engine
+from .plugin_manager import plugin_manager
+from .plugin_metrics import CircuitOpenError, PermanentDeliveryError
+from .user_cache import UsuarioActual
+from ..models.models_plugins import EventoHook
+
+logger = logging.getLogger(__name__)
+
+ENTITY_KEY = "__entity__"
+
+
+def _entity_classes() -> Dict[str, type]:
+    """Table models by class name, used to reload entities referenced in payloads."""
+    found: Dict[str, type] = {}
+    pending = list(SQLModel.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if getattr(cls, "__table__", None) is not None:
+            found[cls.__name__] = cls
+    return found
+
+
+def _serialize(value: Any) -> Any:
+    """JSON-safe payload; table models are stored as references and reloaded on delivery."""
+    if isinstance(value, SQLModel) and getattr(type(value), "__table__", None) is not None:
+        pk_column = sa_inspect(type(value)).primary_key[0]
+        return {ENTITY_KEY: type(value).__name__, "pk": getattr(value, pk_column.key)}
+    if isinstance(value, UsuarioActual):
+        # Cached auth snapshot: plugins get the full Usuario row on delivery
+        return {ENTITY_KEY: "Usuario", "pk": value.id_usuario}
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {k: _serialize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_serialize(v) for v in value]
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _deserialize(value: Any, session: Session, classes: Dict[str, type]) -> Any:
+    if isinstance(value, dict):
+        if ENTITY_KEY in value:
+            cls = classes.get(value[ENTITY_KEY])
+            return session.get(cls, value["pk"]) if cls and value.get("pk") is not None else None
+        return {k: _deserialize(v, session, classes) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_deserialize(v, session, classes) for v in value]
+    return value
+
+
+class OutboxService:
+    """
+    Writes hook events to the outbox and drains it in the background.
+
+    Args:
+        session_factory: Callable returning a new Session (defaults to the app engine).
+        claim_size: Maximum rows claimed per drain iteration.
+        max_attempts: Deliveries after which an event is marked 'fallido'.
+        base_delay: First retry delay; doubled on every further attempt.
+        max_delay: Upper bound for the retry delay.
+        lease: Time after which a row stuck in 'procesando' (crashed worker) is reclaimed.
+        poll_interval: Seconds between polls when nobody calls ``notify``.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        claim_size: int = 200,
+        max_attempts: int = 6,
+        base_delay: timedelta = timedelta(seconds=5),
+        max_delay: timedelta = timedelta(hours=1),
+        lease: timedelta = timedelta(minutes=5),
+        poll_interval: float = 5.0
+    ):
+        self.session_factory = session_factory or (lambda: Session(engine))
+        self.claim_size = claim_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    # --- Producer side ---
+
+    def enqueue(self, session: Session, hook_name: str, **kwargs) -> int:
+        """
+        Add the event for every plugin subscribed to ``hook_name`` to ``session``.
+        Nothing is written until the caller commits. Returns the number of rows added.
+        """
+        subscribers = plugin_manager.get_hook_subscribers(hook_name)
+        if not subscribers:
+            return 0
+
+        payload = _serialize(kwargs)
+        for subscriber in subscribers:
+            session.add(EventoHook(
+                hook=hook_name,
+                plugin=subscriber["nombre_tecnico"],
+                payload=payload
+            ))
+        return len(subscribers)
+
+    def notify(self):
+        """Wake the worker after a commit so new events are delivered right away."""
+        if self._wake is not None:
+            self._wake.set()
+
+    # --- Consumer side ---
+
+    def _backoff(self, attempts: int) -> timedelta:
+        return min(self.base_delay * (2 ** max(attempts - 1, 0)), self.max_delay)
+
+    def _claim(self, session: Session) -> List[EventoHook]:
+        """Atomically mark a batch of ready rows as owned by this worker."""
+        now = datetime.utcnow()
+        session.execute(
+            update(EventoHook)
+            .where(EventoHook.estado == "procesando")
+            .where(EventoHook.reclamado_el < now - self.lease)
+            .values(estado="pendiente", reclamado_por=None)
+        )
+        ids = session.exec(
+            select(EventoHook.id_evento)
+            .where(EventoHook.estado == "pendiente")
+            .where(EventoHook.proximo_intento <= now)
+            .order_by(EventoHook.id_evento)
+            .limit(self.claim_size)
+        ).all()
+        if not ids:
+            session.commit()
+            return []
+
+        # The estado guard makes the claim safe against other workers
+        session.execute(
+            update(EventoHook)
+            .where(EventoHook.id_evento.in_(ids))
+            .where(EventoHook.estado == "pendiente")
+            .values(estado="procesando", reclamado_por=self.worker_id, reclamado_el=now)
+        )
+        session.commit()
+        return session.exec(
+            select(EventoHook)
+            .where(EventoHook.id_evento.in_(ids))
+            .where(EventoHook.reclamado_por == self.worker_id)
+            .where(EventoHook.estado == "procesando")
+            .order_by(EventoHook.id_evento)
+        ).all()
+
+    def _load_events(self, session: Session, rows: List[EventoHook], classes: Dict[str, type]) -> List[Any]:
+        """Rebuild hook kwargs, reloading referenced entities from the database."""
+        return [_deserialize(row.payload or {}, session, classes) for row in rows]
+
+    async def drain(self) -> int:
+        """Deliver every ready event. Returns the number of events delivered."""
+        delivered = 0
+        with self.session_factory() as session:
+            classes = _entity_classes()
+            while True:
+                # Session work runs in a thread; only plugin delivery stays on the loop
+                rows = await asyncio.to_thread(self._claim, session)
+                if not rows:
+                    return delivered
+
+                groups: Dict[tuple, List[EventoHook]] = defaultdict(list)
+                for row in rows:
+                    groups[(row.plugin, row.hook)].append(row)
+
+                for (plugin_name, hook_name), group in groups.items():
+                    # Importa el plugin si estaba diferido (carga lazy)
+                    instance = await plugin_manager.ensure_loaded(plugin_name)
+                    batch_size = max(int(getattr(instance, "batch_size", 1) or 1), 1)
+                    for i in range(0, len(group), batch_size):
+                        chunk = group[i:i + batch_size]
+                        if await self._deliver(session, plugin_name, hook_name, chunk, classes):
+                            delivered += len(chunk)
+                await asyncio.to_thread(session.commit)
+
+    async def _deliver(
+        self,
+        session: Session,
+        plugin_name: str,
+        hook_name: str,
+        rows: List[EventoHook],
+        classes: Dict[str, type]
+    ) -> bool:
+        # Row updates below only touch loaded attributes; drain commits them off-loop
+        now = datetime.utcnow()
+        if await plugin_manager.ensure_loaded(plugin_name) is None:
+            # Plugin desactivado o desinstalado: no tiene sentido reintentar
+            for row in rows:
+                row.estado = "descartado"
+                row.ultimo_error = "Plugin no cargado"
+                session.add(row)
+            return False
+
+        events = await asyncio.to_thread(self._load_events, session, rows, classes)
+        try:
+            await plugin_manager.deliver_batch(plugin_name, hook_name, events)
+        except CircuitOpenError as e:
+            # El plugin está en pausa: reprogramar sin consumir intentos
+            for row in rows:
+                row.estado = "pendiente"
+                row.reclamado_por = None
+                row.proximo_intento = now + timedelta(seconds=e.retry_in)
+                session.add(row)
+            return False
+        except PermanentDeliveryError as e:
+            # El destino rechazó el envío (p. ej. token inválido): reintentar no sirve
+            for row in rows:
+                row.estado = "descartado"
+                row.intentos += 1
+                row.ultimo_error = str(e)[:500]
+                row.reclamado_por = None
+                session.add(row)
+            logger.warning(f"Outbox: {len(rows)} eventos '{hook_name}' descartados por {plugin_name}: {e}")
+            return False
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            for row in rows:
+                row.intentos += 1
+                row.ultimo_error = error[:500]
+                row.reclamado_por = None
+                if row.intentos >= self.max_attempts:
+                    row.estado = "fallido"
+                else:
+                    row.estado = "pendiente"
+                    row.proximo_intento = now + self._backoff(row.intentos)
+                session.add(row)
+            logger.warning(f"Outbox: entrega de {len(rows)} eventos '{hook_name}' a {plugin_name} falló: {error}")
+            return False
+
+        for row in rows:
+            row.estado = "entregado"
+            row.intentos += 1
+            row.entregado_el = now
+            session.add(row)
+        return True
+
+    def purge(self, older_than: timedelta = timedelta(days=7)) -> int:
+        """Delete delivered/discarded events older than ``older_than``."""
+        cutoff = datetime.utcnow() - older_than
+        with self.session_factory() as session:
+            result = session.execute(
+                delete(EventoHook)
+                .where(EventoHook.estado.in_(["entregado", "descartado"]))
+                .where(EventoHook.creado_el < cutoff)
+            )
+            session.commit()
+            return result.rowcount or 0
+
+    # --- Worker lifecycle ---
+
+    async def _run(self):
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                logger.error(f"Outbox: error drenando eventos: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        """Start the background worker on the running event loop."""
+        if self._task and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Outbox worker iniciado ({self.worker_id})")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._wake = None
+
+
+outbox_service = OutboxService()
@@ -1,15 +1,20 @@
 """
 Plugin Manager - Sistema de gestión de plugins para 3F
 """
+import asyncio
 import logging
 import importlib
 import sys
+import time
 from typing import Dict, List, Callable, Any, Optional
 from pathlib import Path
 from sqlmodel import Session, select
 from datetime import datetime
 
+from backend.core.config import settings
 from backend.core.database import engine
+from backend.core.plugin_metrics import HookMetrics, CircuitBreaker, CircuitOpenError
+from backend.core.tracing import get_tracer
 from backend.models.models_plugins import Plugin
 
 logger = logging.getLogger(__name__)
@@ -36,16 +41,37 @@ class PluginManager:
             
         self.hooks: Dict[str, List[Dict]] = {}
         self.loaded_plugins: Dict[str, Any] = {}
+        self.hook_timeout: float = settings.PLUGIN_HOOK_TIMEOUT
+        self.max_concurrency: int = settings.PLUGIN_HOOK_CONCURRENCY
+        # Contadores por plugin: calls / errors / timeouts
+        self.hook_stats: Dict[str, Dict[str, int]] = {}
+        # Latencias por plugin y hook, y circuit breaker por plugin
+        self.hook_metrics: Dict[str, Dict[str, HookMetrics]] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._background_tasks: set = set()
+        # Carga diferida: plugins activos aún no importados y métricas de carga
+        self.pending_plugins: Dict[str, Dict[str, Any]] = {}
+        self.failed_plugins: Dict[str, str] = {}
+        self.load_times: Dict[str, Dict[str, float]] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
         self._initialized = True
         logger.info("PluginManager inicializado")
     
-    async def load_plugins(self, session: Session = None):
+    async def load_plugins(self, session: Session = None, lazy: Optional[bool] = None):
         """
         Cargar todos los plugins activos desde la base de datos.
         
+        En modo lazy (``PLUGIN_LAZY_LOADING``) solo se registran los hooks declarados
+        en ``Plugin.hooks_suscritos``; el módulo se importa e inicializa la primera vez
+        que se dispara uno de ellos. Los plugins sin hooks declarados se cargan siempre.
+        
         Args:
             session: Sesión de base de datos (opcional, crea una nueva si no se proporciona)
+            lazy: Forzar (o desactivar) la carga diferida; por defecto usa la configuración
         """
+        if lazy is None:
+            lazy = settings.PLUGIN_LAZY_LOADING
+        
         close_session = False
         if session is None:
             session = Session(engine)
@@ -57,20 +83,99 @@ class PluginManager:
                 select(Plugin).where(Plugin.activo == True, Plugin.instalado == True)
             ).all()
             
-            logger.info(f"Cargando {len(plugins)} plugins activos...")
+            logger.info(f"Cargando {len(plugins)} plugins activos (lazy={lazy})...")
+            started = time.perf_counter()
             
             for plugin_db in plugins:
+                hooks = [h.strip() for h in (plugin_db.hooks_suscritos or "").split(",") if h.strip()]
+                if lazy and hooks:
+                    self._register_pending(plugin_db, hooks)
+                    continue
                 try:
                     await self._load_plugin_instance(plugin_db)
                 except Exception as e:
+                    self.failed_plugins[plugin_db.nombre_tecnico] = str(e)
                     logger.error(f"Error cargando plugin {plugin_db.nombre_tecnico}: {e}")
             
-            logger.info(f"Plugins cargados: {list(self.loaded_plugins.keys())}")
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.info(
+                f"Plugins cargados: {list(self.loaded_plugins.keys())}, "
+                f"diferidos: {list(self.pending_plugins.keys())} ({elapsed:.0f} ms)"
+            )
             
         finally:
             if close_session:
                 session.close()
     
+    def _register_pending(self, plugin_db: Plugin, hooks: List[str]):
+        """Registrar los hooks de un plugin sin importarlo todavía"""
+        nombre_tecnico = plugin_db.nombre_tecnico
+        if nombre_tecnico in self.loaded_plugins or nombre_tecnico in self.pending_plugins:
+            return
+        
+        for hook_name in hooks:
+            self.hooks.setdefault(hook_name, []).append({
+                "plugin_id": plugin_db.id_plugin,
+                "instance": None,
+                "nombre_tecnico": nombre_tecnico
+            })
+        self.pending_plugins[nombre_tecnico] = {
+            "db_id": plugin_db.id_plugin,
+            "plugin_db": plugin_db,
+            "hooks": hooks
+        }
+        logger.info(f"💤 Plugin {nombre_tecnico} diferido hasta el primer hook ({', '.join(hooks)})")
+    
+    def _remove_hooks(self, plugin_id: int):
+        for hook_name in list(self.hooks):
+            self.hooks[hook_name] = [h for h in self.hooks[hook_name] if h["plugin_id"] != plugin_id]
+    
+    async def ensure_loaded(self, nombre_tecnico: str) -> Optional[Any]:
+        """
+        Devolver la instancia de un plugin, importándolo e inicializándolo si estaba diferido.
+        Devuelve None si el plugin no está activo o su carga falló.
+        """
+        if nombre_tecnico in self.loaded_plugins:
+            return self.loaded_plugins[nombre_tecnico]["instance"]
+        if nombre_tecnico not in self.pending_plugins:
+            return None
+        
+        lock = self._load_locks.setdefault(nombre_tecnico, asyncio.Lock())
+        async with lock:
+            # Otro hook pudo haberlo cargado mientras esperábamos
+            if nombre_tecnico in self.loaded_plugins:
+                return self.loaded_plugins[nombre_tecnico]["instance"]
+            pending = self.pending_plugins.pop(nombre_tecnico, None)
+            if pending is None:
+                return None
+            
+            # Los hooks reales los registra la propia instancia al cargarse
+            self._remove_hooks(pending["db_id"])
+            try:
+                await self._load_plugin_instance(pending["plugin_db"])
+            except Exception as e:
+                self.failed_plugins[nombre_tecnico] = str(e)
+                return None
+            return self.loaded_plugins[nombre_tecnico]["instance"]
+    
+    async def warm_up(self, delay: float = 0):
+        """Cargar en segundo plano los plugins diferidos (uno a la vez)"""
+        if delay:
+            await asyncio.sleep(delay)
+        pending = list(self.pending_plugins)
+        if not pending:
+            return
+        logger.info(f"🔥 Precalentando {len(pending)} plugins diferidos")
+        for nombre_tecnico in pending:
+            await self.ensure_loaded(nombre_tecnico)
+    
+    def start_warm_up(self, delay: float = settings.PLUGIN_WARMUP_DELAY) -> asyncio.Task:
+        """Programar ``warm_up`` sin bloquear el arranque del servidor"""
+        task = asyncio.create_task(self.warm_up(delay))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
     async def _load_plugin_instance(self, plugin_db: Plugin):
         """
         Cargar una instancia de plugin desde la base de datos.
@@ -86,9 +191,11 @@ class PluginManager:
             return
         
         try:
-            # Importar el módulo del plugin
+            # Importar el módulo del plugin fuera del event loop (dependencias pesadas)
+            started = time.perf_counter()
             module_path = f"backend.plugins.{nombre_tecnico}.plugin"
-            module = importlib.import_module(module_path)
+            module = await asyncio.to_thread(importlib.import_module, module_path)
+            imported = time.perf_counter()
             
             # Obtener la clase del plugin
             class_name = ''.join(word.capitalize() for word in nombre_tecnico.split('_')) + 'Plugin'
@@ -99,6 +206,7 @@ class PluginManager:
             
             # Inicializar el plugin
             await plugin_instance.initialize()
+            initialized = time.perf_counter()
             
             # Registrar hooks
             for hook_name in plugin_instance.hooks:
@@ -110,8 +218,17 @@ class PluginManager:
                 "db_id": plugin_db.id_plugin,
                 "hooks": plugin_instance.hooks
             }
+            self.failed_plugins.pop(nombre_tecnico, None)
+            self.load_times[nombre_tecnico] = {
+                "import_ms": round((imported - started) * 1000, 1),
+                "init_ms": round((initialized - imported) * 1000, 1)
+            }
             
-            logger.info(f"✅ Plugin {nombre_tecnico} v{plugin_instance.version} cargado")
+            logger.info(
+                f"✅ Plugin {nombre_tecnico} v{plugin_instance.version} cargado "
+                f"(import {self.load_times[nombre_tecnico]['import_ms']} ms, "
+                f"init {self.load_times[nombre_tecnico]['init_ms']} ms)"
+            )
             
         except ImportError as e:
             logger.error(f"❌ No se pudo importar plugin {nombre_tecnico}: {e}")
@@ -134,36 +251,185 @@ class PluginManager:
         
         self.hooks[hook_name].append({
             "plugin_id": plugin_id,
-            "instance": plugin_instance
+            "instance": plugin_instance,
+            "nombre_tecnico": getattr(plugin_instance, "nombre_tecnico", str(plugin_instance))
         })
         
         logger.debug(f"Hook '{hook_name}' registrado para plugin ID {plugin_id}")
     
-    async def call_hook(self, hook_name: str, **kwargs):
+    async def call_hook(self, hook_name: str, **kwargs) -> Dict[str, str]:
         """
         Ejecutar todos los callbacks registrados para un hook.
-        Los errores en un plugin no afectan a los demás.
+        Los plugins se ejecutan concurrentemente (hasta ``max_concurrency`` a la vez),
+        cada uno con su propio timeout. Los errores en un plugin no afectan a los demás.
         
         Args:
             hook_name: Nombre del hook a disparar
             **kwargs: Parámetros para pasar a los callbacks
+            
+        Returns:
+            Resultado por plugin: "ok", "error", "timeout" o "circuit_open"
         """
-        if hook_name not in self.hooks:
-            return
+        subscribers = list(self.hooks.get(hook_name, []))
+        if not subscribers:
+            return {}
         
-        logger.debug(f"Disparando hook '{hook_name}' con {len(self.hooks[hook_name])} plugins")
+        # Primer disparo para plugins diferidos: importarlos antes de ejecutar
+        lazy = {h["nombre_tecnico"] for h in subscribers if h["instance"] is None}
+        if lazy:
+            await asyncio.gather(*(self.ensure_loaded(nombre) for nombre in lazy))
+            subscribers = [h for h in self.hooks.get(hook_name, []) if h["instance"] is not None]
+            if not subscribers:
+                return {}
         
-        for hook_data in self.hooks[hook_name]:
-            plugin_instance = hook_data["instance"]
-            
+        logger.debug(f"Disparando hook '{hook_name}' con {len(subscribers)} plugins")
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def _run(plugin_instance: Any) -> str:
+            nombre = getattr(plugin_instance, "nombre_tecnico", str(plugin_instance))
+            breaker = self._breaker_for(nombre)
+            if not breaker.allow():
+                # Plugin con demasiados fallos seguidos: no penalizar al resto del request
+                self._metrics_for(nombre, hook_name).rejected += 1
+                return "circuit_open"
+            timeout = self._timeout_for(plugin_instance)
+            async with semaphore:
+                try:
+                    await self._instrumented(nombre, hook_name, plugin_instance.on_hook(hook_name, **kwargs), timeout)
+                    return "ok"
+                except asyncio.TimeoutError:
+                    logger.error(f"⏱️ Plugin {nombre} excedió {timeout}s en hook '{hook_name}'")
+                    return "timeout"
+                except Exception as e:
+                    logger.error(f"❌ Error en plugin {nombre} para hook '{hook_name}': {e}")
+                    return "error"
+        
+        instances = [hook_data["instance"] for hook_data in subscribers]
+        results = await asyncio.gather(*(_run(instance) for instance in instances))
+        return {
+            getattr(instance, "nombre_tecnico", str(instance)): result
+            for instance, result in zip(instances, results)
+        }
+    
+    async def deliver_batch(self, nombre_tecnico: str, hook_name: str, events: List[Dict[str, Any]]):
+        """
+        Entregar un lote de eventos del outbox a un plugin cargado.
+        Lanza LookupError si el plugin no está cargado, CircuitOpenError si su circuito
+        está abierto y propaga errores/timeouts para que el outbox programe el reintento.
+        """
+        plugin_instance = await self.ensure_loaded(nombre_tecnico)
+        if plugin_instance is None:
+            raise LookupError(f"Plugin {nombre_tecnico} no está cargado")
+        
+        breaker = self._breaker_for(nombre_tecnico)
+        if not breaker.allow():
+            self._metrics_for(nombre_tecnico, hook_name).rejected += 1
+            raise CircuitOpenError(nombre_tecnico, breaker.retry_in())
+        
+        timeout = self._timeout_for(plugin_instance)
+        # Sin handler de lote, el plugin procesa los eventos uno a uno
+        if not hasattr(plugin_instance, f"on_{hook_name}_batch"):
+            timeout *= len(events)
+        
+        await self._instrumented(nombre_tecnico, hook_name, plugin_instance.on_hook_batch(hook_name, events), timeout)
+    
+    async def _instrumented(self, nombre_tecnico: str, hook_name: str, awaitable, timeout: float):
+        """Ejecutar un handler con timeout, registrando latencia, contadores y estado del circuito"""
+        stats = self._stats_for(nombre_tecnico)
+        metrics = self._metrics_for(nombre_tecnico, hook_name)
+        breaker = self._breaker_for(nombre_tecnico)
+        stats["calls"] += 1
+        started = time.perf_counter()
+        with get_tracer().start_as_current_span(
+            f"plugin.{hook_name}",
+            attributes={"plugin.name": nombre_tecnico, "plugin.hook": hook_name, "plugin.timeout": timeout}
+        ):
+            # Una cancelación (p. ej. apagado) no cuenta como éxito ni como fallo
             try:
-                # Llamar al handler específico del hook
-                await plugin_instance.on_hook(hook_name, **kwargs)
-                
-            except Exception as e:
-                logger.error(f"❌ Error en plugin {plugin_instance.nombre_tecnico} para hook '{hook_name}': {e}")
-                # Continuar con el siguiente plugin, no detener
-                continue
+                await asyncio.wait_for(awaitable, timeout)
+            except asyncio.TimeoutError:
+                stats["timeouts"] += 1
+                self._record_result(nombre_tecnico, metrics, breaker, started, "timeout")
+                raise
+            except Exception:
+                stats["errors"] += 1
+                self._record_result(nombre_tecnico, metrics, breaker, started, "error")
+                raise
+            self._record_result(nombre_tecnico, metrics, breaker, started, "ok")
+    
+    def _record_result(self, nombre_tecnico: str, metrics: HookMetrics, breaker: CircuitBreaker, started: float, result: str):
+        metrics.record((time.perf_counter() - started) * 1000, result)
+        if result == "ok":
+            breaker.record_success()
+            return
+        was_open = breaker.state == "open"
+        breaker.record_failure()
+        if breaker.state == "open" and not was_open:
+            logger.warning(
+                f"🔌 Circuito abierto para plugin {nombre_tecnico} "
+                f"({breaker.failures} fallos seguidos, pausa {breaker.cooldown}s)"
+            )
+    
+    def _timeout_for(self, plugin_instance: Any) -> float:
+        timeout = getattr(plugin_instance, "hook_timeout", None)
+        if not isinstance(timeout, (int, float)) or timeout <= 0:
+            timeout = self.hook_timeout
+        return timeout
+    
+    def _metrics_for(self, nombre_tecnico: str, hook_name: str) -> HookMetrics:
+        return self.hook_metrics.setdefault(nombre_tecnico, {}).setdefault(hook_name, HookMetrics())
+    
+    def _breaker_for(self, nombre_tecnico: str) -> CircuitBreaker:
+        if nombre_tecnico not in self.breakers:
+            self.breakers[nombre_tecnico] = CircuitBreaker()
+        return self.breakers[nombre_tecnico]
+    
+    def _stats_for(self, nombre_tecnico: str) -> Dict[str, int]:
+        return self.hook_stats.setdefault(nombre_tecnico, {"calls": 0, "errors": 0, "timeouts": 0})
+    
+    def dispatch_hook(self, hook_name: str, **kwargs) -> Optional[asyncio.Task]:
+        """
+        Disparar un hook sin esperar su resultado (fire-and-forget).
+        La respuesta de la API no espera a los plugins; los errores y timeouts
+        quedan registrados en ``hook_stats``.
+        """
+        if not self.hooks.get(hook_name):
+            return None
+        
+        task = asyncio.create_task(self.call_hook(hook_name, **kwargs))
+        # Mantener referencia para que la tarea no sea recolectada antes de terminar
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
+    async def drain_background_hooks(self, timeout: Optional[float] = None):
+        """Esperar a que terminen los hooks disparados en segundo plano (p. ej. al apagar)"""
+        if self._background_tasks:
+            await asyncio.wait(list(self._background_tasks), timeout=timeout)
+    
+    def get_hook_stats(self) -> Dict[str, Dict[str, int]]:
+        """Contadores de ejecución de hooks por plugin"""
+        return {nombre: dict(stats) for nombre, stats in self.hook_stats.items()}
+    
+    def get_plugin_metrics(self, nombre_tecnico: str) -> Dict[str, Any]:
+        """Métricas por hook (latencias p50/p95/p99, tasa de error) y estado del circuito de un plugin"""
+        return {
+            "hooks": {
+                hook_name: metrics.snapshot()
+                for hook_name, metrics in self.hook_metrics.get(nombre_tecnico, {}).items()
+            },
+            "circuito": self._breaker_for(nombre_tecnico).snapshot()
+        }
+    
+    def get_all_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas de todos los plugins que recibieron al menos un hook"""
+        nombres = set(self.hook_metrics) | set(self.breakers)
+        return {nombre: self.get_plugin_metrics(nombre) for nombre in sorted(nombres)}
+    
+    def reset_circuit(self, nombre_tecnico: str):
+        """Cerrar manualmente el circuito de un plugin"""
+        self._breaker_for(nombre_tecnico).reset()
     
     async def install_plugin(self, plugin_data: dict, session: Session) -> Plugin:
         """
@@ -259,17 +525,13 @@ class PluginManager:
             except Exception as e:
                 logger.error(f"Error en shutdown de {nombre_tecnico}: {e}")
             
-            # Remover hooks
-            for hook_name in plugin_data["hooks"]:
-                if hook_name in self.hooks:
-                    self.hooks[hook_name] = [
-                        h for h in self.hooks[hook_name] 
-                        if h["plugin_id"] != plugin_id
-                    ]
-            
             # Remover de loaded_plugins
             del self.loaded_plugins[nombre_tecnico]
         
+        # Remover hooks (también los de un plugin diferido nunca importado)
+        self.pending_plugins.pop(nombre_tecnico, None)
+        self._remove_hooks(plugin_id)
+        
         # Actualizar estado en BD
         plugin_db.activo = False
         plugin_db.actualizado_el = datetime.utcnow()
@@ -296,6 +558,14 @@ class PluginManager:
         """Verificar si un plugin está cargado en memoria"""
         return nombre_tecnico in self.loaded_plugins
     
+    def is_plugin_active(self, nombre_tecnico: str) -> bool:
+        """Verificar si un plugin está cargado o pendiente de carga diferida"""
+        return nombre_tecnico in self.loaded_plugins or nombre_tecnico in self.pending_plugins
+    
+    def get_pending_plugins(self) -> List[str]:
+        """Obtener lista de plugins activos que aún no se importaron"""
+        return list(self.pending_plugins.keys())
+    
     def get_loaded_plugins(self) -> List[str]:
         """Obtener lista de plugins cargados"""
         return list(self.loaded_plugins.keys())
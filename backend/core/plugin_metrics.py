@@ -0,0 +1,138 @@
+"""
+Per-plugin hook instrumentation and circuit breaker.
+
+``HookMetrics`` keeps call/error/timeout counters and a bounded window of recent
+latencies for one (plugin, hook) pair, from which p50/p95/p99 are computed on
+demand. ``CircuitBreaker`` stops calling a plugin after repeated failures or
+timeouts and lets a single trial call through once the cooldown has elapsed.
+"""
+import math
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from .config import settings
+
+
+def _percentile(sorted_values: list, pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return round(sorted_values[rank - 1], 2)
+
+
+class HookMetrics:
+    """
+    Counters and latency window for one plugin handling one hook.
+
+    Args:
+        window: Number of most recent latencies kept for percentiles.
+    """
+
+    def __init__(self, window: int = 500):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, elapsed_ms: float, result: str):
+        self.calls += 1
+        self.latencies.append(elapsed_ms)
+        if result == "error":
+            self.errors += 1
+        elif result == "timeout":
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        values = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "rechazadas": self.rejected,
+            "error_rate": round((self.errors + self.timeouts) / self.calls, 4) if self.calls else 0.0,
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+            "max_ms": values[-1] if values else None
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for a single plugin.
+
+    closed -> open after ``threshold`` consecutive errors/timeouts;
+    open -> half_open once ``cooldown`` seconds have passed (one trial call);
+    half_open -> closed on success, back to open on failure.
+    """
+
+    def __init__(
+        self,
+        threshold: int = settings.PLUGIN_BREAKER_THRESHOLD,
+        cooldown: float = settings.PLUGIN_BREAKER_COOLDOWN,
+        clock=time.monotonic
+    ):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the trial slot when half-open)."""
+        if self.state == "closed":
+            return True
+        # A half-open trial that never reported back (e.g. cancelled) expires too
+        if self.clock() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+            self.opened_at = self.clock()
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial call is allowed."""
+        if self.state == "closed":
+            return 0.0
+        return max(self.cooldown - (self.clock() - self.opened_at), 0.0)
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = self.clock()
+
+    def reset(self):
+        self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "estado": self.state,
+            "fallos_consecutivos": self.failures,
+            "aperturas": self.times_opened,
+            "reintento_en_s": round(self.retry_in(), 1)
+        }
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a delivery is skipped because the plugin's circuit is open."""
+
+    def __init__(self, nombre_tecnico: str, retry_in: float):
+        super().__init__(f"Circuito abierto para {nombre_tecnico}")
+        self.nombre_tecnico = nombre_tecnico
+        self.retry_in = retry_in
+
+
+class PermanentDeliveryError(RuntimeError):
+    """Raised by a plugin when retrying cannot succeed (e.g. the remote API rejected the request)."""
@@ -0,0 +1,143 @@
+"""
+Per-request SQL instrumentation.
+
+``before/after_cursor_execute`` listeners on every SQLAlchemy engine (sync,
+async and read replica) time each statement. ``QueryCounterMiddleware`` opens a
+``QueryStats`` for each HTTP request; the listeners add to it through a context
+variable, so statements run from the threadpool or ``AsyncSession.run_sync`` are
+counted too. The response carries them in ``Server-Timing``
+(``db;dur=<ms>;desc="<n> queries"``).
+
+Statements slower than ``SLOW_QUERY_MS`` are logged without their parameters,
+and requests running more than ``QUERY_COUNT_WARN`` statements are logged as
+likely N+1 patterns. ``query_budget`` counts statements from any thread and is
+what the ``query_budget`` pytest fixture uses.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_STATEMENT = 1000
+
+
+class QueryStats:
+    """Statements executed (and time spent in the database) within a scope."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, statement: str, elapsed_ms: float, keep_statement: bool = False):
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if keep_statement:
+                self.statements.append(statement)
+
+
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+_budgets: List[QueryStats] = []
+_budgets_lock = threading.Lock()
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Stats of the request being served (None outside a request)."""
+    return _request_stats.get()
+
+
+def _redacted(statement: str, parameters) -> str:
+    """Statement text only: bound values never reach the logs."""
+    text = " ".join(statement.split())
+    if len(text) > MAX_LOGGED_STATEMENT:
+        text = text[:MAX_LOGGED_STATEMENT] + "..."
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f"{text} [executemany x{len(parameters)}, parameters redacted]"
+    return f"{text} [parameters redacted]"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(statement, elapsed_ms)
+    if _budgets:
+        with _budgets_lock:
+            for budget in _budgets:
+                budget.add(statement, elapsed_ms, keep_statement=True)
+
+    if elapsed_ms >= settings.SLOW_QUERY_MS:
+        logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {_redacted(statement, parameters)}")
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Count every statement executed in the block (from any thread, e.g. the
+    TestClient's event loop) and raise AssertionError if there are more than
+    ``max_queries``.
+    """
+    stats = QueryStats()
+    with _budgets_lock:
+        _budgets.append(stats)
+    try:
+        yield stats
+    finally:
+        with _budgets_lock:
+            _budgets.remove(stats)
+    if stats.count > max_queries:
+        listing = "\n".join(f"  {i + 1}. {_redacted(s, None)}" for i, s in enumerate(stats.statements))
+        raise AssertionError(f"{stats.count} queries executed, budget is {max_queries}:\n{listing}")
+
+
+class QueryCounterMiddleware:
+    """ASGI middleware adding the request's query count and DB time as Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"'.encode("latin-1")
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            if stats.count > settings.QUERY_COUNT_WARN:
+                logger.warning(
+                    f"{scope.get('method')} {scope.get('path')} ran {stats.count} queries "
+                    f"({stats.total_ms:.1f} ms in DB): possible N+1"
+                )
@@ -0,0 +1,333 @@
+"""
+Storage backends for the API rate limiter and CSRF tokens.
+
+The limiter (slowapi / ``limits``) uses the sliding-window counter strategy,
+which only needs per-key counters with an expiry. These classes register their
+own ``limits`` storage schemes so the limiter can keep them in one place that
+all workers share:
+
+- ``bounded-memory://``: per process, capped at ``RATE_LIMIT_MAX_KEYS`` keys
+  (least recently used are evicted first). Only correct with a single worker.
+- ``redis-counter://host:port/db``: any Redis-protocol server. Plain
+  ``SET NX`` + ``INCRBY`` pipelines, no Lua scripts, so it also runs against
+  fakeredis and Redis-compatible servers without scripting.
+- ``database://``: the ``rate_limit_entries`` table, for deployments without
+  Redis.
+
+Every backend also stores short-lived values (``set_value``/``get_value``),
+used for CSRF tokens, and ``purge_expired`` drops what has expired.
+"""
+import math
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from cachetools import TLRUCache
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlmodel import Session
+
+from .config import settings
+from ..models.models_security import RateLimitEntry
+
+class SlidingWindowCounters(SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Sliding-window counter strategy on top of ``incr``/``decr``/``get``."""
+
+    def _window(self, previous_key: str, current_key: str, expiry: int, now: float) -> Tuple[int, float, int, float]:
+        previous_count = self.get(previous_key)
+        current_count = self.get(current_key)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count, previous_ttl, current_count, _ = self._window(previous_key, current_key, expiry, now)
+        weighted = previous_count * previous_ttl / expiry
+        if math.floor(weighted + current_count) + amount > limit:
+            return False
+        # The current window is still weighted while it is the previous one
+        current_count = self.incr(current_key, 2 * expiry, amount=amount)
+        if math.floor(weighted + current_count) > limit:
+            # Another worker took the last slot in between
+            self.decr(current_key, amount)
+            return False
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> Tuple[int, float, int, float]:
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._window(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        for window_key in self.sliding_window_keys(key, expiry, time.time()):
+            self.clear(window_key)
+
+
+class BoundedMemoryStorage(Storage, SlidingWindowCounters):
+    """
+    Args:
+        maxsize: Maximum keys (counters and tokens) kept in memory.
+    """
+    STORAGE_SCHEME = ["bounded-memory"]
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False,
+                 maxsize: int = settings.RATE_LIMIT_MAX_KEYS, **options):
+        # Entries are (counter or value, expires at); each one expires on its own deadline
+        self._entries: TLRUCache = TLRUCache(maxsize=maxsize, ttu=lambda _key, entry, _now: entry[1], timer=time.time)
+        self._lock = threading.Lock()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return ValueError
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        with self._lock:
+            count, expires = self._entries.get(key, (0, time.time() + expiry))
+            self._entries[key] = (count + amount, expires)
+            return count + amount
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0
+            count = max(entry[0] - amount, 0)
+            self._entries[key] = (count, entry[1])
+            return count
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry else time.time()
+
+    def check(self) -> bool:
+        return True
+
+    def reset(self) -> Optional[int]:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def set_value(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+
+    def get_value(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return len(self._entries.expire())
+
+
+class RedisCounterStorage(Storage, SlidingWindowCounters):
+    """
+    Args:
+        uri: ``redis-counter://`` (or ``rediss-counter://``) URL of the server.
+        client: Pre-built sync Redis client (e.g. ``fakeredis`` in tests).
+        key_prefix: Namespace for every key written.
+    """
+    STORAGE_SCHEME = ["redis-counter", "rediss-counter"]
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False,
+                 client: Any = None, key_prefix: str = "3f:ratelimit", **options):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(uri.replace("-counter://", "://", 1), decode_responses=True)
+        self._client = client
+        self.key_prefix = key_prefix
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        import redis
+        return redis.RedisError
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        pipe = self._client.pipeline()
+        # The first hit of a window sets its expiry; later hits only count
+        pipe.set(self._key(key), 0, ex=max(int(math.ceil(expiry)), 1), nx=True)
+        pipe.incrby(self._key(key), amount)
+        return int(pipe.execute()[1])
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        return int(self._client.decrby(self._key(key), amount))
+
+    def get(self, key: str) -> int:
+        return int(self._client.get(self._key(key)) or 0)
+
+    def get_expiry(self, key: str) -> float:
+        ttl = self._client.pttl(self._key(key))
+        return time.time() + max(ttl, 0) / 1000
+
+    def check(self) -> bool:
+        try:
+            return bool(self._client.ping())
+        except Exception:
+            return False
+
+    def reset(self) -> Optional[int]:
+        keys = list(self._client.scan_iter(match=f"{self.key_prefix}:*"))
+        return self._client.delete(*keys) if keys else 0
+
+    def clear(self, key: str) -> None:
+        self._client.delete(self._key(key))
+
+    def set_value(self, key: str, value: str, ttl: float):
+        self._client.set(self._key(key), value, px=max(int(ttl * 1000), 1))
+
+    def get_value(self, key: str) -> Optional[str]:
+        return self._client.get(self._key(key))
+
+    def purge_expired(self) -> int:
+        # Redis expires keys on its own
+        return 0
+
+
+class DatabaseStorage(Storage, SlidingWindowCounters):
+    """
+    Args:
+        session_factory: Callable returning a new Session.
+    """
+    STORAGE_SCHEME = ["database"]
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False,
+                 session_factory: Optional[Callable[[], Session]] = None, **options):
+        if session_factory is None:
+            from .database import engine
+            session_factory = lambda: Session(engine)
+        self.session_factory = session_factory
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return SQLAlchemyError
+
+    @staticmethod
+    def _live(key: str, now: float):
+        return (RateLimitEntry.clave == key) & (RateLimitEntry.expira_el > now)
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        for _ in range(3):
+            now = time.time()
+            with self.session_factory() as session:
+                try:
+                    updated = session.execute(
+                        update(RateLimitEntry).where(self._live(key, now))
+                        .values(contador=RateLimitEntry.contador + amount)
+                    ).rowcount
+                    if not updated:
+                        # New window: drop an expired row left behind, never a live one
+                        session.execute(delete(RateLimitEntry).where(
+                            RateLimitEntry.clave == key, RateLimitEntry.expira_el <= now
+                        ))
+                        session.add(RateLimitEntry(clave=key, contador=amount, expira_el=now + expiry))
+                    session.commit()
+                except IntegrityError:
+                    # Another worker opened the window first: count on its row
+                    session.rollback()
+                    continue
+                return session.execute(
+                    select(RateLimitEntry.contador).where(RateLimitEntry.clave == key)
+                ).scalar() or amount
+        raise SQLAlchemyError(f"Could not increment rate limit counter {key}")
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        with self.session_factory() as session:
+            session.execute(
+                update(RateLimitEntry)
+                .where(RateLimitEntry.clave == key, RateLimitEntry.contador >= amount)
+                .values(contador=RateLimitEntry.contador - amount)
+            )
+            session.commit()
+            return session.execute(
+                select(RateLimitEntry.contador).where(RateLimitEntry.clave == key)
+            ).scalar() or 0
+
+    def get(self, key: str) -> int:
+        with self.session_factory() as session:
+            return session.execute(
+                select(RateLimitEntry.contador).where(self._live(key, time.time()))
+            ).scalar() or 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        with self.session_factory() as session:
+            return session.execute(
+                select(RateLimitEntry.expira_el).where(self._live(key, now))
+            ).scalar() or now
+
+    def check(self) -> bool:
+        try:
+            with self.session_factory() as session:
+                session.execute(select(RateLimitEntry.clave).limit(1))
+            return True
+        except Exception:
+            return False
+
+    def reset(self) -> Optional[int]:
+        with self.session_factory() as session:
+            removed = session.execute(delete(RateLimitEntry)).rowcount
+            session.commit()
+            return removed
+
+    def clear(self, key: str) -> None:
+        with self.session_factory() as session:
+            session.execute(delete(RateLimitEntry).where(RateLimitEntry.clave == key))
+            session.commit()
+
+    def set_value(self, key: str, value: str, ttl: float):
+        with self.session_factory() as session:
+            session.execute(delete(RateLimitEntry).where(RateLimitEntry.clave == key))
+            session.add(RateLimitEntry(clave=key, valor=value, expira_el=time.time() + ttl))
+            session.commit()
+
+    def get_value(self, key: str) -> Optional[str]:
+        with self.session_factory() as session:
+            return session.execute(
+                select(RateLimitEntry.valor).where(self._live(key, time.time()))
+            ).scalar()
+
+    def purge_expired(self) -> int:
+        with self.session_factory() as session:
+            removed = session.execute(
+                delete(RateLimitEntry).where(RateLimitEntry.expira_el <= time.time())
+            ).rowcount
+            session.commit()
+            return removed
+
+
+def storage_uri(backend: str = settings.RATE_LIMIT_STORAGE, redis_url: Optional[str] = settings.REDIS_URL) -> str:
+    """``limits`` storage URI for a RATE_LIMIT_STORAGE value ('auto' prefers Redis, then the database)."""
+    if backend == "auto":
+        backend = "redis" if redis_url else "database"
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("RATE_LIMIT_STORAGE=redis requires REDIS_URL")
+        scheme, rest = redis_url.split("://", 1)
+        return f"{scheme}-counter://{rest}"
+    if backend == "database":
+        return "database://"
+    return "bounded-memory://"
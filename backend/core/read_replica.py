@@ -0,0 +1,127 @@
+"""
+Read-replica routing for read-only endpoints.
+
+``ReadReplicaRouter.read_engine`` returns the replica while it is reachable and
+its replication lag is within ``READ_REPLICA_MAX_LAG`` seconds, otherwise the
+primary. The check runs at most once every ``READ_REPLICA_CHECK_INTERVAL``
+seconds, so requests do not pay for it. Lag is read natively on PostgreSQL
+(``pg_last_xact_replay_timestamp``) and MySQL (``SHOW REPLICA STATUS``); other
+engines, such as a second SQLite file used locally, report no lag.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """Connection pool counters of an engine (QueuePool exposes the full set)."""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool": type(pool).__name__, "url": engine.url.render_as_string(hide_password=True)}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        counter = getattr(pool, name, None)
+        if callable(counter):
+            status[name] = counter()
+    return status
+
+
+class ReadReplicaRouter:
+    """
+    Args:
+        primary: Engine used for writes and as fallback.
+        replica: Optional read-replica engine.
+        max_lag: Seconds of replication lag tolerated before reads go to the primary.
+        check_interval: Seconds between replica health / lag checks.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replica: Optional[Engine] = None,
+        max_lag: float = settings.READ_REPLICA_MAX_LAG,
+        check_interval: float = settings.READ_REPLICA_CHECK_INTERVAL
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Optional[float] = None
+        self.usable = replica is not None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def replica_lag(self) -> float:
+        """Replication lag of the replica in seconds (raises if it is unreachable)."""
+        with self.replica.connect() as conn:
+            dialect = conn.dialect.name
+            if dialect == "postgresql":
+                lag = conn.execute(text(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                )).scalar()
+                return float(lag or 0)
+            if dialect == "mysql":
+                row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+                if row is None:
+                    return 0.0
+                lag = row.get("Seconds_Behind_Source")
+                # NULL means replication is stopped: treat as infinitely behind
+                return float("inf") if lag is None else float(lag)
+            conn.execute(text("SELECT 1"))
+            return 0.0
+
+    def _check(self):
+        try:
+            self.lag = self.replica_lag()
+            usable = self.lag <= self.max_lag
+            if not usable:
+                logger.warning(f"Read replica {self.lag:.1f}s behind (max {self.max_lag}s): reading from primary")
+        except Exception as e:
+            self.lag = None
+            usable = False
+            logger.warning(f"Read replica unavailable, reading from primary: {e}")
+        if usable and not self.usable:
+            logger.info("Read replica back in rotation")
+        self.usable = usable
+
+    def read_engine(self) -> Engine:
+        """Engine for a read-only request."""
+        if self.replica is None:
+            self.primary_reads += 1
+            return self.primary
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            # One request refreshes the state; the others use the last known one
+            try:
+                self._checked_at = now
+                self._check()
+            finally:
+                self._lock.release()
+        if self.usable:
+            self.replica_reads += 1
+            return self.replica
+        self.primary_reads += 1
+        return self.primary
+
+    def status(self) -> Dict[str, Any]:
+        """Replica state and per-engine pool metrics."""
+        return {
+            "replica_configured": self.replica is not None,
+            "replica_usable": self.usable,
+            "replica_lag_seconds": self.lag,
+            "max_lag_seconds": self.max_lag,
+            "reads": {"replica": self.replica_reads, "primary": self.primary_reads},
+            "pools": {
+                "primary": pool_status(self.primary),
+                **({"replica": pool_status(self.replica)} if self.replica is not None else {})
+            }
+        }
@@ -0,0 +1,297 @@
+"""
+Fuzzy matching engine for bank statement reconciliation.
+
+Each statement row is scored against existing ledger entries on three signals:
+date distance, amount tolerance and description/payee similarity (trigram and
+token-set). Candidates are pre-bucketed by day so only nearby entries are ever
+scored, and rows are paired one-to-one by solving an assignment problem
+(Hungarian algorithm) per connected group of competing rows and entries.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_IMPORT_PREFIX = "[importado]"
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse non-alphanumerics to single spaces."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    if text.startswith(_IMPORT_PREFIX):
+        text = text[len(_IMPORT_PREFIX):]
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def text_similarity(a: Optional[str], b: Optional[str]) -> float:
+    """
+    Similarity in [0, 1]: the best of trigram Jaccard and token-set overlap
+    (shared tokens over the smaller token set).
+    """
+    na, nb = normalize_text(a), normalize_text(b)
+    if not na or not nb:
+        return 0.0
+    if na == nb:
+        return 1.0
+
+    ta, tb = _trigrams(na), _trigrams(nb)
+    trigram = len(ta & tb) / len(ta | tb)
+
+    sa, sb = set(na.split()), set(nb.split())
+    token_set = len(sa & sb) / min(len(sa), len(sb))
+    return max(trigram, token_set)
+
+
+def _to_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def hungarian(cost: List[List[float]]) -> List[int]:
+    """
+    Minimum-cost assignment for an n x m matrix with n <= m
+    (Kuhn–Munkres with potentials, O(n^2 m)).
+    Returns, for each row, the assigned column index.
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    INF = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)   # p[j]: row assigned to column j (1-based, 0 = none)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = INF
+            j1 = 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if not j0:
+                break
+
+    assignment = [-1] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+    return assignment
+
+
+class ReconciliationMatcher:
+    """
+    Scores statement rows against ledger candidates and assigns them one-to-one.
+
+    Args:
+        date_window_days: Maximum date distance for a candidate.
+        amount_tolerance: Relative amount tolerance (0.01 = 1%).
+        min_score: Minimum score (0-100) to accept a pairing as a match.
+        max_group_size: Groups larger than this fall back to greedy assignment.
+    """
+
+    WEIGHT_AMOUNT = 0.5
+    WEIGHT_DATE = 0.3
+    WEIGHT_TEXT = 0.2
+
+    def __init__(
+        self,
+        date_window_days: int = 3,
+        amount_tolerance: float = 0.01,
+        min_score: float = 60.0,
+        max_group_size: int = 200
+    ):
+        self.date_window_days = date_window_days
+        self.amount_tolerance = Decimal(str(amount_tolerance))
+        self.min_score = min_score
+        self.max_group_size = max_group_size
+
+    def score(self, row: Dict[str, Any], candidate: Dict[str, Any]) -> float:
+        """Score (0-100) a statement row against a ledger candidate; 0 if incompatible."""
+        row_date, cand_date = _to_date(row.get("fecha")), _to_date(candidate.get("fecha"))
+        if row_date is None or cand_date is None:
+            return 0.0
+        distance = abs((row_date - cand_date).days)
+        if distance > self.date_window_days:
+            return 0.0
+
+        row_amount = Decimal(str(row.get("monto") or 0))
+        cand_amount = Decimal(str(candidate.get("monto") or 0))
+        if row_amount == cand_amount:
+            amount_score = 1.0
+        else:
+            if (row_amount < 0) != (cand_amount < 0):
+                return 0.0
+            reference = max(abs(row_amount), abs(cand_amount))
+            relative = abs(row_amount - cand_amount) / reference if reference else Decimal(1)
+            if relative > self.amount_tolerance:
+                return 0.0
+            amount_score = 0.9 * (1 - float(relative / self.amount_tolerance))
+
+        date_score = 1 - distance / (self.date_window_days + 1)
+        text_score = max(
+            text_similarity(row.get("descripcion"), candidate.get("descripcion")),
+            text_similarity(row.get("descripcion"), candidate.get("beneficiario"))
+        )
+
+        total = (
+            self.WEIGHT_AMOUNT * amount_score
+            + self.WEIGHT_DATE * date_score
+            + self.WEIGHT_TEXT * text_score
+        )
+        return round(total * 100, 2)
+
+    def match(
+        self,
+        rows: Sequence[Dict[str, Any]],
+        candidates: Sequence[Dict[str, Any]]
+    ) -> List[Optional[Tuple[int, float]]]:
+        """
+        Pair statement rows with candidates.
+
+        Rows use the parser keys (fecha, descripcion, monto). Candidates use
+        fecha, descripcion, beneficiario, monto. Returns one entry per row:
+        ``(candidate_index, score)`` or ``None`` when no acceptable match exists.
+        """
+        # 1. Bucket candidates by day so each row only sees its date window
+        by_day: Dict[int, List[int]] = defaultdict(list)
+        for idx, cand in enumerate(candidates):
+            cand_date = _to_date(cand.get("fecha"))
+            if cand_date is not None:
+                by_day[cand_date.toordinal()].append(idx)
+
+        edges: Dict[int, Dict[int, float]] = {}
+        for r_idx, row in enumerate(rows):
+            row_date = _to_date(row.get("fecha"))
+            if row_date is None:
+                continue
+            day = row_date.toordinal()
+            for offset in range(-self.date_window_days, self.date_window_days + 1):
+                for c_idx in by_day.get(day + offset, ()):
+                    s = self.score(row, candidates[c_idx])
+                    if s >= self.min_score:
+                        edges.setdefault(r_idx, {})[c_idx] = s
+
+        # 2. Split competing rows/candidates into independent groups (union-find)
+        parent: Dict[Any, Any] = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for r_idx, cands in edges.items():
+            for c_idx in cands:
+                parent[find(("r", r_idx))] = find(("c", c_idx))
+
+        groups: Dict[Any, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        for node in list(parent):
+            kind, idx = node
+            groups[find(node)][0 if kind == "r" else 1].append(idx)
+
+        # 3. Optimal one-to-one assignment per group
+        result: List[Optional[Tuple[int, float]]] = [None] * len(rows)
+        for group_rows, group_cands in groups.values():
+            group_rows.sort()
+            group_cands.sort()
+            for r_idx, c_idx in self._assign(group_rows, group_cands, edges):
+                result[r_idx] = (c_idx, edges[r_idx][c_idx])
+        return result
+
+    def _assign(
+        self,
+        group_rows: List[int],
+        group_cands: List[int],
+        edges: Dict[int, Dict[int, float]]
+    ) -> List[Tuple[int, int]]:
+        if len(group_rows) + len(group_cands) > self.max_group_size:
+            return self._assign_greedy(group_rows, edges)
+
+        # Hungarian needs rows <= columns; transpose if necessary
+        transposed = len(group_rows) > len(group_cands)
+        left, right = (group_cands, group_rows) if transposed else (group_rows, group_cands)
+
+        # Cost = -score; unmatched pairs get a prohibitive cost. A tiny penalty by
+        # row position breaks ties in favour of the earlier statement row.
+        NO_EDGE = 1e6
+        cost = []
+        for a in left:
+            line = []
+            for b in right:
+                r_idx, c_idx = (b, a) if transposed else (a, b)
+                s = edges.get(r_idx, {}).get(c_idx)
+                line.append(NO_EDGE if s is None else -s + r_idx * 1e-6)
+            cost.append(line)
+
+        pairs = []
+        for i, j in enumerate(hungarian(cost)):
+            if j < 0:
+                continue
+            r_idx, c_idx = (right[j], left[i]) if transposed else (left[i], right[j])
+            if c_idx in edges.get(r_idx, {}):
+                pairs.append((r_idx, c_idx))
+        return pairs
+
+    @staticmethod
+    def _assign_greedy(group_rows: List[int], edges: Dict[int, Dict[int, float]]) -> List[Tuple[int, int]]:
+        scored = sorted(
+            ((s, r_idx, c_idx) for r_idx in group_rows for c_idx, s in edges.get(r_idx, {}).items()),
+            key=lambda item: (-item[0], item[1], item[2])
+        )
+        used_rows, used_cands, pairs = set(), set(), []
+        for _, r_idx, c_idx in scored:
+            if r_idx in used_rows or c_idx in used_cands:
+                continue
+            used_rows.add(r_idx)
+            used_cands.add(c_idx)
+            pairs.append((r_idx, c_idx))
+        return pairs
+
+
+reconciliation_matcher = ReconciliationMatcher()
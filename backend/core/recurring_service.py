@@ -3,6 +3,7 @@ from dateutil.relativedelta import relativedelta
 from sqlmodel import Session, select
 from backend.models.models_advanced import TransaccionRecurrente
 from backend.models.models import LibroTransacciones
+from backend.core.dedup_service import dedup_service
 
 class RecurringService:
     def calculate_next_date(self, current_date: date, frequency: str, interval: int) -> date:
@@ -41,6 +42,7 @@ class RecurringService:
             notas=f"[Recurrente] {recurring.notas or ''}",
             fecha_transaccion=str(recurring.proxima_fecha)
         )
+        dedup_service.stamp(transaction)
         session.add(transaction)
         
         # 2. Update recurring schedule
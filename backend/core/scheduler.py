@@ -6,6 +6,15 @@ from backend.models.models import Usuario
 from backend.models.models_advanced import TransaccionRecurrente
 from backend.core.recurring_service import recurring_service
 from backend.core.wealth_service import wealth_service
+from backend.core.dedup_service import dedup_service
+from backend.core.outbox_service import outbox_service
+from backend.core.notification_service import notification_service
+from backend.core.audit_archive import audit_archive
+from backend.core.security_middleware import csrf_protection
+from backend.core.config import settings
+from backend.core.http_client import http_client
+from backend.core.metrics import instrument_job
+from backend.core.tracing import traced
 from backend.scripts.backup_database import DatabaseBackup
 import logging
 import asyncio
@@ -44,13 +53,76 @@ def perform_wealth_snapshots():
     Captures wealth snapshots for all active users.
     """
     logger.info("Capturing Wealth Snapshots...")
+    async def _capture_all(session: Session, usuarios):
+        try:
+            for u in usuarios:
+                try:
+                    await wealth_service.capture_snapshot(session, u.id_usuario)
+                except Exception as e:
+                    logger.error(f"Error capturing snapshot for user {u.id_usuario}: {e}")
+        finally:
+            # HTTP client of this job's loop (FX rates); the app's pool is untouched
+            await http_client.close()
+
     with Session(engine) as session:
         usuarios = session.exec(select(Usuario)).all()
-        for u in usuarios:
-            try:
-                asyncio.run(wealth_service.capture_snapshot(session, u.id_usuario))
-            except Exception as e:
-                logger.error(f"Error capturing snapshot for user {u.id_usuario}: {e}")
+        asyncio.run(_capture_all(session, usuarios))
+
+def scan_duplicate_transactions():
+    """
+    Fingerprints legacy rows and reports likely duplicate transactions.
+    """
+    logger.info("Scanning for duplicate transactions...")
+    with Session(engine) as session:
+        try:
+            backfilled = dedup_service.backfill(session)
+            pairs = dedup_service.scan_near_duplicates(session)
+            logger.info(f"Duplicate scan: {backfilled} rows fingerprinted, {len(pairs)} candidate pairs")
+        except Exception as e:
+            logger.error(f"Error scanning duplicate transactions: {e}")
+
+def purge_hook_outbox():
+    """
+    Removes delivered hook events older than a week.
+    """
+    try:
+        removed = outbox_service.purge()
+        logger.info(f"Hook outbox purge: {removed} events removed")
+    except Exception as e:
+        logger.error(f"Error purging hook outbox: {e}")
+
+def purge_read_notifications():
+    """
+    Deletes read notifications older than the retention window.
+    """
+    with Session(engine) as session:
+        try:
+            removed = notification_service.purge_read(session)
+            logger.info(f"Notification retention: {removed} read notifications removed")
+        except Exception as e:
+            logger.error(f"Error purging notifications: {e}")
+
+def archive_audit_logs():
+    """
+    Moves audit entries past the hot window to compressed cold storage.
+    """
+    with Session(engine) as session:
+        try:
+            moved = audit_archive.rollover(session)
+            logger.info(f"Audit rollover: {moved} entries archived")
+        except Exception as e:
+            logger.error(f"Error archiving audit logs: {e}")
+
+def purge_rate_limit_storage():
+    """
+    Evicts expired CSRF tokens and rate-limit counters.
+    """
+    try:
+        removed = csrf_protection.cleanup_expired()
+        if removed:
+            logger.info(f"Rate limit storage purge: {removed} expired entries removed")
+    except Exception as e:
+        logger.error(f"Error purging rate limit storage: {e}")
 
 def perform_database_backup():
     """
@@ -65,12 +137,26 @@ def perform_database_backup():
     except Exception as e:
         logger.error(f"✗ Database backup failed: {e}")
 
+def _job(job_id: str, func):
+    """Job with Prometheus metrics and a trace span per run."""
+    return instrument_job(job_id, traced(f"scheduler.{job_id}", {"scheduler.job": job_id})(func))
+
 def start_scheduler():
     # Run recurring tx check daily at 00:01
-    scheduler.add_job(check_recurring_transactions, 'cron', hour=0, minute=1, id='recurring_transactions')
+    scheduler.add_job(_job('recurring_transactions', check_recurring_transactions), 'cron', hour=0, minute=1, id='recurring_transactions')
     # Run wealth snapshots daily at 00:05
-    scheduler.add_job(perform_wealth_snapshots, 'cron', hour=0, minute=5, id='wealth_snapshots')
+    scheduler.add_job(_job('wealth_snapshots', perform_wealth_snapshots), 'cron', hour=0, minute=5, id='wealth_snapshots')
+    # Run duplicate scan daily at 02:30
+    scheduler.add_job(_job('duplicate_scan', scan_duplicate_transactions), 'cron', hour=2, minute=30, id='duplicate_scan')
+    # Purge delivered hook events daily at 02:45
+    scheduler.add_job(_job('outbox_purge', purge_hook_outbox), 'cron', hour=2, minute=45, id='outbox_purge')
+    # Purge old read notifications daily at 02:50
+    scheduler.add_job(_job('notification_retention', purge_read_notifications), 'cron', hour=2, minute=50, id='notification_retention')
+    # Archive old audit entries daily at 02:55
+    scheduler.add_job(_job('audit_rollover', archive_audit_logs), 'cron', hour=2, minute=55, id='audit_rollover')
+    # Evict expired CSRF tokens / rate-limit counters every few minutes
+    scheduler.add_job(_job('rate_limit_purge', purge_rate_limit_storage), 'interval', minutes=settings.RATE_LIMIT_PURGE_INTERVAL, id='rate_limit_purge')
     # Run database backup daily at 03:00
-    scheduler.add_job(perform_database_backup, 'cron', hour=3, minute=0, id='database_backup')
+    scheduler.add_job(_job('database_backup', perform_database_backup), 'cron', hour=3, minute=0, id='database_backup')
     scheduler.start()
     logger.info("📅 Scheduler started with automatic jobs")
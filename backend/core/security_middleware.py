@@ -8,63 +8,64 @@ from slowapi.errors import RateLimitExceeded
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 import secrets
-import time
 import bleach
 import re
-from typing import Dict, Any
+import logging
+from .config import settings
+from .rate_limit_storage import storage_uri
+
+logger = logging.getLogger(__name__)
 
 # Rate Limiter Configuration
+# Counters live in shared storage (Redis or the database) so the limit holds across
+# workers and restarts; if that storage goes down slowapi falls back to per-worker memory
 limiter = Limiter(
     key_func=get_remote_address,
-    default_limits=["100/minute"],
-    storage_uri="memory://"
+    default_limits=[f"{settings.RATE_LIMIT_PER_MINUTE}/minute"],
+    strategy="sliding-window-counter",
+    storage_uri=storage_uri(),
+    in_memory_fallback_enabled=True
 )
 
+# CSRF tokens share the limiter's backend (slowapi exposes no public accessor)
+shared_storage = limiter._storage
+
 # CSRF Protection
 class CSRFProtection:
     """CSRF token generation and validation"""
     
-    _tokens: Dict[str, Dict[str, Any]] = {}  # In-memory storage
+    storage = shared_storage  # Expiring key/value store, bounded in memory
     TOKEN_EXPIRY = 3600  # 1 hour
+    KEY_PREFIX = "csrf:"
     
     @staticmethod
     def generate_token(session_id: str) -> str:
         """Generate CSRF token for session"""
         token = secrets.token_urlsafe(32)
-        timestamp = time.time()
-        
-        CSRFProtection._tokens[session_id] = {
-            'token': token,
-            'created_at': timestamp
-        }
-        
+        CSRFProtection.storage.set_value(
+            CSRFProtection.KEY_PREFIX + session_id, token, CSRFProtection.TOKEN_EXPIRY
+        )
         return token
     
     @staticmethod
     def validate_token(token: str, session_id: str) -> bool:
         """Validate CSRF token"""
-        stored = CSRFProtection._tokens.get(session_id)
-        
-        if not stored:
+        try:
+            # Expired tokens are never returned
+            stored = CSRFProtection.storage.get_value(CSRFProtection.KEY_PREFIX + session_id)
+        except Exception as e:
+            logger.error(f"CSRF token storage unavailable: {e}")
             return False
         
-        # Check expiry
-        if time.time() - stored['created_at'] > CSRFProtection.TOKEN_EXPIRY:
-            del CSRFProtection._tokens[session_id]
+        if not stored:
             return False
         
-        return secrets.compare_digest(stored['token'], token)
+        return secrets.compare_digest(stored, token)
     
     @staticmethod
-    def cleanup_expired():
-        """Remove expired tokens"""
-        current_time = time.time()
-        expired = [
-            sid for sid, data in CSRFProtection._tokens.items()
-            if current_time - data['created_at'] > CSRFProtection.TOKEN_EXPIRY
-        ]
-        for sid in expired:
-            del CSRFProtection._tokens[sid]
+    def cleanup_expired() -> int:
+        """Remove expired tokens (and expired rate-limit counters in the same storage)"""
+        return CSRFProtection.storage.purge_expired()
 
 csrf_protection = CSRFProtection()
 
@@ -0,0 +1,313 @@
+"""
+Streaming parsers for native bank statement formats: OFX/QFX, QIF and
+ISO 20022 CAMT.053.
+
+Every parser yields the same normalized records as ``CSVParser``
+(``{fecha, descripcion, monto, raw_row}``) from ``iter_records()`` without
+building a DOM: OFX is tokenized tag by tag from fixed-size chunks, QIF is read
+line by line and CAMT.053 uses ``iterparse`` and clears each entry once read.
+"""
+import html
+import io
+from abc import ABC, abstractmethod
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+
+from .csv_parser import CSVParser
+
+Source = Union[bytes, BinaryIO]
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _open(source: Source) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def _decimal(value: Optional[str]) -> Decimal:
+    if not value:
+        return Decimal("0")
+    try:
+        return Decimal(value.strip())
+    except InvalidOperation:
+        return CSVParser._clean_amount(value)
+
+
+class StatementParser(ABC):
+    """
+    Base class for streaming statement parsers.
+    Subclasses implement ``iter_records``; ``parse`` materializes them for
+    callers that expect the ``CSVParser`` interface.
+    """
+
+    EXTENSIONS: tuple = ()
+
+    def __init__(self, source: Source, encoding: str = "utf-8"):
+        self.source = source
+        self.encoding = encoding
+
+    @abstractmethod
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield normalized records one at a time"""
+        pass
+
+    def parse(self) -> List[Dict[str, Any]]:
+        """Parses the statement and returns a list of normalized dictionaries"""
+        try:
+            return list(self.iter_records())
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error parsing {self.__class__.__name__[:-6].upper()}: {e}")
+
+
+class OFXParser(StatementParser):
+    """
+    OFX 1.x (SGML, unclosed leaf tags) and 2.x (XML) / QFX statements.
+    Reads ``<STMTTRN>`` blocks with a tag tokenizer over fixed-size chunks.
+    """
+
+    EXTENSIONS = (".ofx", ".qfx")
+
+    def _tokens(self) -> Iterator[tuple]:
+        """Yield (tag, text) pairs; closing tags are returned as '/TAG'."""
+        stream = _open(self.source)
+        buffer = ""
+        header_done = False
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if chunk:
+                buffer += chunk.decode(self.encoding, errors="replace")
+            if not header_done:
+                # Skip the SGML header / XML prolog before the <OFX> root
+                start = buffer.upper().find("<OFX>")
+                if start == -1:
+                    if not chunk:
+                        return
+                    continue
+                buffer = buffer[start:]
+                header_done = True
+
+            parts = buffer.split("<")
+            # The last part may be incomplete unless the stream is exhausted
+            buffer = "" if not chunk else "<" + parts.pop()
+            for part in parts:
+                if not part or ">" not in part:
+                    continue
+                tag, _, text = part.partition(">")
+                yield tag.strip().upper(), html.unescape(text.strip())
+            if not chunk:
+                return
+
+    @staticmethod
+    def _parse_date(value: str) -> str:
+        # YYYYMMDD[HHMMSS[.XXX]][[+-]TZ[:name]]
+        digits = value[:8]
+        try:
+            return datetime.strptime(digits, "%Y%m%d").date().isoformat()
+        except ValueError:
+            return value
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        current: Optional[Dict[str, str]] = None
+        for tag, text in self._tokens():
+            if tag == "STMTTRN":
+                current = {}
+            elif tag == "/STMTTRN":
+                if current is not None and current.get("DTPOSTED") and current.get("TRNAMT"):
+                    descripcion = current.get("NAME") or current.get("PAYEE") or ""
+                    if current.get("MEMO") and current.get("MEMO") != descripcion:
+                        descripcion = f"{descripcion} {current['MEMO']}".strip()
+                    yield {
+                        "fecha": self._parse_date(current["DTPOSTED"]),
+                        "descripcion": descripcion,
+                        "monto": _decimal(current["TRNAMT"]),
+                        "raw_row": current
+                    }
+                current = None
+            elif current is not None and not tag.startswith("/") and text:
+                current[tag] = text
+
+
+class QIFParser(StatementParser):
+    """
+    Quicken Interchange Format, read line by line.
+    Each record is a set of single-letter fields terminated by '^'.
+    """
+
+    EXTENSIONS = (".qif",)
+    DATE_FORMATS = ("%m/%d/%Y", "%d/%m/%Y", "%m/%d/%y", "%d/%m/%y", "%Y-%m-%d", "%d.%m.%Y")
+
+    @classmethod
+    def _parse_date(cls, value: str) -> str:
+        value = value.strip().replace("'", "/").replace(" ", "")
+        for fmt in cls.DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).date().isoformat()
+            except ValueError:
+                continue
+        return CSVParser._parse_date(value)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        stream = io.TextIOWrapper(_open(self.source), encoding=self.encoding, errors="replace")
+        current: Dict[str, str] = {}
+        try:
+            for line in stream:
+                line = line.rstrip("\r\n")
+                if not line or line.startswith("!"):
+                    continue
+                code, value = line[0], line[1:].strip()
+                if code == "^":
+                    if current.get("D") and (current.get("T") or current.get("U")):
+                        descripcion = current.get("P") or current.get("M") or ""
+                        if current.get("P") and current.get("M"):
+                            descripcion = f"{current['P']} {current['M']}"
+                        yield {
+                            "fecha": self._parse_date(current["D"]),
+                            "descripcion": descripcion,
+                            "monto": CSVParser._clean_amount(current.get("T") or current.get("U")),
+                            "raw_row": current
+                        }
+                    current = {}
+                elif code not in current:
+                    # Split lines (S/E/$) repeat; keep the first occurrence only
+                    current[code] = value
+        finally:
+            stream.detach()
+
+
+class CAMTParser(StatementParser):
+    """
+    ISO 20022 CAMT.053 (bank-to-customer statement) XML, any schema version.
+    Uses ``iterparse`` and discards each ``<Ntry>`` once it has been emitted.
+    """
+
+    EXTENSIONS = (".xml", ".camt", ".053")
+
+    @staticmethod
+    def _local(tag: str) -> str:
+        return tag.rsplit("}", 1)[-1]
+
+    @classmethod
+    def _find(cls, elem: ET.Element, *path: str) -> Optional[ET.Element]:
+        """Namespace-agnostic descendant lookup following ``path``."""
+        nodes = [elem]
+        for name in path:
+            next_nodes = []
+            for node in nodes:
+                next_nodes.extend(child for child in node if cls._local(child.tag) == name)
+            if not next_nodes:
+                return None
+            nodes = next_nodes
+        return nodes[0]
+
+    @classmethod
+    def _text(cls, elem: ET.Element, *path: str) -> Optional[str]:
+        found = cls._find(elem, *path)
+        return found.text.strip() if found is not None and found.text else None
+
+    def _entry(self, ntry: ET.Element) -> Optional[Dict[str, Any]]:
+        amount = self._text(ntry, "Amt")
+        fecha = (
+            self._text(ntry, "BookgDt", "Dt")
+            or self._text(ntry, "BookgDt", "DtTm")
+            or self._text(ntry, "ValDt", "Dt")
+            or self._text(ntry, "ValDt", "DtTm")
+        )
+        if not amount or not fecha:
+            return None
+
+        monto = _decimal(amount)
+        if self._text(ntry, "CdtDbtInd") == "DBIT":
+            monto = -monto
+
+        tx = self._find(ntry, "NtryDtls", "TxDtls")
+        descripcion = None
+        if tx is not None:
+            party = "Cdtr" if monto < 0 else "Dbtr"
+            descripcion = (
+                self._text(tx, "RltdPties", party, "Nm")
+                or self._text(tx, "RltdPties", party, "Pty", "Nm")
+            )
+            remittance = self._text(tx, "RmtInf", "Ustrd")
+            if remittance:
+                descripcion = f"{descripcion} {remittance}" if descripcion else remittance
+        descripcion = descripcion or self._text(ntry, "AddtlNtryInf") or ""
+
+        return {
+            "fecha": fecha[:10],
+            "descripcion": descripcion,
+            "monto": monto,
+            "raw_row": {
+                "NtryRef": self._text(ntry, "NtryRef"),
+                "AcctSvcrRef": self._text(ntry, "AcctSvcrRef"),
+                "Sts": self._text(ntry, "Sts") or self._text(ntry, "Sts", "Cd")
+            }
+        }
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        parents: List[ET.Element] = []
+        for event, elem in ET.iterparse(_open(self.source), events=("start", "end")):
+            if event == "start":
+                parents.append(elem)
+                continue
+            parents.pop()
+            if self._local(elem.tag) != "Ntry":
+                continue
+            record = self._entry(elem)
+            # Detach the parsed entry from its <Stmt> so memory stays flat
+            if parents:
+                parents[-1].remove(elem)
+            elem.clear()
+            if record:
+                yield record
+
+
+_PARSERS = (OFXParser, QIFParser, CAMTParser)
+
+
+def _xml_root_namespace(source: Source) -> str:
+    """Namespace URI of the root element, read from its start tag only ('' if none or not XML)."""
+    try:
+        for _, elem in ET.iterparse(_open(source), events=("start",)):
+            return elem.tag[1:].split("}", 1)[0] if elem.tag.startswith("{") else ""
+    except ET.ParseError:
+        pass
+    return ""
+
+
+def get_statement_parser(filename: str, source: Source) -> Union[StatementParser, CSVParser]:
+    """
+    Pick a parser by file extension (falling back to content sniffing for .xml/.txt).
+    CSV files keep using ``CSVParser``; .xml must be a CAMT.053 document (ValueError otherwise).
+    """
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        content = source if isinstance(source, (bytes, bytearray)) else _open(source).read()
+        return CSVParser(content)
+    for parser_class in _PARSERS:
+        if name.endswith(parser_class.EXTENSIONS):
+            # .xml is too generic: only CAMT.053 documents are accepted
+            if name.endswith(".xml") and "camt.053" not in _xml_root_namespace(source).lower():
+                raise ValueError(
+                    "El archivo XML no es un extracto CAMT.053 "
+                    "(se espera el espacio de nombres urn:iso:std:iso:20022:tech:xsd:camt.053)"
+                )
+            return parser_class(source)
+
+    head = _open(source).read(2048)
+    if not isinstance(source, (bytes, bytearray)):
+        source.seek(0)
+    head_upper = head.upper()
+    if b"<OFX>" in head_upper or b"OFXHEADER" in head_upper:
+        return OFXParser(source)
+    if b"CAMT.053" in head_upper or b"<BKTOCSTMRSTMT>" in head_upper:
+        return CAMTParser(source)
+    if head.lstrip().startswith(b"!Type") or head.lstrip().startswith(b"!TYPE"):
+        return QIFParser(source)
+    raise ValueError("Formato de extracto no soportado. Use CSV, OFX/QFX, QIF o CAMT.053")
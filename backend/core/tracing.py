@@ -0,0 +1,189 @@
+"""
+Opt-in OpenTelemetry tracing (``TRACING_ENABLED``).
+
+Spans recorded:
+- ``TracingMiddleware``: one SERVER span per request, named after the route
+  template (``GET /api/resumen/``); an incoming ``traceparent`` is honoured.
+- SQL: one CLIENT span per statement (text only, parameters are never attached).
+- ``http_client``: one CLIENT span per outgoing request, retries included, with
+  ``traceparent`` injected; ``fx.get_rates`` wraps the FX refresh.
+- ``plugin.<hook>`` per plugin handler and ``scheduler.<job>`` per job run.
+
+Spans go to the console or to an OTLP/HTTP collector (``TRACING_EXPORTER``),
+batched off the request path. ``TRACING_SAMPLE_RATIO`` samples new traces;
+requests arriving with a sampled parent are always kept. While tracing is off
+every helper is a no-op.
+"""
+import functools
+import inspect
+import logging
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from opentelemetry import trace
+from opentelemetry.propagate import extract, inject
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, StatusCode
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .query_monitor import MAX_LOGGED_STATEMENT
+
+logger = logging.getLogger(__name__)
+
+_provider: Optional[TracerProvider] = None
+_tracer: trace.Tracer = trace.NoOpTracer()
+
+
+def _build_exporter() -> SpanExporter:
+    if settings.TRACING_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACING_EXPORTER=otlp requires opentelemetry-exporter-otlp-proto-http; using console")
+        else:
+            return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    return ConsoleSpanExporter()
+
+
+def setup_tracing(exporter: Optional[SpanExporter] = None, batch: bool = True) -> bool:
+    """
+    Start recording spans if TRACING_ENABLED (or when an exporter is given,
+    e.g. an in-memory one in tests). Returns whether tracing is active.
+    """
+    global _provider, _tracer
+    if _provider is not None:
+        return True
+    if exporter is None and not settings.TRACING_ENABLED:
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({
+            "service.name": settings.TRACING_SERVICE_NAME,
+            "deployment.environment": settings.ENVIRONMENT
+        }),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO))
+    )
+    exporter = exporter or _build_exporter()
+    provider.add_span_processor(BatchSpanProcessor(exporter) if batch else SimpleSpanProcessor(exporter))
+    _provider = provider
+    _tracer = provider.get_tracer("backend")
+    if isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider):
+        # Plugins using the OpenTelemetry API directly join the same traces
+        trace.set_tracer_provider(provider)
+    logger.info(f"Tracing enabled ({type(exporter).__name__}, sample ratio {settings.TRACING_SAMPLE_RATIO})")
+    return True
+
+
+def shutdown_tracing():
+    """Flush pending spans and stop recording."""
+    global _provider, _tracer
+    if _provider is not None:
+        _provider.shutdown()
+    _provider = None
+    _tracer = trace.NoOpTracer()
+
+
+def get_tracer() -> trace.Tracer:
+    """Tracer of the application (no-op while tracing is off)."""
+    return _tracer
+
+
+def traced(name: str, attributes: Optional[Dict[str, Any]] = None) -> Callable[[Callable], Callable]:
+    """Decorator running a sync or async function inside a span."""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _tracer.start_as_current_span(name, attributes=attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.start_as_current_span(name, attributes=attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inject_headers(headers: Optional[Mapping[str, str]] = None) -> Optional[Mapping[str, str]]:
+    """Outgoing headers with the current ``traceparent`` (unchanged while tracing is off)."""
+    if _provider is None:
+        return headers
+    carrier = dict(headers or {})
+    inject(carrier)
+    return carrier
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a SERVER span per HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if _provider is None or scope["type"] != "http" or scope.get("path") == "/metrics":
+            return await self.app(scope, receive, send)
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        method = scope.get("method", "GET")
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with _tracer.start_as_current_span(
+            method,
+            context=extract(headers),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope.get("path", "")}
+        ) as span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.update_name(f"{method} {route}")
+                    span.set_attribute("http.route", route)
+                span.set_attribute("http.response.status_code", status["code"])
+                if status["code"] >= 500:
+                    span.set_status(StatusCode.ERROR)
+
+
+# --- SQL ---
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_span(conn, cursor, statement, parameters, context, executemany):
+    if _provider is None:
+        return
+    text = " ".join(statement.split())
+    span = _tracer.start_span(
+        text.split(" ", 1)[0].upper() or "SQL",
+        kind=SpanKind.CLIENT,
+        attributes={"db.system.name": conn.dialect.name, "db.query.text": text[:MAX_LOGGED_STATEMENT]}
+    )
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement_span(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        spans.pop().end()
+
+
+@event.listens_for(Engine, "handle_error")
+def _fail_statement_span(exception_context):
+    conn: Any = exception_context.connection
+    spans = conn.info.get("trace_spans") if conn is not None else None
+    if spans:
+        span = spans.pop()
+        span.record_exception(exception_context.original_exception)
+        span.set_status(StatusCode.ERROR)
+        span.end()
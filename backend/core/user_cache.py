@@ -0,0 +1,94 @@
+"""
+Cache of authenticated users for ``get_current_user``.
+
+Decoded tokens map to a user id and user ids map to ``UsuarioActual``, an
+immutable snapshot of the account (no password hash, no ORM session attached),
+so most authenticated requests skip both the JWT decode and the users lookup.
+Endpoints that change the profile, password or lock state call ``invalidate``;
+entries also expire after ``AUTH_USER_CACHE_TTL`` seconds, which bounds how long
+another worker can serve a stale snapshot.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Optional, Tuple
+
+from cachetools import TTLCache
+from pydantic import BaseModel, ConfigDict
+
+from .config import settings
+
+
+class UsuarioActual(BaseModel):
+    """Read-only snapshot of the authenticated user."""
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
+    id_usuario: int
+    email: str
+    nombre: Optional[str] = None
+    apellido: Optional[str] = None
+    rol_id: Optional[int] = None
+    theme_preference: str = "dark_neon"
+    bloqueado: bool = False
+    creado_el: Optional[datetime] = None
+    actualizado_el: Optional[datetime] = None
+
+
+class UserCache:
+    """
+    Args:
+        ttl: Seconds a cached user (or decoded token) stays valid.
+        maxsize: Maximum users and tokens kept (least recently used are evicted first).
+    """
+
+    def __init__(self, ttl: float = settings.AUTH_USER_CACHE_TTL, maxsize: int = settings.AUTH_USER_CACHE_SIZE):
+        self.ttl = ttl
+        self._users: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._tokens: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Sync endpoints resolve users from the threadpool
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def token_subject(self, token: str, decode: Callable[[str], dict]) -> Tuple[Optional[int], Optional[str]]:
+        """(user id, email) of a token; decoded once and reused until it expires."""
+        with self._lock:
+            cached = self._tokens.get(token)
+        if cached is not None:
+            user_id, email, exp = cached
+            if exp is None or exp > time.time():
+                return user_id, email
+        payload = decode(token)
+        subject = (payload.get("id"), payload.get("sub"), payload.get("exp"))
+        with self._lock:
+            self._tokens[token] = subject
+        return subject[0], subject[1]
+
+    def get_user(self, user_id: int, load: Callable[[int], Any]) -> Optional[UsuarioActual]:
+        """Cached snapshot of ``user_id``; ``load`` fetches the ORM row on a miss."""
+        with self._lock:
+            snapshot = self._users.get(user_id)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        self.misses += 1
+        user = load(user_id)
+        if user is None:
+            return None
+        snapshot = UsuarioActual.model_validate(user)
+        with self._lock:
+            self._users[user_id] = snapshot
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        """Drop a user after its profile, password or lock state changed."""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._tokens.clear()
+
+
+user_cache = UserCache()
@@ -1,4 +1,6 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Union
 from ..models.models import ListaCuentas, LibroTransacciones
 from ..models.models_advanced import Activo, Inversion
 from ..models.models_wealth import WealthSnapshot
@@ -9,12 +11,18 @@ from ..core.fx_service import fx_service
 
 class WealthService:
     @staticmethod
-    async def calculate_total_wealth(session: Session, user_id: int, target_currency: str = "ARS"):
+    async def calculate_total_wealth(session: Union[Session, AsyncSession], user_id: int, target_currency: str = "ARS"):
         """
         Calculates a breakdown of the user's total wealth revalued in target_currency.
+        With an AsyncSession the queries run without blocking the event loop.
         """
         rates = await fx_service.get_rates()
-        
+        if isinstance(session, AsyncSession):
+            return await session.run_sync(WealthService._breakdown, rates, target_currency)
+        return WealthService._breakdown(session, rates, target_currency)
+
+    @staticmethod
+    def _breakdown(session: Session, rates: dict, target_currency: str):
         # 1. Accounts
         cuentas = session.exec(select(ListaCuentas)).all()
         # Sumar saldos revaluados
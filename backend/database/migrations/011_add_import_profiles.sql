@@ -0,0 +1,25 @@
+-- Migration 011: Create import profiles table for CSV bank formats
+-- Profiles store the learned layout (delimiter, encoding, columns, date format,
+-- decimal separator) and are matched by a fingerprint of the CSV header row
+
+CREATE TABLE perfiles_importacion (
+    id_perfil INT AUTO_INCREMENT PRIMARY KEY,
+    id_usuario INT NOT NULL,
+    id_cuenta INT DEFAULT NULL,
+    nombre VARCHAR(100) NOT NULL,
+    huella_encabezado VARCHAR(64) NOT NULL,
+    delimitador VARCHAR(4) NOT NULL DEFAULT ',',
+    codificacion VARCHAR(20) NOT NULL DEFAULT 'utf-8',
+    columna_fecha VARCHAR(100) NOT NULL,
+    columna_descripcion VARCHAR(100) NOT NULL,
+    columna_monto VARCHAR(100) NOT NULL,
+    formato_fecha VARCHAR(20) DEFAULT NULL,
+    separador_decimal CHAR(1) NOT NULL DEFAULT '.',
+    usos INT DEFAULT 0,
+    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    ultimo_uso DATETIME DEFAULT NULL,
+    FOREIGN KEY (id_usuario) REFERENCES usuarios (id_usuario),
+    FOREIGN KEY (id_cuenta) REFERENCES lista_cuentas (id_cuenta)
+);
+
+CREATE INDEX idx_perfil_importacion_huella ON perfiles_importacion (id_usuario, huella_encabezado);
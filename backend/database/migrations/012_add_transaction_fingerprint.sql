@@ -0,0 +1,7 @@
+-- Migration 012: Duplicate-detection fingerprint for ledger entries
+-- SHA-1 of account | date | amount | normalized description, checked on every insert.
+-- Existing rows are fingerprinted by the nightly duplicate scan (dedup_service.backfill).
+
+ALTER TABLE libro_transacciones ADD COLUMN huella_duplicado VARCHAR(40) DEFAULT NULL;
+
+CREATE INDEX idx_transaccion_huella ON libro_transacciones (huella_duplicado);
@@ -0,0 +1,21 @@
+-- Migration 013: Transactional outbox for plugin hooks
+-- One row per (event, subscribed plugin), written in the same transaction as the
+-- triggering change and delivered by the outbox worker with exponential backoff
+
+CREATE TABLE plugin_outbox (
+    id_evento INT AUTO_INCREMENT PRIMARY KEY,
+    hook VARCHAR(100) NOT NULL,
+    plugin VARCHAR(100) NOT NULL,
+    payload JSON,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    intentos INT DEFAULT 0,
+    proximo_intento DATETIME DEFAULT CURRENT_TIMESTAMP,
+    reclamado_por VARCHAR(100) DEFAULT NULL,
+    reclamado_el DATETIME DEFAULT NULL,
+    ultimo_error TEXT DEFAULT NULL,
+    creado_el DATETIME DEFAULT CURRENT_TIMESTAMP,
+    entregado_el DATETIME DEFAULT NULL
+);
+
+CREATE INDEX idx_outbox_pendientes ON plugin_outbox (estado, proximo_intento);
+CREATE INDEX idx_outbox_plugin ON plugin_outbox (plugin, hook);
@@ -0,0 +1,7 @@
+-- Migration 014: Indexes for notification bulk operations and retention
+-- (user_id, read) serves the unread badge count and "mark all as read" as index range scans.
+-- (read, timestamp) lets the nightly purge find old read notifications without a full scan.
+
+CREATE INDEX idx_notifications_user_read ON user_notifications (user_id, `read`);
+
+CREATE INDEX idx_notifications_read_timestamp ON user_notifications (`read`, `timestamp`);
@@ -0,0 +1,12 @@
+-- Migration 015: Shared rate-limit storage
+-- Sliding-window counters and CSRF tokens used when RATE_LIMIT_STORAGE=database,
+-- so every worker enforces the same limits; expired rows are purged periodically
+
+CREATE TABLE rate_limit_entries (
+    clave VARCHAR(255) NOT NULL PRIMARY KEY,
+    contador INT NOT NULL DEFAULT 0,
+    valor VARCHAR(255) DEFAULT NULL,
+    expira_el DOUBLE NOT NULL
+);
+
+CREATE INDEX idx_rate_limit_expira ON rate_limit_entries (expira_el);
@@ -7,6 +7,9 @@ from .core.config import settings
 from .core.config_inf import config_inf
 from .core.logging_config import setup_logging
 from .core.security_middleware import limiter, SecurityHeadersMiddleware, _rate_limit_exceeded_handler
+from .core.query_monitor import QueryCounterMiddleware
+from .core.metrics import MetricsMiddleware, metrics_endpoint
+from .core.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
 from .core.exceptions import APIException
 from .core.install_checker import is_installed, is_install_blocked
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
@@ -56,6 +59,11 @@ from .api.localization.router import router as localization_router
 from .models import * # Asegura registro de tablas de SQLModel
 from .core.scheduler import start_scheduler
 from .core.plugin_manager import plugin_manager
+from .core.outbox_service import outbox_service
+from .core.http_client import http_client
+from .core.notification_bus import notification_bus
+from .core.audit_service import audit_service
+from .core.database import dispose_async_engine
 from datetime import datetime
 import os
 
@@ -118,6 +126,12 @@ app.state.limiter = limiter
 
 @app.on_event("startup")
 async def on_startup():
+    # Tracing opcional (TRACING_ENABLED)
+    setup_tracing()
+    
+    # Pool HTTP compartido (plugins y servicios externos)
+    await http_client.start()
+    
     # Solo inicializar DB si está instalado
     if is_installed():
         try:
@@ -136,6 +150,14 @@ async def on_startup():
             
             # Cargar plugins activos
             await plugin_manager.load_plugins()
+            if config.settings.PLUGIN_WARMUP:
+                # Importar los plugins diferidos cuando el servidor ya atiende tráfico
+                plugin_manager.start_warm_up(config.settings.PLUGIN_WARMUP_DELAY)
+            
+            # Worker del outbox de hooks (entrega con reintentos)
+            outbox_service.start()
+            # Escritura de auditoría en lotes
+            audit_service.start()
             
             logging.info(f"✅ Database connected: {config.settings.DATABASE_URL.split('@')[1] if '@' in config.settings.DATABASE_URL else 'Local'}")
             
@@ -147,6 +169,17 @@ async def on_startup():
     logging.info("🚀 FuturoForbes (3F) starting up...")
     logging.info(f"📋 Version: {config_inf.get('SISTEMA', 'version', '1.0.0')}")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Dar a los hooks en segundo plano la oportunidad de terminar
+    await plugin_manager.drain_background_hooks(timeout=10)
+    await outbox_service.stop()
+    await audit_service.stop()
+    await http_client.close()
+    await notification_bus.close()
+    await dispose_async_engine()
+    shutdown_tracing()
+
 # Exception handlers
 @app.exception_handler(APIException)
 async def api_exception_handler(request: Request, exc: APIException):
@@ -170,6 +203,12 @@ async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
 
 # Security middleware
 app.add_middleware(SecurityHeadersMiddleware)
+# Query count / DB time per request (Server-Timing) and slow query log
+app.add_middleware(QueryCounterMiddleware)
+# Prometheus: latency per route template (scraped at /metrics)
+app.add_middleware(MetricsMiddleware)
+# OpenTelemetry: span per request (no-op unless TRACING_ENABLED)
+app.add_middleware(TracingMiddleware)
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 
 # Configuración de CORS
@@ -224,6 +263,8 @@ app.include_router(goals_router, prefix="/api")
 app.include_router(import_rules_router, prefix="/api")
 app.include_router(financial_entities_router, prefix="/api")
 
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 @app.get("/")
 async def root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
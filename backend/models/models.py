@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from decimal import Decimal
 
 # --- SEGURIDAD Y USUARIOS ---
@@ -170,6 +171,10 @@ class LibroTransacciones(SQLModel, table=True):
     Can be linked to splits and tags.
     """
     __tablename__ = "libro_transacciones"
+    __table_args__ = (
+        # Same name as migration 012, so create_all and the migration agree
+        Index("idx_transaccion_huella", "huella_duplicado"),
+    )
     id_transaccion: Optional[int] = Field(default=None, primary_key=True)
     id_cuenta: int = Field(foreign_key="lista_cuentas.id_cuenta")
     id_cuenta_destino: Optional[int] = Field(default=None, foreign_key="lista_cuentas.id_cuenta")
@@ -187,6 +192,7 @@ class LibroTransacciones(SQLModel, table=True):
     monto_cuenta_destino: Optional[Decimal] = Field(default=None, max_digits=20, decimal_places=8)
     color: int = Field(default=-1)
     es_dividida: bool = Field(default=False)
+    huella_duplicado: Optional[str] = Field(default=None, max_length=40)  # Dedup fingerprint (core/dedup_service)
     
     # Relationships
     cuenta: "ListaCuentas" = Relationship(
@@ -5,6 +5,8 @@ from pydantic import ConfigDict
 
 class AuditLog(SQLModel, table=True):
     __tablename__ = "audit_logs"
+    # Archived ids must never be handed out again (keyset cursor across hot and cold)
+    __table_args__ = {"sqlite_autoincrement": True}
     
     id_log: Optional[int] = Field(default=None, primary_key=True)
     fecha: datetime = Field(default_factory=datetime.utcnow, index=True)
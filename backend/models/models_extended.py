@@ -7,6 +7,7 @@ Extended models for MMEX-inspired features (Phase 1)
 from datetime import datetime, date
 from typing import Optional
 from sqlmodel import SQLModel, Field
+from sqlalchemy import UniqueConstraint
 from decimal import Decimal
 
 # ==================== TAGS SYSTEM ====================
@@ -82,11 +83,8 @@ class HistorialDivisa(SQLModel, table=True):
     tipo_actualizacion: int = Field(default=0)  # 0=Manual, 1=Automatic
     fecha_creacion: Optional[datetime] = None  # MySQL auto-generates this
     
-    class Config:
-        # Unique constraint on (id_divisa, fecha_tasa)
-        indexes = [
-            ("id_divisa", "fecha_tasa")
-        ]
+    # Unique constraint on (id_divisa, fecha_tasa), as in migration 003; used for upserts
+    __table_args__ = (UniqueConstraint("id_divisa", "fecha_tasa", name="unique_divisa_fecha"),)
 
 
 # ==================== IMPORT RULES (REGLAS DE IMPORTACIÓN) ====================
@@ -101,9 +99,36 @@ class ReglaImportacion(SQLModel, table=True):
 
     id_regla: Optional[int] = Field(default=None, primary_key=True)
     id_usuario: int = Field(foreign_key="usuarios.id_usuario", index=True)
-    patron: str = Field(max_length=255)  # Substring or regex pattern to match CSV descriptions
+    patron: str = Field(max_length=255)  # Substring, or regex when prefixed with "re:", to match CSV descriptions
     id_categoria: Optional[int] = Field(default=None, foreign_key="categorias.id_categoria")
     id_beneficiario: Optional[int] = Field(default=None, foreign_key="beneficiarios.id_beneficiario")
     prioridad: int = Field(default=0)  # Higher = evaluated first
     activo: int = Field(default=1)
 
+
+
+# ==================== IMPORT PROFILES (PERFILES DE IMPORTACIÓN) ====================
+
+class PerfilImportacion(SQLModel, table=True):
+    """
+    Saved CSV layout for a bank/account, learned from the first successful import.
+    Matched by a fingerprint of the header row so later imports skip column,
+    date-format and decimal-separator detection entirely.
+    """
+    __tablename__ = "perfiles_importacion"
+
+    id_perfil: Optional[int] = Field(default=None, primary_key=True)
+    id_usuario: int = Field(foreign_key="usuarios.id_usuario", index=True)
+    id_cuenta: Optional[int] = Field(default=None, foreign_key="lista_cuentas.id_cuenta")
+    nombre: str = Field(max_length=100)
+    huella_encabezado: str = Field(max_length=64, index=True)  # SHA-1 of the normalized header row
+    delimitador: str = Field(default=",", max_length=4)
+    codificacion: str = Field(default="utf-8", max_length=20)
+    columna_fecha: str = Field(max_length=100)
+    columna_descripcion: str = Field(max_length=100)
+    columna_monto: str = Field(max_length=100)
+    formato_fecha: Optional[str] = Field(default=None, max_length=20)  # strptime format, e.g. %d/%m/%Y
+    separador_decimal: str = Field(default=".", max_length=1)
+    usos: int = Field(default=0)
+    fecha_creacion: datetime = Field(default_factory=datetime.utcnow)
+    ultimo_uso: Optional[datetime] = None
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional, Literal
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from pydantic import BaseModel
 
 class UserNotification(SQLModel, table=True):
@@ -8,6 +9,12 @@ class UserNotification(SQLModel, table=True):
     Persistent notification model for history and read tracking.
     """
     __tablename__ = "user_notifications"
+    __table_args__ = (
+        # Unread badge: COUNT over (user_id, read=0) without touching the rows
+        Index("idx_notifications_user_read", "user_id", "read"),
+        # Retention purge of old read notifications
+        Index("idx_notifications_read_timestamp", "read", "timestamp"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="usuarios.id_usuario", index=True)
@@ -26,3 +26,28 @@ class Plugin(SQLModel, table=True):
     
     creado_el: datetime = Field(default_factory=datetime.utcnow)
     actualizado_el: datetime = Field(default_factory=datetime.utcnow)
+
+
+class EventoHook(SQLModel, table=True):
+    """
+    Outbox transaccional de hooks: una fila por (evento, plugin suscrito).
+    Se escribe en la misma transacción que el cambio que dispara el hook y
+    el worker del outbox la entrega con reintentos.
+    """
+    __tablename__ = "plugin_outbox"
+    
+    id_evento: Optional[int] = Field(default=None, primary_key=True)
+    hook: str = Field(index=True)
+    plugin: str = Field(index=True)  # nombre_tecnico del destinatario
+    payload: Dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+    
+    # pendiente, procesando, entregado, fallido, descartado
+    estado: str = Field(default="pendiente", index=True)
+    intentos: int = Field(default=0)
+    proximo_intento: datetime = Field(default_factory=datetime.utcnow, index=True)
+    reclamado_por: Optional[str] = None
+    reclamado_el: Optional[datetime] = None
+    ultimo_error: Optional[str] = None
+    
+    creado_el: datetime = Field(default_factory=datetime.utcnow)
+    entregado_el: Optional[datetime] = None
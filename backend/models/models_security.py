@@ -0,0 +1,18 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+
+class RateLimitEntry(SQLModel, table=True):
+    """
+    Shared rate-limit counters and CSRF tokens for the database storage backend.
+    """
+    __tablename__ = "rate_limit_entries"
+    __table_args__ = (
+        # Periodic purge of expired counters / tokens
+        Index("idx_rate_limit_expira", "expira_el"),
+    )
+
+    clave: str = Field(primary_key=True, max_length=255)
+    contador: int = Field(default=0)
+    valor: Optional[str] = Field(default=None, max_length=255)
+    expira_el: float # Unix timestamp
@@ -2,9 +2,11 @@
 Base Plugin - Clase base para todos los plugins de 3F
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 
+from backend.core.http_client import http_client, HTTPClientManager
+
 
 class BasePlugin(ABC):
     """
@@ -19,6 +21,8 @@ class BasePlugin(ABC):
     autor: str = ""
     descripcion: str = ""
     hooks: List[str] = []
+    hook_timeout: Optional[float] = None  # Segundos por hook; None usa el valor global del PluginManager
+    batch_size: int = 1  # Eventos del outbox por entrega; >1 para recibirlos agrupados en on_<hook>_batch
     
     def __init__(self, config: Dict[str, Any] = None):
         """
@@ -77,6 +81,32 @@ class BasePlugin(ABC):
         else:
             self.logger.warning(f"No se encontró handler para hook '{hook_name}'")
     
+    async def on_hook_batch(self, hook_name: str, events: List[Dict[str, Any]]):
+        """
+        Manejar un lote de eventos entregados por el outbox.
+        Si el plugin define ``on_<hook_name>_batch(events)`` recibe el lote completo
+        (p. ej. para enviar un resumen); si no, cada evento pasa por ``on_hook``.
+        
+        Args:
+            hook_name: Nombre del hook
+            events: Lista de kwargs, uno por evento
+        """
+        handler = getattr(self, f"on_{hook_name}_batch", None)
+        if handler and callable(handler):
+            await handler(events)
+            return
+        
+        for kwargs in events:
+            await self.on_hook(hook_name, **kwargs)
+    
+    @property
+    def http(self) -> HTTPClientManager:
+        """
+        Cliente HTTP compartido del proceso (pool con keep-alive, timeouts y reintentos).
+        Los plugins deben usarlo en lugar de abrir una sesión HTTP por llamada.
+        """
+        return http_client
+    
     def get_config(self, key: str, default: Any = None) -> Any:
         """
         Obtener un valor de configuración.
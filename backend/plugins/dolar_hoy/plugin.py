@@ -1,13 +1,16 @@
 """
 Dolar Hoy Plugin - Actualiza tasas de cambio del dólar en Argentina
 """
-import aiohttp
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, Optional
 from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import update
 from sqlmodel import Session, select
 from backend.plugins.base import BasePlugin
-from backend.core.database import engine
-from backend.models.models import Divisa, HistorialDivisa
+from backend.core.database import engine, upsert
+from backend.models.models import Divisa
+from backend.models.models_extended import HistorialDivisa
 
 
 class DolarHoyPlugin(BasePlugin):
@@ -31,6 +34,25 @@ class DolarHoyPlugin(BasePlugin):
         "cripto": "https://dolarapi.com/v1/dolares/cripto"
     }
     
+    # Código ISO y nombre de la divisa asociada a cada fuente
+    CODIGO_ISO = {
+        "blue": "USD_BLUE",
+        "mep": "USD_MEP",
+        "ccl": "USD_CCL",
+        "cripto": "USD_CRIPTO"
+    }
+    NOMBRES = {
+        "blue": "Dólar Blue",
+        "mep": "Dólar MEP",
+        "ccl": "Dólar CCL",
+        "cripto": "Dólar Cripto"
+    }
+    
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        # Validadores HTTP (ETag / Last-Modified) y última respuesta por fuente
+        self._http_cache: Dict[str, Dict[str, Any]] = {}
+    
     async def initialize(self):
         """Inicializar el plugin"""
         self.logger.info(f"Inicializando {self.nombre_display}")
@@ -63,105 +85,138 @@ class DolarHoyPlugin(BasePlugin):
         """
         Actualizar todas las tasas de cambio configuradas.
         Este método puede ser llamado manualmente o por un hook.
+        Las fuentes se consultan en paralelo y el resultado se guarda con un único upsert.
         """
         self.logger.info("Actualizando tasas de cambio...")
         
-        session = Session(engine)
-        try:
-            for source in self.config["sources"]:
-                if source not in self.API_URLS:
-                    self.logger.warning(f"Fuente desconocida: {source}")
-                    continue
-                
-                try:
-                    await self._update_rate(source, session)
-                except Exception as e:
-                    self.logger.error(f"Error actualizando {source}: {e}")
-                    continue
-            
+        sources = []
+        for source in self.config["sources"]:
+            if source not in self.API_URLS:
+                self.logger.warning(f"Fuente desconocida: {source}")
+                continue
+            sources.append(source)
+        
+        results = await asyncio.gather(*(self._fetch_rate(s) for s in sources), return_exceptions=True)
+        
+        rates: Dict[str, Decimal] = {}
+        for source, result in zip(sources, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error actualizando {source}: {result}")
+                continue
+            promedio = self._average(result)
+            if promedio:
+                rates[source] = promedio
+        
+        if not rates:
+            return
+        
+        with Session(engine) as session:
+            self._store_rates(session, rates)
             session.commit()
-            self.logger.info("✅ Tasas actualizadas correctamente")
-            
-        finally:
-            session.close()
+        self.logger.info("✅ Tasas actualizadas correctamente")
     
-    async def _update_rate(self, source: str, session: Session):
+    async def _fetch_rate(self, source: str) -> Dict[str, Any]:
         """
-        Actualizar una tasa específica.
+        Obtener la cotización de una fuente con el cliente HTTP compartido.
+        Usa peticiones condicionales (ETag / Last-Modified): ante un 304 se
+        reutiliza la última respuesta recibida.
         
         Args:
             source: Nombre de la fuente (blue, mep, ccl, cripto)
-            session: Sesión de base de datos
         """
         url = self.API_URLS[source]
+        cached = self._http_cache.get(source)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        
+        response = await self.http.get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            self.logger.debug(f"{source}: sin cambios (304)")
+            return cached["data"]
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
         
-        async with aiohttp.ClientSession() as http_session:
-            async with http_session.get(url) as response:
-                if response.status != 200:
-                    raise Exception(f"HTTP {response.status}")
-                
-                data = await response.json()
-                
-                # Extraer datos
-                compra = data.get("compra", 0)
-                venta = data.get("venta", 0)
-                promedio = (compra + venta) / 2 if compra and venta else (compra or venta)
-                fecha_actualizacion = data.get("fechaActualizacion", datetime.now().isoformat())
-                
-                # Determinar código ISO según la fuente
-                codigo_iso_map = {
-                    "blue": "USD_BLUE",
-                    "mep": "USD_MEP",
-                    "ccl": "USD_CCL",
-                    "cripto": "USD_CRIPTO"
+        data = response.json()
+        self._http_cache[source] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "data": data
+        }
+        return data
+    
+    @staticmethod
+    def _average(data: Dict[str, Any]) -> Optional[Decimal]:
+        compra = data.get("compra") or 0
+        venta = data.get("venta") or 0
+        promedio = (compra + venta) / 2 if compra and venta else (compra or venta)
+        return Decimal(str(promedio)) if promedio else None
+    
+    def _store_rates(self, session: Session, rates: Dict[str, Decimal]):
+        """
+        Guardar las tasas: divisas leídas con una consulta, faltantes creadas en lote,
+        tasas base actualizadas en lote e historial del día con un único upsert.
+        
+        Args:
+            session: Sesión de base de datos
+            rates: Promedio compra/venta por fuente
+        """
+        codigos = {self.CODIGO_ISO[source]: source for source in rates}
+        divisas = {
+            d.codigo_iso: d for d in session.exec(
+                select(Divisa).where(Divisa.codigo_iso.in_(list(codigos)))
+            ).all()
+        }
+        
+        faltantes = [codigo for codigo in codigos if codigo not in divisas]
+        if faltantes:
+            if self.config.get("create_divisas_if_missing", True):
+                nuevas = [
+                    Divisa(
+                        nombre_divisa=self.NOMBRES[codigos[codigo]],
+                        codigo_iso=codigo,
+                        simbolo_prefijo="$",
+                        tipo_divisa="Fiat",
+                        decimal_places=2,
+                        tasa_conversion_base=rates[codigos[codigo]]
+                    )
+                    for codigo in faltantes
+                ]
+                session.add_all(nuevas)
+                session.flush()
+                divisas.update({d.codigo_iso: d for d in nuevas})
+                self.logger.info(f"Divisas creadas: {', '.join(faltantes)}")
+            else:
+                self.logger.warning(f"Divisas no encontradas: {', '.join(faltantes)}")
+        
+        existentes = [(codigo, d) for codigo, d in divisas.items() if codigo not in faltantes]
+        if existentes:
+            session.execute(
+                update(Divisa),
+                [{"id_divisa": d.id_divisa, "tasa_conversion_base": rates[codigos[codigo]]} for codigo, d in existentes]
+            )
+        
+        hoy = datetime.now().date()
+        upsert(
+            session,
+            HistorialDivisa,
+            [
+                {
+                    "id_divisa": d.id_divisa,
+                    "fecha_tasa": hoy,
+                    "tasa_valor": rates[codigos[codigo]],
+                    "tipo_actualizacion": 1  # 1 = Automático
                 }
-                
-                codigo_iso = codigo_iso_map.get(source)
-                
-                # Buscar o crear divisa
-                divisa = session.exec(
-                    select(Divisa).where(Divisa.codigo_iso == codigo_iso)
-                ).first()
-                
-                if not divisa:
-                    if self.config.get("create_divisas_if_missing", True):
-                        # Crear nueva divisa
-                        nombre_map = {
-                            "blue": "Dólar Blue",
-                            "mep": "Dólar MEP",
-                            "ccl": "Dólar CCL",
-                            "cripto": "Dólar Cripto"
-                        }
-                        
-                        divisa = Divisa(
-                            nombre_divisa=nombre_map.get(source, f"USD {source.upper()}"),
-                            codigo_iso=codigo_iso,
-                            simbolo_prefijo="$",
-                            tipo_divisa="Fiat",
-                            decimal_places=2,
-                            tasa_conversion_base=promedio
-                        )
-                        session.add(divisa)
-                        session.flush()
-                        self.logger.info(f"Divisa {codigo_iso} creada")
-                    else:
-                        self.logger.warning(f"Divisa {codigo_iso} no encontrada")
-                        return
-                else:
-                    # Actualizar tasa
-                    divisa.tasa_conversion_base = promedio
-                    session.add(divisa)
-                
-                # Crear registro en historial
-                historial = HistorialDivisa(
-                    id_divisa=divisa.id_divisa,
-                    fecha_tasa=datetime.now().date(),
-                    tasa_valor=promedio,
-                    tipo_actualizacion=1  # 1 = Automático
-                )
-                session.add(historial)
-                
-                self.logger.debug(f"{source}: ${promedio}")
+                for codigo, d in divisas.items()
+            ],
+            conflict_columns=["id_divisa", "fecha_tasa"],
+            update_columns=["tasa_valor", "tipo_actualizacion"]
+        )
+        for source, promedio in rates.items():
+            self.logger.debug(f"{source}: ${promedio}")
     
     async def get_current_rates(self) -> Dict[str, Dict[str, Any]]:
         """
@@ -171,27 +226,21 @@ class DolarHoyPlugin(BasePlugin):
         Returns:
             Diccionario con tasas por fuente
         """
-        rates = {}
+        sources = [s for s in self.config["sources"] if s in self.API_URLS]
+        results = await asyncio.gather(*(self._fetch_rate(s) for s in sources), return_exceptions=True)
         
-        for source in self.config["sources"]:
-            if source not in self.API_URLS:
+        rates = {}
+        for source, data in zip(sources, results):
+            if isinstance(data, Exception):
+                self.logger.error(f"Error obteniendo {source}: {data}")
+                rates[source] = {"error": str(data)}
                 continue
-            
-            try:
-                url = self.API_URLS[source]
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            rates[source] = {
-                                "compra": data.get("compra"),
-                                "venta": data.get("venta"),
-                                "fecha": data.get("fechaActualizacion"),
-                                "casa": data.get("casa")
-                            }
-            except Exception as e:
-                self.logger.error(f"Error obteniendo {source}: {e}")
-                rates[source] = {"error": str(e)}
+            rates[source] = {
+                "compra": data.get("compra"),
+                "venta": data.get("venta"),
+                "fecha": data.get("fechaActualizacion"),
+                "casa": data.get("casa")
+            }
         
         return rates
     
@@ -1,9 +1,10 @@
 """
 Telegram Bot Plugin - Envía notificaciones por Telegram
 """
-import aiohttp
+import httpx
 from typing import Dict, Any
 from backend.plugins.base import BasePlugin
+from backend.core.plugin_metrics import PermanentDeliveryError
 
 
 class TelegramBotPlugin(BasePlugin):
@@ -18,6 +19,7 @@ class TelegramBotPlugin(BasePlugin):
     autor = "3F Team"
     descripcion = "Envía notificaciones por Telegram cuando ocurren eventos importantes"
     hooks = ["transaction_created", "budget_alert", "goal_reached", "daily_summary"]
+    batch_size = 20  # Hasta 20 transacciones por mensaje (resumen) al entregar desde el outbox
     
     async def initialize(self):
         """Inicializar el plugin y validar configuración"""
@@ -67,6 +69,43 @@ class TelegramBotPlugin(BasePlugin):
 📁 Categoría: {categoria}
 📝 Notas: {getattr(transaction, 'notas', 'N/A')[:50]}...
 
+<i>3F - Futuro Forbes</i>
+        """.strip()
+        
+        await self._send_message(message)
+    
+    async def on_transaction_created_batch(self, events):
+        """
+        Enviar un único resumen para varias transacciones entregadas juntas por el outbox.
+        
+        Args:
+            events: Lista de kwargs (transaction, user) de cada evento
+        """
+        transactions = [e.get("transaction") for e in events if e.get("transaction") is not None]
+        if len(transactions) == 1:
+            await self.on_transaction_created(transaction=transactions[0], user=events[0].get("user"))
+            return
+        if not transactions or not self._should_notify("transaction_created"):
+            return
+        
+        ingresos = sum(t.monto_transaccion for t in transactions if t.codigo_transaccion == "Deposit")
+        gastos = sum(t.monto_transaccion for t in transactions if t.codigo_transaccion != "Deposit")
+        lineas = [
+            f"{'💰' if t.codigo_transaccion == 'Deposit' else '💸'} ${t.monto_transaccion} - {(t.notas or 'N/A')[:30]}"
+            for t in transactions[:10]
+        ]
+        if len(transactions) > 10:
+            lineas.append(f"... y {len(transactions) - 10} más")
+        detalle = "\n".join(lineas)
+        
+        message = f"""
+<b>🧾 {len(transactions)} nuevas transacciones</b>
+
+{detalle}
+
+💰 Ingresos: ${ingresos}
+💸 Gastos: ${gastos}
+
 <i>3F - Futuro Forbes</i>
         """.strip()
         
@@ -185,17 +224,23 @@ class TelegramBotPlugin(BasePlugin):
         url = f"https://api.telegram.org/bot{token}/sendMessage"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json={
-                    "chat_id": chat_id,
-                    "text": text,
-                    "parse_mode": "HTML",
-                    "disable_web_page_preview": True
-                }) as response:
-                    if response.status == 200:
-                        self.logger.debug(f"Mensaje enviado correctamente a Telegram")
-                    else:
-                        error_text = await response.text()
-                        self.logger.error(f"Error enviando mensaje a Telegram: {error_text}")
-        except Exception as e:
+            response = await self.http.post(url, json={
+                "chat_id": chat_id,
+                "text": text,
+                "parse_mode": "HTML",
+                "disable_web_page_preview": True
+            })
+        except httpx.HTTPError as e:
             self.logger.error(f"Error de conexión con Telegram: {e}")
+            raise
+        
+        if response.status_code == 200:
+            self.logger.debug(f"Mensaje enviado correctamente a Telegram")
+            return
+        
+        self.logger.error(f"Error enviando mensaje a Telegram: {response.text}")
+        if response.status_code == 429 or response.status_code >= 500:
+            # Propagar para que el outbox reintente la entrega
+            raise RuntimeError(f"Telegram respondió {response.status_code}")
+        # 400/401/403 (chat inexistente, token revocado, bot bloqueado): reintentar no sirve
+        raise PermanentDeliveryError(f"Telegram rechazó el mensaje ({response.status_code})")
@@ -0,0 +1,108 @@
+"""
+Throughput of an async endpoint under concurrent load, sync Session vs AsyncSession.
+
+Seeds a temporary SQLite database with LibroTransacciones rows and fires N
+concurrent "requests" that run the monthly income/expense aggregates of
+/api/resumen: first with a sync Session inside ``async def`` (blocking the
+event loop, as the handler did before), then with ``get_async_session``'s
+AsyncSession. A probe task measures event-loop lag meanwhile.
+
+Usage: python backend/scripts/benchmark_async_db.py [requests] [rows]
+"""
+import sys
+import os
+import asyncio
+import statistics
+import tempfile
+import time
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.core.database import async_database_url
+from backend.models.models import LibroTransacciones
+
+PROBE_INTERVAL = 0.01
+
+
+def _aggregates():
+    return [
+        select(func.coalesce(func.sum(LibroTransacciones.monto_transaccion), 0)).where(
+            LibroTransacciones.codigo_transaccion == code,
+            LibroTransacciones.fecha_transaccion >= "2024-01-01"
+        )
+        for code in ("Deposit", "Withdrawal")
+    ]
+
+
+async def _probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(time.perf_counter() - expected, 0) * 1000)
+
+
+async def _run(label: str, handler, requests: int):
+    lags, stop = [], asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    lags.sort()
+    p99 = lags[min(int(len(lags) * 0.99), len(lags) - 1)] if lags else 0.0
+    print(f"{label:<13} {requests / elapsed:8.1f} req/s | {elapsed:6.2f}s total"
+          f" | loop lag p50 {statistics.median(lags or [0]):7.1f} ms | p99 {p99:7.1f} ms")
+
+
+async def main(requests: int, rows: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite:///{path}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine, tables=[LibroTransacciones.__table__])
+    with Session(engine) as session:
+        session.execute(insert(LibroTransacciones), [
+            {
+                "id_cuenta": 1,
+                "id_beneficiario": 1,
+                "codigo_transaccion": "Deposit" if i % 3 == 0 else "Withdrawal",
+                "monto_transaccion": i % 500,
+                "fecha_transaccion": f"2024-{i % 12 + 1:02d}-01",
+                "es_dividida": False
+            }
+            for i in range(rows)
+        ])
+        session.commit()
+
+    async_engine = create_async_engine(async_database_url(url), pool_size=20)
+
+    async def sync_handler():
+        with Session(engine) as session:
+            for statement in _aggregates():
+                session.exec(statement).one()
+
+    async def async_handler():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            for statement in _aggregates():
+                (await session.exec(statement)).one()
+
+    print(f"{requests} concurrent requests, {rows} transactions ({async_database_url(url).split(':')[0]})")
+    await _run("sync Session", sync_handler, requests)
+    await _run("AsyncSession", async_handler, requests)
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    asyncio.run(main(requests, rows))
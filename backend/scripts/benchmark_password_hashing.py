@@ -0,0 +1,63 @@
+"""
+Event-loop latency under a burst of concurrent logins.
+
+Runs N password verifications at once, first inline on the event loop (what
+login_usuario did before) and then on the dedicated bcrypt pool, while a probe
+task measures how late the loop wakes it up every 10 ms.
+
+Usage: python backend/scripts/benchmark_password_hashing.py [logins] [rounds]
+"""
+import sys
+import os
+import asyncio
+import statistics
+import time
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from backend.core.auth_utils import get_password_hash, verify_password, verify_password_async
+
+PROBE_INTERVAL = 0.01
+
+
+async def _probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(time.perf_counter() - expected, 0) * 1000)
+
+
+async def _run(label: str, verify, logins: int, hashed: str):
+    lags, stop = [], asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(verify("secreto123", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    assert all(results)
+    lags.sort()
+    p99 = lags[min(int(len(lags) * 0.99), len(lags) - 1)] if lags else 0.0
+    print(f"{label:<10} {logins} logins in {elapsed:6.2f}s | loop lag p50 {statistics.median(lags or [0]):7.1f} ms"
+          f" | p99 {p99:7.1f} ms | max {max(lags or [0]):7.1f} ms")
+
+
+async def _inline(plain: str, hashed: str) -> bool:
+    return verify_password(plain, hashed)
+
+
+async def main(logins: int, rounds: int):
+    hashed = get_password_hash("secreto123", rounds=rounds)
+    print(f"bcrypt cost {rounds}, {logins} concurrent logins")
+    await _run("inline", _inline, logins, hashed)
+    await _run("pool", verify_password_async, logins, hashed)
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    asyncio.run(main(logins, rounds))
@@ -0,0 +1,104 @@
+"""
+Concurrent read/write throughput on SQLite, default engine vs tuned profile.
+
+Writer threads insert transactions (one commit each, like the API) while
+reader threads run the monthly aggregate of /api/resumen, for a fixed time,
+first on a bare ``create_engine`` (rollback journal, default cache) and then
+on ``_build_engine`` (WAL, synchronous=NORMAL, mmap, cache_size, busy_timeout,
+pooled connections). "locked" counts operations that failed with
+"database is locked".
+
+Usage: python backend/scripts/benchmark_sqlite_pragmas.py [seconds] [writers] [readers] [rows]
+"""
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from backend.core.database import _build_engine
+from backend.models.models import LibroTransacciones
+
+
+def _row(i: int) -> dict:
+    return {
+        "id_cuenta": 1,
+        "id_beneficiario": 1,
+        "codigo_transaccion": "Deposit" if i % 3 == 0 else "Withdrawal",
+        "monto_transaccion": i % 500,
+        "fecha_transaccion": f"2024-{i % 12 + 1:02d}-01",
+        "es_dividida": False
+    }
+
+
+def _run(label: str, engine, seconds: float, writers: int, readers: int, rows: int):
+    SQLModel.metadata.create_all(engine, tables=[LibroTransacciones.__table__])
+    with Session(engine) as session:
+        session.execute(insert(LibroTransacciones), [_row(i) for i in range(rows)])
+        session.commit()
+
+    counts = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def count(key: str):
+        with lock:
+            counts[key] += 1
+
+    def writer():
+        i = 0
+        while time.perf_counter() < deadline:
+            try:
+                with Session(engine) as session:
+                    session.add(LibroTransacciones(**_row(i)))
+                    session.commit()
+                count("writes")
+            except OperationalError:
+                count("locked")
+            i += 1
+
+    def reader():
+        statement = select(func.sum(LibroTransacciones.monto_transaccion)).where(
+            LibroTransacciones.codigo_transaccion == "Withdrawal",
+            LibroTransacciones.fecha_transaccion >= "2024-06-01"
+        )
+        while time.perf_counter() < deadline:
+            try:
+                with Session(engine) as session:
+                    session.exec(statement).one()
+                count("reads")
+            except OperationalError:
+                count("locked")
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    print(f"{label:<8} writes {counts['writes'] / seconds:8.1f}/s | reads {counts['reads'] / seconds:8.1f}/s"
+          f" | locked {counts['locked']}")
+
+
+def main(seconds: float, writers: int, readers: int, rows: int):
+    tmp = tempfile.mkdtemp()
+    print(f"{seconds:.0f}s, {writers} writers, {readers} readers, {rows} seeded transactions")
+    default = create_engine(f"sqlite:///{os.path.join(tmp, 'default.db')}", connect_args={"check_same_thread": False})
+    _run("default", default, seconds, writers, readers, rows)
+    _run("tuned", _build_engine(f"sqlite:///{os.path.join(tmp, 'tuned.db')}"), seconds, writers, readers, rows)
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    rows = int(sys.argv[4]) if len(sys.argv) > 4 else 50000
+    main(seconds, writers, readers, rows)
@@ -1,15 +1,18 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from backend.main import app
-from backend.core.database import get_session
+from backend.core.database import get_session, get_read_session, get_async_session, async_database_url
 
 @pytest.fixture(name="session")
-def session_fixture():
-    # Create an in-memory SQLite database for each test
+def session_fixture(tmp_path):
+    # A SQLite file per test, so async endpoints (aiosqlite) see the same database
     engine = create_engine(
-        "sqlite://", 
+        f"sqlite:///{tmp_path / 'test.db'}",
         connect_args={"check_same_thread": False}, 
         poolclass=StaticPool
     )
@@ -20,6 +23,7 @@ def session_fixture():
     SQLModel.metadata.create_all(engine)
     with Session(engine) as session:
         yield session
+    engine.dispose()
 
 @pytest.fixture(name="client")
 def client_fixture(session: Session):
@@ -27,7 +31,28 @@ def client_fixture(session: Session):
     def get_session_override():
         return session
 
+    # Async endpoints get their own connection to the same database
+    async_engine = create_async_engine(async_database_url(str(session.get_bind().url)), poolclass=NullPool)
+
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+            yield async_session
+
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_read_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="query_budget")
+def query_budget_fixture():
+    """
+    Fail the test when a block runs more SQL statements than allowed:
+
+        with query_budget(3):
+            client.get("/api/...")
+    """
+    from backend.core.query_monitor import query_budget
+    return query_budget
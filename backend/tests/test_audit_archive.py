@@ -0,0 +1,102 @@
+import gzip
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from backend.api.audit import router as audit_router_module
+from backend.api.auth.deps import get_current_user
+from backend.core.audit_archive import AuditArchive, _row_to_dict
+from backend.main import app
+from backend.models.models import Usuario
+from backend.models.models_audit import AuditLog
+
+
+def _seed(session):
+    now = datetime.utcnow()
+    # ids 1-6 are old (two months), 7-9 recent
+    for i in range(9):
+        fecha = now - timedelta(days=200 - i * 10) if i < 6 else now - timedelta(hours=i)
+        session.add(AuditLog(fecha=fecha, id_usuario=1 if i % 2 else 2, accion="CREATE" if i != 4 else "DELETE",
+                             entidad="Transaccion", id_entidad=i))
+    session.commit()
+
+
+def test_rollover_and_keyset_query_across_hot_and_cold(session: Session, tmp_path):
+    _seed(session)
+    archive = AuditArchive(archive_dir=str(tmp_path), hot_days=90)
+
+    assert archive.rollover(session) == 6
+    assert [a.id_log for a in session.exec(select(AuditLog)).all()] == [7, 8, 9]
+    segments = archive.segments()
+    assert sum(s["filas"] for s in segments) == 6
+    assert all(s["estado"] == "completo" and s["archivo"].endswith(".jsonl.gz") for s in segments)
+
+    # Pages walk hot storage first and continue into the archive
+    seen, cursor = [], None
+    while True:
+        page, cursor = archive.query(session, cursor=cursor, limit=4)
+        seen.extend(a.id_log for a in page)
+        if cursor is None:
+            break
+    assert seen == [9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+    page, cursor = archive.query(session, filters={"accion": "DELETE"})
+    assert [a.id_log for a in page] == [5] and cursor is None
+    assert isinstance(page[0].fecha, datetime)
+
+
+def test_rollover_finishes_interrupted_segment(session: Session, tmp_path):
+    _seed(session)
+    archive = AuditArchive(archive_dir=str(tmp_path), hot_days=90)
+    old = session.exec(select(AuditLog).where(AuditLog.id_log <= 3)).all()
+    segment = archive._write_segment("2000-01", [_row_to_dict(r) for r in old])
+    archive._save_index([segment])
+
+    # Rows of the pending segment are removed, not archived a second time
+    archive.rollover(session)
+    ids = sorted(r["id_log"] for s in archive.segments() for r in archive._read_segment(s))
+    assert ids == [1, 2, 3, 4, 5, 6]
+
+
+def test_audit_logs_endpoint_uses_cursor(client: TestClient, session: Session, tmp_path, monkeypatch):
+    _seed(session)
+    monkeypatch.setattr(audit_router_module, "audit_archive", AuditArchive(archive_dir=str(tmp_path)))
+    app.dependency_overrides[get_current_user] = lambda: Usuario(id_usuario=1, email="a@b.c", password="x")
+
+    body = client.get("/api/audit/logs", params={"limit": 5}).json()
+    assert [a["id_log"] for a in body["data"]] == [9, 8, 7, 6, 5]
+    assert body["pagination"] == {"limit": 5, "next_cursor": 5, "has_more": True}
+    body = client.get("/api/audit/logs", params={"limit": 5, "cursor": 5}).json()
+    assert [a["id_log"] for a in body["data"]] == [4, 3, 2, 1]
+    assert body["pagination"]["has_more"] is False
+
+
+def test_query_reads_only_the_blocks_it_needs(session: Session, tmp_path, monkeypatch):
+    _seed(session)
+    archive = AuditArchive(archive_dir=str(tmp_path), hot_days=90, block_size=1)
+    archive.rollover(session)
+    assert all((tmp_path / f"{s['archivo']}.idx").exists() for s in archive.segments())
+
+    decompressed = []
+    real_decompress = gzip.decompress
+    monkeypatch.setattr(gzip, "decompress", lambda data: decompressed.append(1) or real_decompress(data))
+    page, cursor = archive.query(session, cursor=7, limit=2)
+    assert [a.id_log for a in page] == [6, 5] and cursor == 5
+    assert len(decompressed) == 3
+
+
+def test_rollover_of_everything_never_reuses_ids(session: Session, tmp_path):
+    _seed(session)
+    archive = AuditArchive(archive_dir=str(tmp_path), hot_days=90)
+
+    assert archive.rollover(session, older_than=timedelta(0)) == 8
+    assert [a.id_log for a in session.exec(select(AuditLog)).all()] == [9]
+    session.add(AuditLog(id_usuario=1, accion="LOGIN", entidad="Usuario"))
+    session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = archive.query(session, cursor=cursor, limit=3)
+        seen.extend(a.id_log for a in page)
+        if cursor is None:
+            break
+    assert seen == [10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
@@ -0,0 +1,49 @@
+import pytest
+from sqlmodel import Session, select
+from backend.core.audit_service import AuditService
+from backend.models.models_audit import AuditLog
+
+
+def _audit(session, tmp_path, **kwargs):
+    return AuditService(
+        session_factory=kwargs.pop("session_factory", lambda: Session(session.get_bind())),
+        spool_path=str(tmp_path / "audit_spool.jsonl"),
+        **kwargs
+    )
+
+
+def test_log_in_caller_transaction_does_not_commit(session, tmp_path):
+    audit = _audit(session, tmp_path)
+    audit.log(session, 1, "CREATE", "Transaccion", 10, {"monto": 5}, en_transaccion=True)
+    session.rollback()
+    assert session.exec(select(AuditLog)).all() == []
+
+    audit.log(session, 1, "CREATE", "Transaccion", 11, en_transaccion=True)
+    session.commit()
+    assert [a.id_entidad for a in session.exec(select(AuditLog)).all()] == [11]
+
+
+@pytest.mark.asyncio
+async def test_background_writer_batches_and_spools(session, tmp_path):
+    def broken_factory():
+        raise RuntimeError("DB caída")
+
+    audit = _audit(session, tmp_path, session_factory=broken_factory, flush_interval=60)
+    audit.start()
+    for i in range(3):
+        audit.log(session, 1, "UPDATE", "Cuenta", i)
+    # Nothing written on the request session
+    assert session.exec(select(AuditLog)).all() == []
+
+    # Shutdown flush fails: entries are spooled instead of lost
+    await audit.stop()
+    assert len((tmp_path / "audit_spool.jsonl").read_text().splitlines()) == 3
+
+    # Next writer (DB back) recovers the spool together with new entries
+    audit.session_factory = lambda: Session(session.get_bind())
+    audit.start()
+    audit.log(session, 1, "DELETE", "Cuenta", 3)
+    await audit.stop()
+
+    assert sorted(a.id_entidad for a in session.exec(select(AuditLog)).all()) == [0, 1, 2, 3]
+    assert not (tmp_path / "audit_spool.jsonl").exists()
@@ -0,0 +1,48 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from backend.core.auth_utils import create_access_token
+from backend.core.user_cache import user_cache, UsuarioActual
+from backend.models.models import Usuario
+
+
+@pytest.fixture
+def auth_headers(session: Session):
+    user_cache.clear()
+    user = Usuario(email="cache@example.com", password="hash", nombre="Ana")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    token = create_access_token(data={"sub": user.email, "id": user.id_usuario})
+    yield user, {"Authorization": f"Bearer {token}"}
+    user_cache.clear()
+
+
+def test_current_user_is_cached_snapshot(client: TestClient, session: Session, auth_headers):
+    user, headers = auth_headers
+    misses = user_cache.misses
+
+    for _ in range(3):
+        assert client.get("/api/auth/profile", headers=headers).json()["nombre"] == "Ana"
+    assert user_cache.misses == misses + 1
+
+    snapshot = user_cache.get_user(user.id_usuario, lambda pk: None)
+    assert isinstance(snapshot, UsuarioActual)
+    assert not hasattr(snapshot, "password")
+    with pytest.raises(Exception):
+        snapshot.nombre = "Otro"
+
+
+def test_profile_update_and_lock_invalidate_cache(client: TestClient, session: Session, auth_headers):
+    user, headers = auth_headers
+    client.get("/api/auth/profile", headers=headers)
+
+    response = client.post("/api/auth/profile", json={"nombre": "Beatriz"}, headers=headers)
+    assert response.status_code == 200
+    assert client.get("/api/auth/profile", headers=headers).json()["nombre"] == "Beatriz"
+
+    user.bloqueado = True
+    session.add(user)
+    session.commit()
+    user_cache.invalidate(user.id_usuario)
+    assert client.get("/api/auth/profile", headers=headers).status_code == 403
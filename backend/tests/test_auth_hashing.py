@@ -0,0 +1,32 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from backend.core import auth_utils
+from backend.core.auth_utils import get_password_hash, needs_rehash, verify_password_async
+from backend.core.config import settings
+from backend.models.models import Usuario
+
+
+@pytest.mark.asyncio
+async def test_async_verify_and_needs_rehash(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    hashed = get_password_hash("secreto123")
+    assert hashed.startswith("$2b$05$")
+    assert await verify_password_async("secreto123", hashed) is True
+    assert await verify_password_async("otra", hashed) is False
+    assert needs_rehash(hashed) is False
+    assert needs_rehash(get_password_hash("secreto123", rounds=4)) is True
+    assert needs_rehash("no-es-bcrypt") is False
+
+
+def test_login_rehashes_with_new_cost(client: TestClient, session: Session, monkeypatch):
+    user = Usuario(email="rehash@example.com", password=get_password_hash("secreto123", rounds=4))
+    session.add(user)
+    session.commit()
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+
+    response = client.post("/api/auth/login", json={"email": "rehash@example.com", "password": "secreto123"})
+    assert response.status_code == 200
+    session.refresh(user)
+    assert user.password.startswith("$2b$05$")
+    assert auth_utils.verify_password("secreto123", user.password)
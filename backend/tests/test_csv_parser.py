@@ -43,3 +43,56 @@ def test_csv_parser_malformed_rows():
     # Let's see how it behaves.
     assert len(data) >= 1
     assert any(d["descripcion"] == "Valid" for d in data)
+
+def test_csv_parser_learns_profile():
+    content = "Fecha;Concepto;Importe\n15/05/2024;Panadería;1.250,75\n16/05/2024;Venta;-20,00".encode("latin-1")
+    parser = CSVParser(content, delimiter=None)
+    data = parser.parse()
+
+    assert data[0]["monto"] == Decimal("1250.75")
+    profile = parser.profile
+    assert profile["delimiter"] == ";"
+    assert profile["encoding"] == "latin-1"
+    assert profile["mapping"] == {"fecha": "fecha", "descripcion": "concepto", "monto": "importe"}
+    assert profile["date_format"] == "%d/%m/%Y"
+    assert profile["decimal_separator"] == ","
+    assert profile["fingerprint"] == CSVParser.header_fingerprint(content)
+
+def test_csv_parser_with_profile():
+    learned = CSVParser(b"Fecha;Concepto;Importe\n01/02/2024;A;1.000,50", delimiter=None)
+    learned.parse()
+
+    # Same bank layout, new file: parsed directly with the saved profile
+    content = b"Fecha;Concepto;Importe\n03/02/2024;Luz;-1.234,00\nTOTAL;;-1.234,00"
+    data = CSVParser(content, profile=learned.profile).parse()
+
+    assert len(data) == 1
+    assert data[0] == {
+        "fecha": "2024-02-03",
+        "descripcion": "Luz",
+        "monto": Decimal("-1234.00"),
+        "raw_row": {"fecha": "03/02/2024", "concepto": "Luz", "importe": "-1.234,00"}
+    }
+
+    with pytest.raises(ValueError):
+        CSVParser(b"Date,Description,Amount\n2024-01-01,X,1", profile=learned.profile).parse()
+
+def test_csv_parser_profile_falls_back_per_row():
+    learned = CSVParser(b"Fecha;Concepto;Importe\n01/02/2024;A;1.000,50", delimiter=None)
+    learned.parse()
+
+    # Rows off the learned layout are parsed with the detection heuristics, not dropped
+    content = (
+        b"Fecha;Concepto;Importe\n03/02/2024;Luz;(45,00)\n04/02/2024;Gas;45,00-\n"
+        b"05/02/2024;Agua;45.00\n2024-02-06;Tel;1.234,00\nTOTAL;;-1.234,00"
+    )
+    parser = CSVParser(content, profile=learned.profile)
+    data = parser.parse()
+
+    assert [(d["fecha"], d["monto"]) for d in data] == [
+        ("2024-02-03", Decimal("-45.00")),
+        ("2024-02-04", Decimal("-45.00")),
+        ("2024-02-05", Decimal("45.00")),
+        ("2024-02-06", Decimal("1234.00")),
+    ]
+    assert parser.skipped_rows == 1
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+import httpx
+from backend.core.http_client import HTTPClientManager
+
+
+@pytest.mark.asyncio
+async def test_shared_client_retries_idempotent_requests():
+    calls = {"GET": 0, "POST": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls[request.method] += 1
+        if calls[request.method] == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ok": True})
+
+    manager = HTTPClientManager(retries=2, backoff=0, transport=httpx.MockTransport(handler))
+    await manager.start()
+    client = manager.client
+
+    response = await manager.get("https://dolarapi.com/v1/dolares")
+    assert response.status_code == 200
+    assert calls["GET"] == 2
+
+    # POST is not idempotent: the 503 is returned as is
+    response = await manager.post("https://api.telegram.org/botX/sendMessage", json={})
+    assert response.status_code == 503
+    assert calls["POST"] == 1
+
+    # Same pooled client across calls; closed with the app lifespan
+    assert manager.client is client
+    await manager.close()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_other_event_loops_get_their_own_client():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        return httpx.Response(500 if len(calls) == 1 else 200)
+
+    manager = HTTPClientManager(retries=1, backoff=0, transport=httpx.MockTransport(handler))
+    main_client = manager.client
+
+    async def job():
+        # e.g. a scheduler job running asyncio.run() in a worker thread
+        response = await manager.get("https://dolarapi.com/v1/dolares")
+        job_client = manager.client
+        await manager.close()
+        return response.status_code, job_client
+
+    status, job_client = await asyncio.to_thread(asyncio.run, job())
+    assert status == 200 and calls == ["dolarapi.com", "dolarapi.com"]  # 500 is retried
+    assert job_client is not main_client and job_client.is_closed
+    assert manager.client is main_client and not main_client.is_closed
+    await manager.close()
@@ -0,0 +1,62 @@
+import pytest
+from backend.models.models import Usuario, Beneficiario
+from backend.models.models_extended import ReglaImportacion
+from backend.core.import_rules_service import ImportRulesService
+
+
+def _setup_rules(session):
+    user = Usuario(email="rules@example.com", password="hash")
+    session.add(user)
+    benef = Beneficiario(nombre_beneficiario="Netflix")
+    session.add(benef)
+    session.commit()
+    session.refresh(user)
+    session.refresh(benef)
+
+    session.add_all([
+        ReglaImportacion(id_usuario=user.id_usuario, patron="SUPER", id_categoria=1, prioridad=1),
+        ReglaImportacion(id_usuario=user.id_usuario, patron="supermercado dia", id_categoria=2, prioridad=5),
+        ReglaImportacion(id_usuario=user.id_usuario, patron="netflix", id_categoria=3,
+                         id_beneficiario=benef.id_beneficiario, prioridad=0),
+        ReglaImportacion(id_usuario=user.id_usuario, patron=r"re:^transf\w*\s+\d+", id_categoria=4, prioridad=3),
+        ReglaImportacion(id_usuario=user.id_usuario, patron="ignored", id_categoria=5, prioridad=9, activo=0),
+    ])
+    session.commit()
+    return user
+
+
+def test_rule_priority_and_case_insensitive(session):
+    user = _setup_rules(session)
+    rules = ImportRulesService().compile(session, user.id_usuario)
+
+    assert len(rules) == 4
+    # Both "SUPER" and "supermercado dia" match; higher priority wins
+    assert rules.match("Compra SUPERMERCADO DIA 123")["id_categoria"] == 2
+    assert rules.match("Compra Supermarket")["id_categoria"] == 1
+    assert rules.match("nothing relevant") == {}
+    # Inactive rules are not compiled
+    assert rules.match("ignored entry") == {}
+
+
+def test_rule_regex_and_preloaded_payee(session):
+    user = _setup_rules(session)
+    rules = ImportRulesService().compile(session, user.id_usuario)
+
+    result = rules.match("TRANSFERENCIA 4455 super")
+    assert result["id_categoria"] == 4
+    assert result["rule_name"].startswith("re:")
+
+    result = rules.match("NETFLIX.COM")
+    assert result["id_categoria"] == 3
+    assert result["nombre_beneficiario"] == "Netflix"
+
+
+def test_rule_cache_invalidation(session):
+    user = _setup_rules(session)
+    service = ImportRulesService()
+
+    first = service.get_rules(session, user.id_usuario)
+    assert service.get_rules(session, user.id_usuario) is first
+
+    service.invalidate(user.id_usuario)
+    assert service.get_rules(session, user.id_usuario) is not first
@@ -0,0 +1,56 @@
+import logging
+import pytest
+from backend.api.auth.deps import get_current_user
+from backend.core.config import settings
+from backend.core.metrics import instrument_job, registry
+from backend.main import app
+from backend.models.models import Usuario
+
+
+def _sample(name: str, **labels) -> float:
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_labelled_by_route_template(client, session):
+    user = Usuario(email="metrics@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    labels = {"method": "GET", "route": "/api/notifications/unread-count", "status": "2xx"}
+    before = _sample("http_request_duration_seconds_count", **labels)
+    client.get("/api/notifications/unread-count")
+    assert _sample("http_request_duration_seconds_count", **labels) == before + 1
+
+    body = client.get("/metrics").text
+    assert 'route="/api/notifications/unread-count"' in body
+    assert 'db_pool_checked_out{engine="primary"}' in body
+    assert 'cache_hit_ratio{cache="auth_users"}' in body
+    assert "fx_rates_cache_age_seconds" in body
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+
+
+def test_job_logging_an_error_counts_as_failed():
+    logger = logging.getLogger("backend.core.scheduler")
+
+    def swallowing_job():
+        try:
+            raise RuntimeError("boom")
+        except Exception as e:
+            logger.error(f"Job failed: {e}")
+
+    before = _sample("scheduler_job_runs_total", job="test_job", outcome="error")
+    instrument_job("test_job", swallowing_job)()
+    instrument_job("test_job", lambda: None)()
+    assert _sample("scheduler_job_runs_total", job="test_job", outcome="error") == before + 1
+    assert _sample("scheduler_job_runs_total", job="test_job", outcome="ok") >= 1
+
+    with pytest.raises(ValueError):
+        instrument_job("test_job", lambda: (_ for _ in ()).throw(ValueError()))()
+    assert _sample("scheduler_job_runs_total", job="test_job", outcome="error") == before + 2
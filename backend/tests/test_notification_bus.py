@@ -0,0 +1,97 @@
+import asyncio
+import importlib
+import json
+import pytest
+import fakeredis
+from sqlmodel import Session
+from backend.core.notification_bus import NotificationBus
+from backend.models.models import Usuario
+from backend.models.models_notifications import UserNotification
+
+# The package re-exports the APIRouter as ``router``, so import the module explicitly
+notifications = importlib.import_module("backend.api.notifications.router")
+
+
+@pytest.mark.asyncio
+async def test_memory_bus_multiple_tabs_and_bounded_buffer():
+    bus = NotificationBus(backend="memory", buffer_size=2)
+    tab1 = await bus.subscribe(1)
+    tab2 = await bus.subscribe(1)
+
+    assert await bus.publish(1, {"n": 1}) is True
+    assert await bus.publish(2, {"n": 1}) is False
+    assert (await tab1.get(1))["n"] == 1
+    assert (await tab2.get(1))["n"] == 1
+
+    # Closing one tab keeps the other subscribed
+    bus.unsubscribe(tab1)
+    assert bus.connection_count(1) == 1
+
+    for n in range(2, 5):
+        await bus.publish(1, {"n": n})
+    assert tab2.overflowed is True
+    assert [(await tab2.get(1))["n"] for _ in range(2)] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_redis_bus_fans_out_across_workers():
+    server = fakeredis.FakeServer()
+    worker_a = NotificationBus(backend="redis", redis_client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    worker_b = NotificationBus(backend="redis", redis_client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    try:
+        stream = await worker_b.subscribe(7)
+        await worker_a.publish(7, {"title": "Hola"})
+        assert (await stream.get(2))["title"] == "Hola"
+    finally:
+        await worker_a.close()
+        await worker_b.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_replays_from_last_event_id(session, monkeypatch):
+    bus = NotificationBus(backend="memory")
+    monkeypatch.setattr(notifications, "notification_bus", bus)
+    user = Usuario(email="sse@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    for i in range(3):
+        session.add(UserNotification(user_id=user.id_usuario, type="info", title=f"N{i}", message="m"))
+    session.commit()
+
+    stream = notifications.notification_generator(
+        user.id_usuario, last_event_id=1, session_factory=lambda: Session(session.get_bind())
+    )
+    assert "connected" in await stream.__anext__()
+    replayed = [await stream.__anext__() for _ in range(2)]
+    assert [frame.split("\n")[0] for frame in replayed] == ["id: 2", "id: 3"]
+
+    # Live notifications reach the stream; already replayed ids are skipped
+    await bus.publish(user.id_usuario, {"id_db": 3, "title": "N2"})
+    await bus.publish(user.id_usuario, {"id_db": 4, "title": "Nueva"})
+    frame = await asyncio.wait_for(stream.__anext__(), 1)
+    assert json.loads(frame.split("data: ")[1])["title"] == "Nueva"
+
+    await stream.aclose()
+    assert bus.connection_count(user.id_usuario) == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_pages_past_the_limit(session, monkeypatch):
+    monkeypatch.setattr(notifications, "notification_bus", NotificationBus(backend="memory"))
+    monkeypatch.setattr(notifications, "REPLAY_LIMIT", 2)
+    user = Usuario(email="sse-pages@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    for i in range(5):
+        session.add(UserNotification(user_id=user.id_usuario, type="info", title=f"N{i}", message="m"))
+    session.commit()
+
+    stream = notifications.notification_generator(
+        user.id_usuario, last_event_id=0, session_factory=lambda: Session(session.get_bind())
+    )
+    await stream.__anext__()
+    replayed = [await stream.__anext__() for _ in range(5)]
+    assert [frame.split("\n")[0] for frame in replayed] == [f"id: {i}" for i in range(1, 6)]
+    await stream.aclose()
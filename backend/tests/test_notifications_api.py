@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from backend.api.auth.deps import get_current_user
+from backend.core.notification_service import notification_service
+from backend.main import app
+from backend.models.models import Usuario
+from backend.models.models_notifications import UserNotification
+
+
+def test_bulk_read_clear_and_unread_count(client: TestClient, session: Session):
+    user = Usuario(email="notif@example.com", password="hash")
+    other = Usuario(email="other@example.com", password="hash")
+    session.add_all([user, other])
+    session.commit()
+    for owner in (user, user, user, other):
+        session.add(UserNotification(user_id=owner.id_usuario, type="info", title="T", message="M"))
+    session.commit()
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    assert client.get("/api/notifications/unread-count").json() == {"unread": 3}
+
+    response = client.put("/api/notifications/read-all")
+    assert response.status_code == 200
+    assert response.json()["updated"] == 3
+    assert client.get("/api/notifications/unread-count").json() == {"unread": 0}
+
+    assert client.delete("/api/notifications/").json()["deleted"] == 3
+    # Other users' notifications are untouched
+    remaining = session.exec(select(UserNotification)).all()
+    assert [n.user_id for n in remaining] == [other.id_usuario]
+    assert remaining[0].read is False
+
+
+def test_purge_read_notifications_in_batches(session: Session):
+    user = Usuario(email="retention@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    old = datetime.utcnow() - timedelta(days=200)
+    for i in range(5):
+        session.add(UserNotification(user_id=user.id_usuario, type="info", title="Vieja", message="M", read=True, timestamp=old))
+    session.add(UserNotification(user_id=user.id_usuario, type="info", title="No leída", message="M", timestamp=old))
+    session.add(UserNotification(user_id=user.id_usuario, type="info", title="Reciente", message="M", read=True))
+    session.commit()
+
+    notification_service.batch_size, previous = 2, notification_service.batch_size
+    try:
+        assert notification_service.purge_read(session) == 5
+    finally:
+        notification_service.batch_size = previous
+
+    titles = sorted(n.title for n in session.exec(select(UserNotification)).all())
+    assert titles == ["No leída", "Reciente"]
@@ -0,0 +1,107 @@
+import pytest
+from datetime import timedelta
+from sqlmodel import Session, select
+from backend.core.outbox_service import OutboxService
+from backend.core.plugin_manager import plugin_manager
+from backend.core.plugin_metrics import PermanentDeliveryError
+from backend.models.models import Usuario
+from backend.models.models_plugins import EventoHook
+from backend.plugins.base import BasePlugin
+
+
+class DigestPlugin(BasePlugin):
+    nombre_tecnico = "digest_test"
+    hooks = ["transaction_created"]
+    batch_size = 3
+
+    async def initialize(self):
+        self.batches = []
+        self.fail_next = True
+
+    async def shutdown(self):
+        pass
+
+    async def on_transaction_created_batch(self, events):
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("Telegram caído")
+        # Entities are only usable while the outbox session is open
+        self.batches.append([{**e, "email": getattr(e.get("user"), "email", None)} for e in events])
+
+
+@pytest.fixture
+def digest_plugin():
+    plugin = DigestPlugin()
+    plugin_manager.register_hook("transaction_created", 99, plugin)
+    plugin_manager.loaded_plugins[plugin.nombre_tecnico] = {"instance": plugin, "db_id": 99, "hooks": plugin.hooks}
+    yield plugin
+    plugin_manager.hooks["transaction_created"] = [
+        h for h in plugin_manager.hooks["transaction_created"] if h["instance"] is not plugin
+    ]
+    plugin_manager.loaded_plugins.pop(plugin.nombre_tecnico, None)
+
+
+@pytest.mark.asyncio
+async def test_outbox_batches_and_retries(session, digest_plugin):
+    await digest_plugin.initialize()
+    user = Usuario(email="outbox@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    outbox = OutboxService(session_factory=lambda: Session(session.get_bind()), base_delay=timedelta(0))
+    for i in range(4):
+        assert outbox.enqueue(session, "transaction_created", user=user, monto=i) == 1
+    session.commit()
+
+    # Rolled-back changes never reach the outbox
+    outbox.enqueue(session, "transaction_created", user=user, monto=99)
+    session.rollback()
+
+    assert await outbox.drain() == 4
+
+    rows = session.exec(select(EventoHook).order_by(EventoHook.id_evento)).all()
+    assert len(rows) == 4
+    assert {r.estado for r in rows} == {"entregado"}
+    assert [r.intentos for r in rows] == [2, 2, 2, 1]
+
+    # First chunk failed once; deliveries respect batch_size and reload entities
+    assert sorted(len(b) for b in digest_plugin.batches) == [1, 3]
+    events = [e for b in digest_plugin.batches for e in b]
+    assert sorted(e["monto"] for e in events) == [0, 1, 2, 3]
+    assert all(isinstance(e["user"], Usuario) and e["email"] == "outbox@example.com" for e in events)
+
+
+@pytest.mark.asyncio
+async def test_outbox_gives_up_after_max_attempts(session, digest_plugin):
+    await digest_plugin.initialize()
+    outbox = OutboxService(
+        session_factory=lambda: Session(session.get_bind()),
+        base_delay=timedelta(0),
+        max_attempts=1
+    )
+    outbox.enqueue(session, "transaction_created", monto=1)
+    session.commit()
+
+    assert await outbox.drain() == 0
+    row = session.exec(select(EventoHook)).one()
+    assert row.estado == "fallido"
+    assert row.ultimo_error == "Telegram caído"
+
+
+@pytest.mark.asyncio
+async def test_outbox_discards_permanent_failures(session, digest_plugin):
+    await digest_plugin.initialize()
+
+    async def rejected(events):
+        raise PermanentDeliveryError("Telegram rechazó el mensaje (403)")
+
+    digest_plugin.on_transaction_created_batch = rejected
+    outbox = OutboxService(session_factory=lambda: Session(session.get_bind()), base_delay=timedelta(0))
+    outbox.enqueue(session, "transaction_created", monto=1)
+    session.commit()
+
+    assert await outbox.drain() == 0
+    row = session.exec(select(EventoHook)).one()
+    assert (row.estado, row.intentos) == ("descartado", 1)
+    assert row.ultimo_error == "Telegram rechazó el mensaje (403)"
@@ -6,10 +6,11 @@ import asyncio
 from datetime import datetime
 from decimal import Decimal
 from unittest.mock import Mock, patch, AsyncMock
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import SQLModel, create_engine, Session, select
 
 # Importar lo que vamos a testear
 from backend.core.plugin_manager import PluginManager, plugin_manager
+from backend.core.plugin_metrics import CircuitBreaker
 from backend.plugins.base import BasePlugin
 from backend.models.models_plugins import Plugin
 
@@ -132,6 +133,77 @@ class TestPluginManager:
         # El segundo plugin debería haberse ejecutado
         mock_plugin2.on_hook.assert_called_once()
     
+    @pytest.mark.asyncio
+    async def test_call_hook_concurrent_with_timeout(self, clean_plugin_manager):
+        """Los plugins corren en paralelo y uno colgado se corta por timeout"""
+        async def slow(*args, **kwargs):
+            await asyncio.sleep(0.2)
+
+        async def hung(*args, **kwargs):
+            await asyncio.sleep(60)
+
+        plugins = []
+        for i, side_effect in enumerate([slow, slow, hung]):
+            plugin = AsyncMock()
+            plugin.nombre_tecnico = f"plugin{i}"
+            plugin.hook_timeout = None
+            plugin.on_hook.side_effect = side_effect
+            clean_plugin_manager.register_hook("test_hook", i, plugin)
+            plugins.append(plugin)
+        clean_plugin_manager.hook_timeout = 0.5
+
+        start = asyncio.get_running_loop().time()
+        results = await clean_plugin_manager.call_hook("test_hook")
+        elapsed = asyncio.get_running_loop().time() - start
+
+        assert results == {"plugin0": "ok", "plugin1": "ok", "plugin2": "timeout"}
+        assert elapsed < 1
+        assert clean_plugin_manager.get_hook_stats()["plugin2"] == {"calls": 1, "errors": 0, "timeouts": 1}
+    
+    @pytest.mark.asyncio
+    async def test_dispatch_hook_background(self, clean_plugin_manager):
+        """El modo fire-and-forget no espera al plugin y contabiliza errores"""
+        mock_plugin = AsyncMock()
+        mock_plugin.nombre_tecnico = "plugin1"
+        mock_plugin.on_hook.side_effect = Exception("SMTP caído")
+        clean_plugin_manager.register_hook("test_hook", 1, mock_plugin)
+
+        task = clean_plugin_manager.dispatch_hook("test_hook", data="test")
+        assert task is not None and not task.done()
+
+        await clean_plugin_manager.drain_background_hooks()
+        mock_plugin.on_hook.assert_called_once_with("test_hook", data="test")
+        assert clean_plugin_manager.get_hook_stats()["plugin1"]["errors"] == 1
+        assert clean_plugin_manager.dispatch_hook("sin_suscriptores") is None
+    
+    @pytest.mark.asyncio
+    async def test_circuit_breaker_and_metrics(self, clean_plugin_manager):
+        """Un plugin que falla seguido deja de ser llamado hasta que pasa el cooldown"""
+        now = [0.0]
+        clean_plugin_manager.breakers["plugin1"] = CircuitBreaker(threshold=2, cooldown=30, clock=lambda: now[0])
+        mock_plugin = AsyncMock()
+        mock_plugin.nombre_tecnico = "plugin1"
+        mock_plugin.on_hook.side_effect = Exception("API caída")
+        clean_plugin_manager.register_hook("test_hook", 1, mock_plugin)
+        
+        assert await clean_plugin_manager.call_hook("test_hook") == {"plugin1": "error"}
+        assert await clean_plugin_manager.call_hook("test_hook") == {"plugin1": "error"}
+        assert await clean_plugin_manager.call_hook("test_hook") == {"plugin1": "circuit_open"}
+        assert mock_plugin.on_hook.call_count == 2
+        
+        metrics = clean_plugin_manager.get_plugin_metrics("plugin1")
+        assert metrics["circuito"]["estado"] == "open"
+        assert metrics["hooks"]["test_hook"]["calls"] == 2
+        assert metrics["hooks"]["test_hook"]["rechazadas"] == 1
+        assert metrics["hooks"]["test_hook"]["error_rate"] == 1.0
+        assert metrics["hooks"]["test_hook"]["p99_ms"] is not None
+        
+        # Tras el cooldown se permite una llamada de prueba; si funciona, el circuito se cierra
+        now[0] = 31
+        mock_plugin.on_hook.side_effect = None
+        assert await clean_plugin_manager.call_hook("test_hook") == {"plugin1": "ok"}
+        assert clean_plugin_manager.get_plugin_metrics("plugin1")["circuito"]["estado"] == "closed"
+    
     @pytest.mark.asyncio
     async def test_install_plugin(self, clean_plugin_manager, mock_session, sample_plugin_data):
         """Probar instalación de plugin"""
@@ -172,6 +244,56 @@ class TestPluginManager:
         
         assert clean_plugin_manager.is_plugin_loaded("test_plugin") is True
         assert clean_plugin_manager.is_plugin_loaded("other_plugin") is False
+    
+    @pytest.mark.asyncio
+    async def test_lazy_loading_on_first_hook(self, clean_plugin_manager, mock_session, monkeypatch):
+        """Los plugins diferidos se importan recién al primer disparo de sus hooks"""
+        imports = []
+        
+        class LazyTestPlugin(BasePlugin):
+            nombre_tecnico = "lazy_test"
+            hooks = ["transaction_created"]
+            
+            async def initialize(self):
+                self.received = []
+            
+            async def shutdown(self):
+                pass
+            
+            async def on_transaction_created(self, **kwargs):
+                self.received.append(kwargs)
+        
+        def fake_import(path):
+            imports.append(path)
+            return Mock(LazyTestPlugin=LazyTestPlugin)
+        
+        monkeypatch.setattr("backend.core.plugin_manager.importlib.import_module", fake_import)
+        mock_session.add(Plugin(
+            nombre_tecnico="lazy_test", nombre_display="Lazy", instalado=True, activo=True,
+            hooks_suscritos="transaction_created"
+        ))
+        mock_session.commit()
+        
+        await clean_plugin_manager.load_plugins(mock_session, lazy=True)
+        
+        assert imports == []
+        assert clean_plugin_manager.is_plugin_active("lazy_test") is True
+        assert clean_plugin_manager.is_plugin_loaded("lazy_test") is False
+        assert clean_plugin_manager.get_hook_subscribers("transaction_created")[0]["instance"] is None
+        
+        # Dos disparos simultáneos importan el módulo una sola vez
+        results = await asyncio.gather(
+            clean_plugin_manager.call_hook("transaction_created", monto=1),
+            clean_plugin_manager.call_hook("transaction_created", monto=2)
+        )
+        
+        assert imports == ["backend.plugins.lazy_test.plugin"]
+        assert results == [{"lazy_test": "ok"}, {"lazy_test": "ok"}]
+        instance = clean_plugin_manager.get_plugin_instance("lazy_test")
+        assert sorted(k["monto"] for k in instance.received) == [1, 2]
+        assert len(clean_plugin_manager.get_hook_subscribers("transaction_created")) == 1
+        assert clean_plugin_manager.get_pending_plugins() == []
+        assert set(clean_plugin_manager.load_times["lazy_test"]) == {"import_ms", "init_ms"}
 
 
 # ==========================================
@@ -409,6 +531,51 @@ class TestDolarHoyPlugin:
         assert "mep" in sources
         assert "ccl" in sources
         assert "cripto" in sources
+    
+    @pytest.mark.asyncio
+    async def test_dolar_concurrent_fetch_and_upsert(self, monkeypatch):
+        """Fuentes en paralelo, peticiones condicionales y upsert del historial"""
+        import httpx
+        from sqlalchemy.pool import StaticPool
+        from backend.core.http_client import http_client
+        from backend.models.models import Divisa
+        from backend.models.models_extended import HistorialDivisa
+        from backend.plugins.dolar_hoy import plugin as dolar_module
+        
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(engine)
+        monkeypatch.setattr(dolar_module, "engine", engine)
+        
+        requests_seen = []
+        
+        def handler(request):
+            casa = request.url.path.rsplit("/", 1)[-1]
+            requests_seen.append((casa, request.headers.get("If-None-Match")))
+            if request.headers.get("If-None-Match") == f'"{casa}-v1"':
+                return httpx.Response(304)
+            venta = {"blue": 1200, "bolsa": 1100}[casa]
+            return httpx.Response(200, json={"compra": venta - 20, "venta": venta}, headers={"ETag": f'"{casa}-v1"'})
+        
+        await http_client.close()
+        monkeypatch.setattr(http_client, "transport", httpx.MockTransport(handler))
+        try:
+            plugin = dolar_module.DolarHoyPlugin(config={"sources": ["blue", "mep"]})
+            await plugin.initialize()
+            await plugin.update_exchange_rates()
+            await plugin.update_exchange_rates()
+        finally:
+            await http_client.close()
+        
+        assert len(requests_seen) == 4
+        assert set(requests_seen) == {
+            ("blue", None), ("blue", '"blue-v1"'), ("bolsa", None), ("bolsa", '"bolsa-v1"')
+        }
+        with Session(engine) as session:
+            divisas = {d.codigo_iso: d for d in session.exec(select(Divisa)).all()}
+            assert divisas["USD_BLUE"].tasa_conversion_base == Decimal("1190")
+            historial = session.exec(select(HistorialDivisa)).all()
+            # Una fila por divisa y día, aunque se actualice dos veces
+            assert len(historial) == 2
 
 
 # ==========================================
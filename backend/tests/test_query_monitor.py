@@ -0,0 +1,49 @@
+import logging
+import pytest
+from sqlmodel import Session, select
+from backend.api.auth.deps import get_current_user
+from backend.core.config import settings
+from backend.main import app
+from backend.models.models import Usuario
+from backend.models.models_notifications import UserNotification
+
+
+def _user_with_notifications(session: Session) -> Usuario:
+    user = Usuario(email="queries@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    for _ in range(3):
+        session.add(UserNotification(user_id=user.id_usuario, type="info", title="T", message="M"))
+    session.commit()
+    session.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+    return user
+
+
+def test_server_timing_header_and_budget(client, session, query_budget):
+    _user_with_notifications(session)
+
+    with query_budget(1) as stats:
+        response = client.get("/api/notifications/unread-count")
+    assert response.json() == {"unread": 3}
+    assert stats.count == 1
+
+    timing = response.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert 'desc="1 queries"' in timing
+
+
+def test_budget_exceeded_fails(client, session, query_budget):
+    _user_with_notifications(session)
+    with pytest.raises(AssertionError, match="budget is 0"):
+        with query_budget(0):
+            client.get("/api/notifications/")
+
+
+def test_slow_queries_are_logged_without_parameters(session, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.0001)
+    with caplog.at_level(logging.WARNING, logger="backend.core.query_monitor"):
+        session.exec(select(Usuario).where(Usuario.email == "secreto@example.com")).all()
+    slow = [r.getMessage() for r in caplog.records if "Slow query" in r.getMessage()]
+    assert slow and "parameters redacted" in slow[0]
+    assert "secreto@example.com" not in " ".join(slow)
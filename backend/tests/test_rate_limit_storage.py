@@ -0,0 +1,72 @@
+import time
+import fakeredis
+import pytest
+from limits import parse
+from limits.strategies import SlidingWindowCounterRateLimiter
+from sqlmodel import Session
+from backend.core.rate_limit_storage import (
+    BoundedMemoryStorage, DatabaseStorage, RedisCounterStorage, storage_uri
+)
+from backend.core.security_middleware import CSRFProtection
+
+
+@pytest.fixture(params=["memory", "redis", "database"])
+def storage(request, session):
+    if request.param == "memory":
+        return BoundedMemoryStorage(maxsize=100)
+    if request.param == "redis":
+        return RedisCounterStorage("redis-counter://localhost", client=fakeredis.FakeRedis(decode_responses=True))
+    return DatabaseStorage(session_factory=lambda: Session(session.get_bind()))
+
+
+def test_sliding_window_limit(storage):
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    limit = parse("3/minute")
+    assert all(limiter.hit(limit, "1.2.3.4") for _ in range(3))
+    assert limiter.hit(limit, "1.2.3.4") is False
+    assert limiter.hit(limit, "5.6.7.8") is True
+    assert limiter.get_window_stats(limit, "1.2.3.4").remaining == 0
+
+
+def test_workers_share_redis_counters():
+    server = fakeredis.FakeServer()
+    worker_a = RedisCounterStorage("redis-counter://localhost", client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    worker_b = RedisCounterStorage("redis-counter://localhost", client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    limit = parse("2/minute")
+    assert SlidingWindowCounterRateLimiter(worker_a).hit(limit, "ip")
+    assert SlidingWindowCounterRateLimiter(worker_b).hit(limit, "ip")
+    assert SlidingWindowCounterRateLimiter(worker_a).hit(limit, "ip") is False
+
+
+def test_values_expire_and_purge(storage):
+    storage.set_value("csrf:s1", "token", 0.05)
+    storage.set_value("csrf:s2", "token", 60)
+    assert storage.get_value("csrf:s1") == "token"
+    time.sleep(0.1)
+    assert storage.get_value("csrf:s1") is None
+    storage.purge_expired()
+    assert storage.get_value("csrf:s2") == "token"
+
+
+def test_memory_storage_is_bounded():
+    storage = BoundedMemoryStorage(maxsize=10)
+    for i in range(50):
+        storage.set_value(f"csrf:{i}", "t", 60)
+    assert len(storage._entries) == 10
+    assert storage.get_value("csrf:49") == "t"
+
+
+def test_csrf_tokens(monkeypatch):
+    monkeypatch.setattr(CSRFProtection, "storage", BoundedMemoryStorage(maxsize=10))
+    token = CSRFProtection.generate_token("sesion")
+    assert CSRFProtection.validate_token(token, "sesion") is True
+    assert CSRFProtection.validate_token(token, "otra") is False
+    assert CSRFProtection.validate_token("falso", "sesion") is False
+
+
+def test_storage_uri():
+    assert storage_uri("auto", "redis://cache:6379/0") == "redis-counter://cache:6379/0"
+    assert storage_uri("auto", None) == "database://"
+    assert storage_uri("memory", "redis://cache") == "bounded-memory://"
+    with pytest.raises(ValueError):
+        storage_uri("redis", None)
@@ -0,0 +1,46 @@
+from sqlmodel import Session, SQLModel, create_engine, select
+from backend.core.read_replica import ReadReplicaRouter
+from backend.models.models import Usuario
+
+
+def _engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine, tables=[Usuario.__table__])
+    return engine
+
+
+def test_reads_go_to_replica_and_fall_back_to_primary(tmp_path, monkeypatch):
+    primary, replica = _engine(tmp_path / "primary.db"), _engine(tmp_path / "replica.db")
+    with Session(replica) as session:
+        session.add(Usuario(email="replica@example.com", password="hash"))
+        session.commit()
+    router = ReadReplicaRouter(primary, replica, max_lag=5, check_interval=0)
+
+    with Session(router.read_engine()) as session:
+        assert session.exec(select(Usuario.email)).all() == ["replica@example.com"]
+
+    # Too far behind: the primary serves reads until the replica catches up
+    monkeypatch.setattr(router, "replica_lag", lambda: 30.0)
+    assert router.read_engine() is primary
+    assert router.status()["replica_usable"] is False
+
+    monkeypatch.setattr(router, "replica_lag", lambda: 1.0)
+    assert router.read_engine() is replica
+
+    # Unreachable replica
+    def broken():
+        raise ConnectionError("replica down")
+    monkeypatch.setattr(router, "replica_lag", broken)
+    assert router.read_engine() is primary
+    assert router.status()["replica_lag_seconds"] is None
+    assert router.status()["reads"] == {"replica": 2, "primary": 2}
+
+
+def test_without_replica_uses_primary_and_reports_pools(tmp_path):
+    primary = _engine(tmp_path / "primary.db")
+    router = ReadReplicaRouter(primary)
+    assert router.read_engine() is primary
+    status = router.status()
+    assert status["replica_configured"] is False
+    assert set(status["pools"]) == {"primary"}
+    assert status["pools"]["primary"]["pool"]
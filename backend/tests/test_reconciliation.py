@@ -2,6 +2,7 @@ import pytest
 from decimal import Decimal
 from backend.models.models import LibroTransacciones, ListaCuentas, Usuario, Divisa, Categoria, Beneficiario
 from backend.api.reconciliation.router import ReconciliationPreview
+from backend.api.auth.deps import get_current_user
 from datetime import datetime
 
 def test_preview_reconciliation_logic(client, session):
@@ -83,6 +84,14 @@ def test_preview_reconciliation_logic(client, session):
     # async def preview_reconciliation(file, id_cuenta, session): ...
     # It does NOT verify user! This might be a security issue to fix later, but for test it's fine.
     
+    # preview now requires an authenticated user (import rules are per user)
+    user = Usuario(email="reconcile@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    from backend.main import app
+    app.dependency_overrides[get_current_user] = lambda: user
+
     response = client.post("/api/reconciliation/preview", data=data, files=files)
     
     assert response.status_code == 200
@@ -111,3 +120,178 @@ def test_preview_reconciliation_logic(client, session):
     assert r3["match_id"] is None
     assert r3["is_new"] is True
 
+    # The CSV layout was learned as an import profile and is reused on the next import
+    profile_id = response.headers["X-Import-Profile"]
+    response = client.post("/api/reconciliation/preview", data=data, files=files)
+    assert response.headers["X-Import-Profile"] == profile_id
+    profiles = client.get("/api/reconciliation/profiles").json()
+    assert len(profiles) == 1 and profiles[0]["usos"] == 2
+
+
+
+def test_process_reconciliation_bulk(client, session):
+    divisa = Divisa(nombre_divisa="ARS", codigo_iso="ARS", tipo_divisa="Fiat")
+    session.add(divisa)
+    category = Categoria(nombre_categoria="Varios", activo=1)
+    session.add(category)
+    user = Usuario(email="bulk@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    session.refresh(divisa)
+    session.refresh(category)
+
+    account = ListaCuentas(nombre_cuenta="Bulk Bank", tipo_cuenta="Checking", id_divisa=divisa.id_divisa, saldo_inicial=1000)
+    existing = Beneficiario(nombre_beneficiario="Kiosco", id_categoria=category.id_categoria)
+    session.add(account)
+    session.add(existing)
+    session.commit()
+    session.refresh(account)
+
+    from backend.models.models import MetaAhorro
+    goal = MetaAhorro(id_usuario=user.id_usuario, id_cuenta=account.id_cuenta, nombre_meta="Fondo", monto_objetivo=5000)
+    session.add(goal)
+    session.commit()
+
+    from backend.main import app
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    payload = {
+        "id_cuenta": account.id_cuenta,
+        "transactions": [
+            {"fecha": "2024-03-01", "descripcion": "kiosco", "monto": "-50.00", "is_new": True},
+            {"fecha": "2024-03-02", "descripcion": "nuevo comercio", "monto": "-20.00", "is_new": True},
+            {"fecha": "2024-03-03", "descripcion": "Nuevo Comercio", "monto": "-30.00", "is_new": True},
+            {"fecha": "2024-03-04", "descripcion": "sueldo", "monto": "500.00", "is_new": True, "new_payee": "empresa"},
+            {"fecha": "2024-03-05", "descripcion": "ya existe", "monto": "10.00", "is_new": False, "match_id": 1},
+        ]
+    }
+    response = client.post("/api/reconciliation/process", json=payload)
+    assert response.status_code == 200
+    assert response.json()["stats"] == {"created": 4, "matched": 1, "duplicates": 0}
+
+    from sqlmodel import select
+    names = {b.nombre_beneficiario for b in session.exec(select(Beneficiario)).all()}
+    assert names == {"Kiosco", "Nuevo Comercio", "Empresa"}
+    # Bulk inserts take the model's column defaults
+    assert {(b.activo, b.oculto) for b in session.exec(select(Beneficiario)).all()} == {(1, 0)}
+
+    txs = session.exec(select(LibroTransacciones)).all()
+    assert len(txs) == 4
+    kiosco_tx = next(t for t in txs if t.fecha_transaccion == "2024-03-01")
+    assert kiosco_tx.id_categoria == category.id_categoria
+    assert {(t.color, t.es_dividida) for t in txs} == {(-1, False)}
+
+    session.refresh(goal)
+    assert goal.monto_actual == Decimal("1400.00")
+
+    # Importing the same statement again creates nothing new
+    response = client.post("/api/reconciliation/process", json=payload)
+    assert response.json()["stats"] == {"created": 0, "matched": 1, "duplicates": 4}
+
+
+def test_matcher_graded_scores():
+    from backend.core.reconciliation_service import ReconciliationMatcher, text_similarity
+
+    matcher = ReconciliationMatcher()
+    exact = matcher.score(
+        {"fecha": "2024-01-01", "descripcion": "SUPERMERCADO DIA", "monto": Decimal("100.00")},
+        {"fecha": "2024-01-01", "descripcion": "[Importado] Supermercado Dia", "beneficiario": None, "monto": Decimal("100.00")}
+    )
+    near = matcher.score(
+        {"fecha": "2024-01-03", "descripcion": "Supermercado", "monto": Decimal("100.50")},
+        {"fecha": "2024-01-01", "descripcion": None, "beneficiario": "Supermercado Dia", "monto": Decimal("100.00")}
+    )
+    assert exact == 100.0
+    assert 0 < near < exact
+    # Opposite sign or out of window is never a candidate
+    assert matcher.score(
+        {"fecha": "2024-01-01", "descripcion": "x", "monto": Decimal("-100")},
+        {"fecha": "2024-01-01", "descripcion": "x", "monto": Decimal("100")}
+    ) == 0.0
+    assert matcher.score(
+        {"fecha": "2024-01-10", "descripcion": "x", "monto": Decimal("100")},
+        {"fecha": "2024-01-01", "descripcion": "x", "monto": Decimal("100")}
+    ) == 0.0
+    assert text_similarity("Pago Netflix.com", "netflix") == 1.0
+
+
+def test_matcher_optimal_assignment():
+    from backend.core.reconciliation_service import ReconciliationMatcher
+
+    matcher = ReconciliationMatcher(min_score=50)
+    rows = [
+        {"fecha": "2024-01-02", "descripcion": "luz", "monto": Decimal("100")},
+        {"fecha": "2024-01-01", "descripcion": "gas", "monto": Decimal("100")},
+    ]
+    candidates = [
+        {"fecha": "2024-01-01", "descripcion": "luz", "beneficiario": None, "monto": Decimal("100")},
+        {"fecha": "2024-01-04", "descripcion": "luz", "beneficiario": None, "monto": Decimal("100")},
+    ]
+    # Greedy would give candidate 0 to row 0 and leave row 1 unmatched or badly paired;
+    # the optimal assignment keeps both rows matched without duplicates.
+    result = matcher.match(rows, candidates)
+    assert all(r is not None for r in result)
+    assert {r[0] for r in result} == {0, 1}
+    assert result[1][0] == 0
+
+
+def test_dedup_near_duplicate_scan(session):
+    from backend.core.dedup_service import DedupService
+    service = DedupService()
+    txs = [
+        LibroTransacciones(id_cuenta=1, id_beneficiario=1, codigo_transaccion="Withdrawal",
+                           monto_transaccion=Decimal("-45.00"), fecha_transaccion="2024-03-01", notas="Farmacia Central"),
+        LibroTransacciones(id_cuenta=1, id_beneficiario=2, codigo_transaccion="Withdrawal",
+                           monto_transaccion=Decimal("-45.00"), fecha_transaccion="2024-03-03",
+                           notas="[Importado] FARMACIA CENTRAL SUC 12"),
+        # Same amount but outside the date window / different account
+        LibroTransacciones(id_cuenta=1, id_beneficiario=1, codigo_transaccion="Withdrawal",
+                           monto_transaccion=Decimal("-45.00"), fecha_transaccion="2024-03-20", notas="Farmacia Central"),
+        LibroTransacciones(id_cuenta=2, id_beneficiario=1, codigo_transaccion="Withdrawal",
+                           monto_transaccion=Decimal("-45.00"), fecha_transaccion="2024-03-01", notas="Farmacia Central"),
+    ]
+    session.add_all(txs)
+    session.commit()
+
+    assert service.backfill(session) == 4
+    assert service.fingerprint(1, "2024-03-01T10:00:00", "-45", "farmacia  central") == txs[0].huella_duplicado
+
+    pairs = service.scan_near_duplicates(session)
+    assert [(p["id_transaccion"], p["id_duplicado"]) for p in pairs] == [(txs[0].id_transaccion, txs[1].id_transaccion)]
+    assert pairs[0]["dias_diferencia"] == 2
+
+
+def test_dedup_rows_without_payee_compare_notes_only():
+    from backend.core.dedup_service import DedupService
+    service = DedupService()
+    # Legacy rows with no payee: unrelated notes are not near-duplicates
+    assert service.pair_similarity("Farmacia Central", None, "Cuota gimnasio", None) < service.min_similarity
+    assert service.pair_similarity("Farmacia Central", 7, "Cuota gimnasio", 7) >= service.min_similarity
+    assert service.pair_similarity("Farmacia Central", None, "farmacia central", None) >= service.min_similarity
+
+
+def test_stale_import_profile_is_relearned_not_deleted(session):
+    from backend.api.reconciliation.router import _parse_csv
+    from backend.core.csv_parser import CSVParser
+    from backend.models.models_extended import PerfilImportacion
+
+    user = Usuario(email="perfil@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    content = b"Fecha;Concepto;Importe\n03/02/2024;Luz;-1.234,00\n04/02/2024;Gas;-500,00"
+    # Edited by hand with the date and description columns swapped: no row has a date
+    perfil = PerfilImportacion(
+        id_usuario=user.id_usuario, nombre="Mi banco", huella_encabezado=CSVParser.header_fingerprint(content),
+        delimitador=";", codificacion="utf-8", columna_fecha="concepto", columna_descripcion="fecha",
+        columna_monto="importe", formato_fecha="%d/%m/%Y", separador_decimal=",", usos=3
+    )
+    session.add(perfil)
+    session.commit()
+    session.refresh(perfil)
+
+    rows, profile_id, skipped = _parse_csv(session, user.id_usuario, None, "extracto.csv", content, None, {})
+
+    assert [r["monto"] for r in rows] == [Decimal("-1234.00"), Decimal("-500.00")]
+    assert profile_id == perfil.id_perfil and skipped == 0
+    session.refresh(perfil)
+    assert (perfil.nombre, perfil.columna_fecha, perfil.usos) == ("Mi banco", "fecha", 4)
@@ -0,0 +1,29 @@
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import QueuePool
+from backend.core.database import _build_engine, tune_sqlite
+
+
+def test_sqlite_engine_applies_pragmas(tmp_path):
+    engine = _build_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    assert isinstance(engine.pool, QueuePool)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -65536
+    engine.dispose()
+
+
+def test_async_sqlite_engine_applies_pragmas(tmp_path):
+    async def journal_mode():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tuned_async.db'}")
+        tune_sqlite(engine.sync_engine)
+        async with engine.connect() as conn:
+            mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        await engine.dispose()
+        return mode
+
+    assert asyncio.run(journal_mode()) == "wal"
@@ -0,0 +1,132 @@
+import pytest
+from decimal import Decimal
+from backend.core import statement_parsers
+from backend.core.statement_parsers import StatementParser, OFXParser, QIFParser, CAMTParser, get_statement_parser
+from backend.core.csv_parser import CSVParser
+
+OFX_SGML = b"""OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240105120000[-3:ART]
+<TRNAMT>-1250.75
+<FITID>A1
+<NAME>SUPERMERCADO DIA
+<MEMO>Compra debito
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240106
+<TRNAMT>500.00
+<FITID>A2
+<NAME>Sueldo &amp; Bonos
+</STMTTRN>
+</BANKTRANLIST>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+QIF = b"""!Type:Bank
+D01/15/2024
+T-1,234.56
+PEdenor
+MFactura luz
+^
+D1/16'24
+T2500.00
+PEmpresa SA
+^
+"""
+
+CAMT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">
+  <BkToCstmrStmt>
+    <Stmt>
+      <Ntry>
+        <Amt Ccy="EUR">42.10</Amt>
+        <CdtDbtInd>DBIT</CdtDbtInd>
+        <BookgDt><Dt>2024-02-01</Dt></BookgDt>
+        <NtryDtls><TxDtls>
+          <RltdPties><Cdtr><Nm>Gas Natural</Nm></Cdtr></RltdPties>
+          <RmtInf><Ustrd>Factura 123</Ustrd></RmtInf>
+        </TxDtls></NtryDtls>
+      </Ntry>
+      <Ntry>
+        <Amt Ccy="EUR">1000.00</Amt>
+        <CdtDbtInd>CRDT</CdtDbtInd>
+        <BookgDt><DtTm>2024-02-02T10:00:00</DtTm></BookgDt>
+        <AddtlNtryInf>Transferencia recibida</AddtlNtryInf>
+      </Ntry>
+    </Stmt>
+  </BkToCstmrStmt>
+</Document>
+"""
+
+
+def test_ofx_parser_sgml(monkeypatch):
+    # Tiny chunks force tags to be split across reads
+    monkeypatch.setattr(statement_parsers, "CHUNK_SIZE", 7)
+    data = OFXParser(OFX_SGML).parse()
+
+    assert len(data) == 2
+    assert data[0]["fecha"] == "2024-01-05"
+    assert data[0]["monto"] == Decimal("-1250.75")
+    assert data[0]["descripcion"] == "SUPERMERCADO DIA Compra debito"
+    assert data[0]["raw_row"]["FITID"] == "A1"
+    assert data[1]["descripcion"] == "Sueldo & Bonos"
+
+
+def test_qif_parser():
+    data = QIFParser(QIF).parse()
+
+    assert len(data) == 2
+    assert data[0]["fecha"] == "2024-01-15"
+    assert data[0]["monto"] == Decimal("-1234.56")
+    assert data[0]["descripcion"] == "Edenor Factura luz"
+    assert data[1]["fecha"] == "2024-01-16"
+
+
+def test_camt_parser():
+    data = CAMTParser(CAMT).parse()
+
+    assert len(data) == 2
+    assert data[0] == {
+        "fecha": "2024-02-01",
+        "descripcion": "Gas Natural Factura 123",
+        "monto": Decimal("-42.10"),
+        "raw_row": {"NtryRef": None, "AcctSvcrRef": None, "Sts": None}
+    }
+    assert data[1]["fecha"] == "2024-02-02"
+    assert data[1]["monto"] == Decimal("1000.00")
+    assert data[1]["descripcion"] == "Transferencia recibida"
+
+
+def test_get_statement_parser_detection():
+    assert isinstance(get_statement_parser("extracto.csv", b"Date,Description,Amount\n"), CSVParser)
+    assert isinstance(get_statement_parser("extracto.QFX", OFX_SGML), OFXParser)
+    assert isinstance(get_statement_parser("extracto.txt", QIF), QIFParser)
+    assert isinstance(get_statement_parser("statement.dat", CAMT), CAMTParser)
+    with pytest.raises(ValueError):
+        get_statement_parser("foto.png", b"\x89PNG")
+
+
+def test_xml_requires_camt053_namespace():
+    assert isinstance(get_statement_parser("extracto.xml", CAMT), CAMTParser)
+    pain = CAMT.replace(b"camt.053.001.02", b"pain.001.001.03")
+    with pytest.raises(ValueError, match="CAMT.053"):
+        get_statement_parser("pago.xml", pain)
+    with pytest.raises(ValueError, match="CAMT.053"):
+        get_statement_parser("roto.xml", b"no es xml")
+
+
+def test_statement_parser_requires_iter_records():
+    class IncompleteParser(StatementParser):
+        EXTENSIONS = (".xyz",)
+
+    with pytest.raises(TypeError):
+        IncompleteParser(b"")
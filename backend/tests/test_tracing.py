@@ -0,0 +1,61 @@
+import httpx
+import pytest
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from backend.api.auth.deps import get_current_user
+from backend.core import tracing
+from backend.core.http_client import HTTPClientManager
+from backend.main import app
+from backend.models.models import Usuario
+
+
+@pytest.fixture
+def spans():
+    exporter = InMemorySpanExporter()
+    tracing.setup_tracing(exporter, batch=False)
+    yield exporter
+    tracing.shutdown_tracing()
+
+
+def test_request_span_parents_sql_spans(client, session, spans):
+    user = Usuario(email="traces@example.com", password="hash")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    client.get(
+        "/api/notifications/unread-count",
+        headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"}
+    )
+
+    finished = spans.get_finished_spans()
+    server = next(s for s in finished if s.name == "GET /api/notifications/unread-count")
+    assert format(server.context.trace_id, "032x") == trace_id
+    assert server.attributes["http.response.status_code"] == 200
+
+    sql = [s for s in finished if s.name == "SELECT" and s.context.trace_id == server.context.trace_id]
+    assert sql and "traces@example.com" not in str(sql[0].attributes)
+
+
+@pytest.mark.asyncio
+async def test_outgoing_requests_carry_traceparent(spans):
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["traceparent"] = request.headers.get("traceparent")
+        return httpx.Response(200)
+
+    manager = HTTPClientManager(retries=0, transport=httpx.MockTransport(handler))
+    await tracing.traced("fx.get_rates")(manager.get)("https://dolarapi.com/v1/dolares?x=1")
+    await manager.close()
+
+    client_span = next(s for s in spans.get_finished_spans() if s.name == "HTTP GET")
+    assert client_span.attributes["url.full"] == "https://dolarapi.com/v1/dolares"
+    assert format(client_span.context.span_id, "016x") in seen["traceparent"]
+    assert client_span.parent is not None
+
+
+def test_disabled_tracing_records_nothing(session):
+    assert tracing.get_tracer().start_span("x").get_span_context().is_valid is False
+    assert tracing.inject_headers(None) is None
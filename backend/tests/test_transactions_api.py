@@ -54,6 +54,21 @@ def test_create_transaction_integration(client: TestClient, session: Session):
     db_tx = session.exec(select(LibroTransacciones)).first()
     assert db_tx is not None
     assert db_tx.monto_transaccion == 1500.50
+    assert db_tx.huella_duplicado
+
+    # Same movement again (different case/spacing in the notes) is rejected as a duplicate
+    response = client.post("/api/transacciones/", json={**tx_data, "notas": "integration  test tx"})
+    assert response.status_code == 409
+    response = client.post("/api/transacciones/?permitir_duplicado=true", json=tx_data)
+    assert response.status_code == 200
+
+    # Bulk creation checks the ledger and the batch itself
+    other = {**tx_data, "notas": "Otra", "fecha_transaccion": "2024-02-06"}
+    response = client.post("/api/transacciones/lote", json=[tx_data, other, other])
+    assert response.status_code == 200
+    result = response.json()
+    assert result["success_count"] == 1
+    assert result["error_count"] == 2
 
 def test_list_transactions_paginated(client: TestClient, session: Session):
     # Setup multiple transactions
@@ -133,5 +148,6 @@ def test_delete_transaction(client: TestClient, session: Session):
     response = client.delete(f"/api/transacciones/{tx_id}")
     assert response.status_code == 200
     
-    # Verify deletion
+    # Verify deletion (the endpoint used its own async session)
+    session.expire_all()
     assert session.get(LibroTransacciones, tx_id) is None
@@ -0,0 +1,52 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from sqlalchemy import inspect, text
+from sqlmodel import Session, SQLModel, create_engine, select
+from backend.core.database import ensure_unique_keys, upsert
+from backend.models.models import Divisa
+from backend.models.models_extended import HistorialDivisa
+
+# historial_divisas as create_all built it before the model declared unique_divisa_fecha
+LEGACY_TABLE = """
+CREATE TABLE historial_divisas (
+    id_historial INTEGER PRIMARY KEY, id_divisa INTEGER NOT NULL, fecha_tasa DATE NOT NULL,
+    tasa_valor NUMERIC(20, 8) NOT NULL, tipo_actualizacion INTEGER NOT NULL, fecha_creacion DATETIME
+)
+"""
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_TABLE))
+    SQLModel.metadata.create_all(engine, tables=[Divisa.__table__])
+    with Session(engine) as session:
+        session.add(Divisa(id_divisa=1, nombre_divisa="Dólar Blue", codigo_iso="USD_BLUE", tipo_divisa="Fiat"))
+        session.commit()
+    return engine
+
+
+def _store(engine, valor: str):
+    row = {"id_divisa": 1, "fecha_tasa": date(2026, 3, 1), "tasa_valor": Decimal(valor), "tipo_actualizacion": 1}
+    with Session(engine) as session:
+        upsert(session, HistorialDivisa, [row], ["id_divisa", "fecha_tasa"], ["tasa_valor", "tipo_actualizacion"])
+        session.commit()
+        return session.exec(select(HistorialDivisa)).all()
+
+
+def test_missing_unique_key_is_added_at_startup(legacy_engine):
+    ensure_unique_keys(legacy_engine)
+    indexes = {i["name"]: i for i in inspect(legacy_engine).get_indexes("historial_divisas")}
+    assert indexes["unique_divisa_fecha"]["unique"]
+
+    _store(legacy_engine, "1200")
+    historial = _store(legacy_engine, "1250")
+    assert [h.tasa_valor for h in historial] == [Decimal("1250")]
+
+
+def test_upsert_without_unique_key_updates_row_by_row(legacy_engine):
+    _store(legacy_engine, "1200")
+    historial = _store(legacy_engine, "1250")
+    assert [h.tasa_valor for h in historial] == [Decimal("1250")]
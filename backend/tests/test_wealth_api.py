@@ -0,0 +1,44 @@
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from backend.models.models import LibroTransacciones, ListaCuentas, Divisa, Usuario, Beneficiario
+from backend.api.auth.deps import get_current_user
+from backend.core.fx_service import fx_service
+
+
+def test_savings_rate_matches_summary(client: TestClient, session: Session, monkeypatch):
+    user = Usuario(email="savings@example.com", password="hash")
+    divisa = Divisa(nombre_divisa="Peso", codigo_iso="ARS", tipo_divisa="Fiat")
+    session.add(user)
+    session.add(divisa)
+    session.commit()
+    cuenta = ListaCuentas(nombre_cuenta="Caja", tipo_cuenta="Efectivo", id_divisa=divisa.id_divisa)
+    benef = Beneficiario(nombre_beneficiario="Empleador")
+    session.add(cuenta)
+    session.add(benef)
+    session.commit()
+
+    hoy = datetime.utcnow()
+    for codigo, monto in (("Deposit", 1000), ("Withdrawal", 250)):
+        session.add(LibroTransacciones(
+            id_cuenta=cuenta.id_cuenta, id_beneficiario=benef.id_beneficiario,
+            fecha_transaccion=hoy.isoformat(), monto_transaccion=monto, codigo_transaccion=codigo
+        ))
+    session.commit()
+    session.refresh(user)
+
+    # Tasas en caché: sin llamadas de red
+    monkeypatch.setattr(fx_service, "cache", {"rates": {"timestamp": hoy, "data": {"ARS": 1.0, "USD_BLUE": 1200.0}}})
+    from backend.main import app
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    resumen = client.get("/api/resumen/").json()
+    assert resumen["ingresos_mes"] == 1000.0
+
+    response = client.get("/api/wealth/savings-rate")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ingresos"] == 1000.0
+    assert data["gastos"] == resumen["gastos_mes"]
+    assert data["ahorro"] == 1000.0 - resumen["gastos_mes"]
+    assert data["status"] != "CRITICAL"